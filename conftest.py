@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+
+def _offline(*args, **kwargs):
+    raise RuntimeError('network disabled in tests')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _no_currency_network():
+    """Курсы валют в тестах — только из БД/fallback-таблицы: без сетевых таймаутов.
+
+    Один патч на всю сессию; тесту с собственным ответом достаточно своего patch поверх.
+    """
+    with patch('store.utils.currency.requests.get', side_effect=_offline):
+        yield
+
+
+def pytest_configure(config):
+    # Тесты пишут аватары, обложки и варианты картинок — не в media/ репозитория, а во
+    # временный каталог. Под pytest-xdist он у каждого воркера свой: фиксированные
+    # подкаталоги (test_src/, covers/) иначе делили бы воркеры между собой.
+    # Тестовые БД pytest-django и так разводит по воркерам (суффикс _gwN).
+    worker = os.environ.get('PYTEST_XDIST_WORKER')
+    prefix = f'steam-media-{worker}-' if worker else 'steam-media-'
+    media_root = Path(tempfile.mkdtemp(prefix=prefix))
+    override = override_settings(MEDIA_ROOT=media_root)
+    override.enable()
+    config._test_media = (override, media_root)
+
+
+def pytest_unconfigure(config):
+    test_media = getattr(config, '_test_media', None)
+    if test_media:
+        override, media_root = test_media
+        override.disable()
+        shutil.rmtree(media_root, ignore_errors=True)
@@ -96,3 +96,28 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     });
 });
+
+// Теги Steam подгружаем после рендера ({% steam_tags_lazy %}), чтобы сеть Steam не влияла на TTFB
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.steam-tags-lazy').forEach(el => {
+        const u = new URL(el.dataset.url || '/api/steam_tags/', window.location.origin);
+        u.searchParams.set('appid', el.dataset.appid);
+        u.searchParams.set('max', el.dataset.max || '5');
+        fetch(u, { headers: { 'Accept': 'application/json' } })
+            .then(r => r.ok ? r.json() : { tags: [] })
+            .then(data => {
+                const tags = (data && data.tags) || [];
+                if (!tags.length) { el.remove(); return; }
+                const box = document.createElement('div');
+                box.className = 'flex flex-wrap gap-2 mb-3 w-full justify-end';
+                tags.forEach(t => {
+                    const span = document.createElement('span');
+                    span.className = 'text-xs bg-[#072a2e] text-green-200 px-2 py-1 rounded';
+                    span.textContent = t;
+                    box.appendChild(span);
+                });
+                el.replaceWith(box);
+            })
+            .catch(() => el.remove());
+    });
+});
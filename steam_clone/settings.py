@@ -78,10 +78,17 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'steam_clone.wsgi.application'
 
+_conn_max_age = os.getenv('DB_CONN_MAX_AGE', '60').strip()
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Держим соединение между запросами (ActivityMiddleware пишет почти на каждый запрос,
+        # а на Postgres установка соединения дороже самого UPDATE). 0 — закрывать после запроса,
+        # пусто/None — без ограничения (удобно за PgBouncer).
+        'CONN_MAX_AGE': int(_conn_max_age) if _conn_max_age else None,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -161,6 +168,8 @@ SOCIAL_AUTH_PIPELINE = (
 # Performance feature flags
 # Disable remote Steam tags fetching during server-side render by default
 STORE_FETCH_STEAM_TAGS = False
+# Размер пачки для bulk_create/bulk_update в массовых операциях
+STORE_BULK_BATCH_SIZE = 500
 
 # Currency rates fetching
 # Avoid blocking requests to external API on page render. Use DB cache/fallback instead.
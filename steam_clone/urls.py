@@ -1,7 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.contrib.sitemaps import views as sitemap_views
-from store.sitemaps import GameSitemap, StaticViewSitemap
+from store.sitemaps import sitemap_xml
 from django.views.generic import TemplateView
 from store.views import SafeLoginView
 from django.conf import settings
@@ -15,11 +14,8 @@ urlpatterns = [
     path('accounts/login/', SafeLoginView.as_view(), name='login'),
     # include Django auth views for login/logout/password management
     path('accounts/', include('django.contrib.auth.urls')),
-    # SEO: sitemap.xml and robots.txt
-    path('sitemap.xml', sitemap_views.sitemap, { 'sitemaps': {
-        'static': StaticViewSitemap,
-        'games': GameSitemap,
-    } }, name='sitemap'),
+    # SEO: sitemap.xml (пререндерится командой regenerate_sitemap) and robots.txt
+    path('sitemap.xml', sitemap_xml, name='sitemap'),
     path('robots.txt', TemplateView.as_view(template_name='robots.txt', content_type='text/plain')),
 ]
 
@@ -58,6 +58,7 @@ class GenreAdmin(admin.ModelAdmin):
 @admin.register(Screenshot)
 class ScreenshotAdmin(admin.ModelAdmin):
     list_display = ('game', 'caption', 'order')
+    list_select_related = ('game',)
     list_editable = ('order',)
 
 @admin.register(SupportTicket)
@@ -71,6 +72,7 @@ class SupportTicketAdmin(admin.ModelAdmin):
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('user', 'game', 'quantity', 'added_at')
+    list_select_related = ('user', 'game')
 
 
 class OrderItemInline(admin.TabularInline):
@@ -78,10 +80,15 @@ class OrderItemInline(admin.TabularInline):
     extra = 0
     readonly_fields = ("game", "quantity", "price", "currency")
 
+    def get_queryset(self, request):
+        # game выводится строкой для каждой позиции — подтягиваем одним JOIN
+        return super().get_queryset(request).select_related('game')
+
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('user', 'status', 'total_price', 'currency', 'created_at')
+    list_select_related = ('user',)
     list_filter = ('status', 'currency')
     inlines = [OrderItemInline]
 
@@ -89,12 +96,14 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('user', 'game', 'rating', 'created_at')
+    list_select_related = ('user', 'game')
     list_filter = ('rating',)
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'preferred_language', 'preferred_currency')
+    list_select_related = ('user',)
 
 
 @admin.register(CurrencyRate)
@@ -107,6 +116,7 @@ class CurrencyRateAdmin(admin.ModelAdmin):
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'kind', 'is_read', 'created_at', 'expires_at')
+    list_select_related = ('user',)
     list_filter = ('kind', 'is_read')
     search_fields = ('user__username',)
 
@@ -114,5 +124,6 @@ class NotificationAdmin(admin.ModelAdmin):
 @admin.register(PriceSnapshot)
 class PriceSnapshotAdmin(admin.ModelAdmin):
     list_display = ('game', 'price', 'currency', 'snapshot_date')
+    list_select_related = ('game',)
     list_filter = ('currency', 'snapshot_date')
     search_fields = ('game__title', 'game__slug')
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
 
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    # Поля профиля, которые middleware читают напрямую (без getattr-страховки)
+    MIDDLEWARE_PROFILE_FIELDS = ('preferred_language', 'last_seen')
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        profile_model = self.get_model('UserProfile')
+        for name in self.MIDDLEWARE_PROFILE_FIELDS:
+            try:
+                profile_model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f'UserProfile.{name} is required by store.middleware; run migrations / check the model.'
+                )
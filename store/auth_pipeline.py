@@ -74,11 +74,8 @@ def sync_steam(strategy, details, response, user=None, uid=None, *args, **kwargs
             return
         existing_games = {g.appid: g for g in Game.objects.filter(appid__in=appids)}
 
-        # load existing OwnedGame for the user keyed by game_id
-        existing_owned = {og.game_id: og for og in OwnedGame.objects.filter(user=user, game__appid__in=appids)}
-
-        to_create = []
-        to_update = []
+        # Без предварительного SELECT по OwnedGame: новые строки вставятся, существующие обновятся (upsert)
+        to_upsert = []
 
         from datetime import datetime, timezone as py_tz
 
@@ -98,27 +95,12 @@ def sync_steam(strategy, details, response, user=None, uid=None, *args, **kwargs
             except Exception:
                 last_dt = None
 
-            og = existing_owned.get(game.id)
-            if og:
-                changed = False
-                if og.playtime_forever != play_forever:
-                    og.playtime_forever = play_forever; changed = True
-                if og.playtime_2weeks != play_2w:
-                    og.playtime_2weeks = play_2w; changed = True
-                if og.last_played != last_dt:
-                    og.last_played = last_dt; changed = True
-                if changed:
-                    to_update.append(og)
-            else:
-                to_create.append(OwnedGame(user=user, game=game, source='steam',
-                                           playtime_forever=play_forever, playtime_2weeks=play_2w, last_played=last_dt))
-
-        if to_create or to_update:
+            to_upsert.append(OwnedGame(user=user, game=game, source='steam',
+                                       playtime_forever=play_forever, playtime_2weeks=play_2w, last_played=last_dt))
+
+        if to_upsert:
             with transaction.atomic():
-                if to_create:
-                    OwnedGame.objects.bulk_create(to_create, ignore_conflicts=True)
-                if to_update:
-                    OwnedGame.objects.bulk_update(to_update, ['playtime_forever', 'playtime_2weeks', 'last_played'])
+                OwnedGame.upsert_many(to_upsert, ['playtime_forever', 'playtime_2weeks', 'last_played'])
     except Exception:
         return
 
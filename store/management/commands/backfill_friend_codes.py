@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Выдаёт friend_code всем профилям без кода (пачками, bulk_update)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000, help='Сколько профилей обрабатывать за проход (по умолчанию 1000)')
+
+    def handle(self, *args, **options):
+        updated = UserProfile.backfill_friend_codes(batch=options['batch'])
+        self.stdout.write(self.style.SUCCESS(f"Выдано friend_code: {updated}"))
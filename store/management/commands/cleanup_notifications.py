@@ -13,11 +13,12 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         now = timezone.now()
-        qs = Notification.objects.filter(expires_at__isnull=False, expires_at__lt=now)
-        total = qs.count()
+        # order_by() снимает сортировку Meta.ordering, чтобы выборка шла по частичному индексу notif_expires_idx
+        qs = Notification.objects.filter(expires_at__isnull=False, expires_at__lt=now).order_by()
         dry = options['dry_run']
         batch = options['batch']
         if dry:
+            total = qs.count()
             self.stdout.write(self.style.WARNING(f"Будет удалено: {total} уведомлений"))
             return
         deleted = 0
@@ -0,0 +1,37 @@
+from typing import Any
+from django.core.management.base import BaseCommand
+from store.models import UserProfile
+from store.templatetags.store_extras import ensure_img_variant
+
+
+class Command(BaseCommand):
+    help = (
+        "Сгенерировать WebP-миниатюры загруженных аватаров (по умолчанию 64/128/256px).\n"
+        "Запускается по cron, чтобы ресайз не выполнялся в запросе загрузки или при рендере."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=str, default='64,128,256', help='Ширины миниатюр через запятую')
+        parser.add_argument('--limit', type=int, default=0, help='Максимум профилей за запуск (0 — без ограничения)')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        sizes = [int(t) for t in str(options.get('sizes') or '').split(',') if t.strip().isdigit()]
+        limit = int(options.get('limit') or 0)
+        qs = (
+            UserProfile.objects.exclude(avatar__isnull=True).exclude(avatar='')
+            .only('id', 'avatar')
+            .order_by('id')
+        )
+        if limit > 0:
+            qs = qs[:limit]
+        processed = 0
+        for prof in qs.iterator():
+            try:
+                src = prof.avatar.url
+            except Exception:
+                continue
+            # ensure_img_variant пропускает уже актуальные варианты, поэтому повторный запуск дешёвый
+            for w in sizes:
+                ensure_img_variant(src, w)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Аватары обработаны: {processed}, размеры: {', '.join(map(str, sizes))}"))
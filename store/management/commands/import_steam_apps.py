@@ -43,13 +43,10 @@ class Command(BaseCommand):
 
             # Genres
             genres_raw = data.get('genres') or []
-            genre_objs = []
-            for g in genres_raw:
-                # g can be dict with 'description' key
-                name = g.get('description') if isinstance(g, dict) else g
-                if name:
-                    obj, _ = Genre.objects.get_or_create(name=name)
-                    genre_objs.append(obj)
+            # g can be dict with 'description' key
+            genre_objs = Genre.get_or_create_many(
+                g.get('description') if isinstance(g, dict) else g for g in genres_raw
+            )
 
             # Price and discounts (Steam returns price_overview dict)
             price = 0
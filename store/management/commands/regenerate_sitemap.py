@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store.sitemaps import write_sitemap_files
+
+
+def _default_domain() -> str:
+    for host in settings.ALLOWED_HOSTS:
+        if host and not host.startswith(('.', '*')):
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = "Пререндерит sitemap.xml (и sitemap-<n>.xml) в MEDIA_ROOT/sitemaps/. Запускать по cron, например раз в 6 часов."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--domain', default=None, help='Домен в абсолютных ссылках (по умолчанию первый из ALLOWED_HOSTS)')
+        parser.add_argument('--protocol', default='https', choices=['http', 'https'])
+
+    def handle(self, *args, **options):
+        domain = options['domain'] or _default_domain()
+        paths = write_sitemap_files(domain, protocol=options['protocol'])
+        self.stdout.write(self.style.SUCCESS(f"Sitemap: {len(paths)} файл(ов) в {paths[0].parent}"))
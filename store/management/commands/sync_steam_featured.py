@@ -18,13 +18,10 @@ def upsert_game_from_appdetails(appid: int, data: Dict[str, Any]) -> Tuple[Game,
         developer, _ = Developer.objects.get_or_create(name=devs[0])
 
     # Genres
-    genre_objs: List[Genre] = []
     genres_data: List[Any] = cast(List[Any], data.get('genres') or [])
-    for g in genres_data:
-        name = g.get('description') if isinstance(g, dict) else g
-        if name:
-            obj, _ = Genre.objects.get_or_create(name=name)
-            genre_objs.append(obj)
+    genre_objs: List[Genre] = Genre.get_or_create_many(
+        g.get('description') if isinstance(g, dict) else g for g in genres_data
+    )
 
     # Pricing / discounts
     price: Decimal = Decimal('0')
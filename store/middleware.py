@@ -1,40 +1,63 @@
+import logging
+import time
+
+from django.db import DatabaseError
 from django.utils import timezone, translation
-from datetime import timedelta
+from django.utils.cache import patch_vary_headers
 from django.conf import settings
+from django.core.cache import cache
+
+from .models import UserProfile
+from .utils.i18n import SESSION_LANGUAGE_KEY, remember_language
+
+logger = logging.getLogger(__name__)
 
 class LanguagePreferenceMiddleware:
     """Activate per-user preferred_language stored in UserProfile.
 
     Runs after AuthenticationMiddleware. Falls back to LANGUAGE_CODE.
+    The code is read from the session (filled on login), the profile is only
+    consulted when the session has no value yet.
     """
     def __init__(self, get_response):
         self.get_response = get_response
+        self.allowed = frozenset(code for code, _ in settings.LANGUAGES)
 
     def __call__(self, request):
         user = getattr(request, 'user', None)
         lang = None
         if user and user.is_authenticated:
-            prof = getattr(user, 'profile', None)
-            if prof:
-                cand = getattr(prof, 'preferred_language', None)
-                # validate against settings.LANGUAGES
-                if cand and any(cand == code for code, _ in getattr(settings, 'LANGUAGES', [])):
-                    lang = cand
+            cand = request.session.get(SESSION_LANGUAGE_KEY)
+            if not cand:
+                prof = getattr(user, 'profile', None)
+                if prof:
+                    cand = prof.preferred_language
+                    if cand:
+                        remember_language(request, cand)
+            # validate against settings.LANGUAGES
+            if cand in self.allowed:
+                lang = cand
         if not lang:
-            lang = getattr(settings, 'LANGUAGE_CODE', 'en')
-        try:
-            translation.activate(lang)
-            request.LANGUAGE_CODE = lang
-        except Exception:
-            pass
-        return self.get_response(request)
+            lang = settings.LANGUAGE_CODE
+        # код уже провалидирован по settings.LANGUAGES — activate() тут не падает
+        translation.activate(lang)
+        request.LANGUAGE_CODE = lang
+        response = self.get_response(request)
+        # Язык ответа зависит от заголовка/профиля — сообщаем об этом downstream-кешам (CDN)
+        patch_vary_headers(response, ('Accept-Language',))
+        return response
 
 class ActivityMiddleware:
     """Обновляет profile.last_seen для авторизованных пользователей.
 
     Чтобы снизить нагрузку, обновляем не чаще одного раза в N секунд.
+    Троттлинг — через кеш: пока ключ `ls:<user_pk>` жив, профиль не трогаем вовсе.
     """
     THROTTLE_SECONDS = 60
+    CACHE_KEY = 'ls:{pk}'
+    # не чаще одного warning'а в N секунд, чтобы не заспамить лог при лежащей БД
+    LOG_INTERVAL_SECONDS = 300
+    _last_error_log = None
 
     def __init__(self, get_response):
         self.get_response = get_response
@@ -42,22 +65,20 @@ class ActivityMiddleware:
     def __call__(self, request):
         user = getattr(request, 'user', None)
         if user and user.is_authenticated:
-            prof = getattr(user, 'profile', None)
-            if prof:
+            # cache.add атомарен: True только у первого запроса в окне троттлинга
+            if cache.add(self.CACHE_KEY.format(pk=user.pk), 1, self.THROTTLE_SECONDS):
                 now = timezone.now()
-                ls = getattr(prof, 'last_seen', None)
-                should_update = False
-                if ls is None:
-                    should_update = True
-                else:
-                    delta = (now - ls)
-                    if delta.total_seconds() >= self.THROTTLE_SECONDS:
-                        should_update = True
-                if should_update:
-                    prof.last_seen = now
-                    try:
-                        prof.save(update_fields=['last_seen'])
-                    except Exception:
-                        # В случае ошибки сохранения — игнорируем (не критично)
-                        pass
+                try:
+                    # QuerySet.update: без save()/сигналов — это просто heartbeat
+                    UserProfile.objects.filter(user_id=user.pk).update(last_seen=now)
+                except DatabaseError:
+                    # Не критично для запроса, но молча глотать нельзя
+                    self._log_update_error(user.pk)
         return self.get_response(request)
+
+    @classmethod
+    def _log_update_error(cls, user_pk):
+        now = time.monotonic()
+        if cls._last_error_log is None or now - cls._last_error_log >= cls.LOG_INTERVAL_SECONDS:
+            cls._last_error_log = now
+            logger.warning('last_seen update failed for user %s', user_pk, exc_info=True)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0042_notification_support_created'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('is_top_seller', True)), fields=['-updated_at'], name='game_top_seller_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('is_new_release', True)), fields=['-release_date'], name='game_new_release_idx'),
+        ),
+    ]
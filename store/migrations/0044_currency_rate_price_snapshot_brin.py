@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+# BRIN-индексы есть только в PostgreSQL. Для append-only таблиц (курсы, ежедневные
+# снимки цен) они в сотни раз меньше B-tree и почти не замедляют INSERT.
+# В состоянии моделей не отражаются — на SQLite шаг просто пропускается.
+BRIN_INDEXES = [
+    ('curr_fetched_brin', 'store_currencyrate', 'fetched_at'),
+    ('pricesnap_date_brin', 'store_pricesnapshot', 'snapshot_date'),
+]
+
+
+def create_brin_indexes(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in BRIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING brin ({column}) WITH (pages_per_range = 32)'
+        )
+
+
+def drop_brin_indexes(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in BRIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0043_game_home_flag_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='currencyrate',
+            name='store_curre_fetched_fc95c1_idx',
+        ),
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0044_currency_rate_price_snapshot_brin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False)), fields=['expires_at'], name='notif_expires_idx'),
+        ),
+    ]
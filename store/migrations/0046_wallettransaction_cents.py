@@ -0,0 +1,87 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+def _to_cents(value) -> int:
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def copy_amounts_to_cents(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # Пересчёт в Python, а не CAST в SQL: SQLite хранит decimal как REAL и при CAST отбрасывает дробную часть
+    WalletTransaction: Any = apps.get_model('store', 'WalletTransaction')
+    batch = []
+    for tx in WalletTransaction.objects.all().iterator():
+        tx.amount_cents = _to_cents(tx.amount)
+        tx.balance_after_cents = _to_cents(tx.balance_after)
+        tx.source_amount_cents = None if tx.source_amount is None else _to_cents(tx.source_amount)
+        batch.append(tx)
+        if len(batch) >= 500:
+            WalletTransaction.objects.bulk_update(batch, ['amount_cents', 'balance_after_cents', 'source_amount_cents'])
+            batch = []
+    if batch:
+        WalletTransaction.objects.bulk_update(batch, ['amount_cents', 'balance_after_cents', 'source_amount_cents'])
+
+
+def copy_cents_to_amounts(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    WalletTransaction: Any = apps.get_model('store', 'WalletTransaction')
+    for tx in WalletTransaction.objects.all().iterator():
+        tx.amount = Decimal(tx.amount_cents).scaleb(-2)
+        tx.balance_after = Decimal(tx.balance_after_cents).scaleb(-2)
+        tx.source_amount = None if tx.source_amount_cents is None else Decimal(tx.source_amount_cents).scaleb(-2)
+        tx.save(update_fields=['amount', 'balance_after', 'source_amount'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0045_notification_expires_partial_index'),
+    ]
+
+    operations = [
+        # Сначала делаем старые колонки nullable: при откате они пересоздаются пустыми
+        # и заполняются copy_cents_to_amounts до возврата NOT NULL.
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='amount_cents',
+            field=models.BigIntegerField(default=0, help_text='Сумма в центах (amount * 100)'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='balance_after_cents',
+            field=models.BigIntegerField(default=0, help_text='Баланс после операции в центах'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='source_amount_cents',
+            field=models.BigIntegerField(blank=True, help_text='Исходная введённая сумма в центах (если отличалась)', null=True),
+        ),
+        migrations.RunPython(copy_amounts_to_cents, copy_cents_to_amounts),
+        migrations.RemoveField(
+            model_name='wallettransaction',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='wallettransaction',
+            name='balance_after',
+        ),
+        migrations.RemoveField(
+            model_name='wallettransaction',
+            name='source_amount',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0046_wallettransaction_cents'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='currencyrate',
+            name='store_curre_base_d1ab9b_idx',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0047_remove_currencyrate_base_target_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='wallettransaction',
+            name='store_walle_user_id_a7b9b5_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['user', '-added_at'], name='cartitem_user_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ownedgame',
+            index=models.Index(fields=['user', '-last_played'], name='owned_user_last_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewvote',
+            index=models.Index(fields=['review', 'helpful'], name='reviewvote_review_helpful_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportmessage',
+            index=models.Index(fields=['ticket', 'created_at'], name='supportmsg_ticket_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['user', 'kind', '-created_at'], name='wallettx_user_kind_created_idx'),
+        ),
+    ]
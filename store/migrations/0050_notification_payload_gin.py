@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+# GIN по payload (jsonb_path_ops) обслуживает payload__contains={...} без seq scan.
+# Есть только в PostgreSQL, поэтому в состоянии моделей не отражается — на SQLite шаг пропускается.
+def create_payload_gin(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS notif_payload_gin ON store_notification USING gin (payload jsonb_path_ops)'
+    )
+
+
+def drop_payload_gin(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS notif_payload_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0049_notification_unread_partial_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_payload_gin, drop_payload_gin),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0050_notification_payload_gin'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('discount_percent__gt', 0)), fields=['-discount_percent'], name='game_discounted_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-16 12:58
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+def backfill_review_stats(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    Game: Any = apps.get_model('store', 'Game')
+    Review: Any = apps.get_model('store', 'Review')
+    stats = (
+        Review.objects.order_by().values('game_id')
+        .annotate(c=models.Count('id'), a=models.Avg('rating'))
+    )
+    to_update = []
+    for row in stats:
+        avg = Decimal(str(row['a'])).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if row['a'] is not None else None
+        to_update.append(Game(pk=row['game_id'], review_count=row['c'], avg_rating=avg))
+    Game.objects.bulk_update(to_update, ['review_count', 'avg_rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0051_game_discounted_partial_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='avg_rating',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-16 13:01
+
+from typing import Any
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+def copy_wishlist_rows(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # Неявная M2M-таблица (userprofile_id, game_id) → WishlistEntry
+    UserProfile: Any = apps.get_model('store', 'UserProfile')
+    WishlistEntry: Any = apps.get_model('store', 'WishlistEntry')
+    Through = UserProfile.wishlist.through
+    rows = Through.objects.values_list('userprofile_id', 'game_id').iterator()
+    WishlistEntry.objects.bulk_create(
+        (WishlistEntry(profile_id=pid, game_id=gid) for pid, gid in rows),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def restore_wishlist_rows(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    UserProfile: Any = apps.get_model('store', 'UserProfile')
+    WishlistEntry: Any = apps.get_model('store', 'WishlistEntry')
+    Through = UserProfile.wishlist.through
+    rows = WishlistEntry.objects.values_list('profile_id', 'game_id').iterator()
+    Through.objects.bulk_create(
+        (Through(userprofile_id=pid, game_id=gid) for pid, gid in rows),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0052_game_review_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WishlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+                ('last_notified_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wishlist_entries', to='store.game')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wishlist_entries', to='store.userprofile')),
+            ],
+            options={
+                'unique_together': {('profile', 'game')},
+                'indexes': [models.Index(fields=['game', 'last_notified_price'], name='wishlist_game_notified_idx')],
+            },
+        ),
+        migrations.RunPython(copy_wishlist_rows, restore_wishlist_rows),
+        # Django не умеет добавлять through= к существующему M2M — пересоздаём поле
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='wishlist',
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='wishlist',
+            field=models.ManyToManyField(blank=True, related_name='wishlisted_by', through='store.WishlistEntry', to='store.game'),
+        ),
+    ]
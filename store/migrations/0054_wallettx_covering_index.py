@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+# Покрывающий индекс для истории кошелька: ORDER BY created_at DESC + колонки страницы в INCLUDE
+# → index-only scan без похода в heap. INCLUDE есть только в PostgreSQL (на SQLite Index(include=...)
+# даёт предупреждение models.W040), поэтому в состоянии моделей не отражается.
+# Суммы лежат в *_cents (миграция 0046).
+def create_covering_index(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS wallettx_user_ts_cover ON store_wallettransaction '
+        '(user_id, created_at DESC) INCLUDE (amount_cents, kind, balance_after_cents, currency)'
+    )
+
+
+def drop_covering_index(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS wallettx_user_ts_cover')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0053_wishlist_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0054_wallettx_covering_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['user', 'status'], name='order_pending_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendshiprequest',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', ['pending', 'accepted', 'rejected', 'cancelled'])), name='friendreq_status_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', ['pending', 'paid', 'cancelled'])), name='order_status_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='supportticket',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', ['new', 'in_progress', 'closed'])), name='supportticket_status_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='userprofile',
+            constraint=models.CheckConstraint(condition=models.Q(('privacy__in', ['public', 'friends', 'private'])), name='userprofile_privacy_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='userprofile',
+            constraint=models.CheckConstraint(condition=models.Q(('comment_privacy__in', ['public', 'friends', 'nobody'])), name='userprofile_comment_privacy_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='userprofile',
+            constraint=models.CheckConstraint(condition=models.Q(('friend_request_privacy__in', ['public', 'friends', 'nobody'])), name='userprofile_fr_privacy_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='wallettransaction',
+            constraint=models.CheckConstraint(condition=models.Q(('kind__in', ['topup', 'purchase_deduct', 'manual_adjust', 'refund'])), name='wallettx_kind_valid'),
+        ),
+    ]
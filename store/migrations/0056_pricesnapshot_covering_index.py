@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+# «Последние снимки по играм» (PriceSnapshot.latest_two_per_game): (game_id, snapshot_date DESC)
+# + price/currency в INCLUDE → index-only scan. INCLUDE есть только в PostgreSQL,
+# поэтому в состоянии моделей не отражается — на SQLite шаг пропускается.
+def create_covering_index(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS pricesnap_game_date_cover ON store_pricesnapshot '
+        '(game_id, snapshot_date DESC) INCLUDE (price, currency)'
+    )
+
+
+def drop_covering_index(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS pricesnap_game_date_cover')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0055_choice_constraints_order_pending'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
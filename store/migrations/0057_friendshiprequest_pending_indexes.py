@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 13:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0056_pricesnapshot_covering_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='friendshiprequest',
+            name='store_frien_receive_e431bd_idx',
+        ),
+        migrations.AddIndex(
+            model_name='friendshiprequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['receiver'], name='fr_pending_by_recv'),
+        ),
+        migrations.AddIndex(
+            model_name='friendshiprequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['sender'], name='fr_pending_by_sender'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0057_friendshiprequest_pending_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('appid__isnull', False)), fields=['slug', 'updated_at'], name='game_slug_has_appid'),
+        ),
+    ]
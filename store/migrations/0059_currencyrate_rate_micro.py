@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 16:40
+
+from typing import Any
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+from django.db.models.functions import Cast, Round
+
+
+def backfill_rate_micro(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    CurrencyRate: Any = apps.get_model('store', 'CurrencyRate')
+    CurrencyRate.objects.filter(rate_micro__isnull=True).update(
+        rate_micro=Cast(Round(models.F('rate') * 1_000_000), models.BigIntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0058_game_slug_has_appid_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='currencyrate',
+            name='rate_micro',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_rate_micro, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,53 @@
-from decimal import Decimal
+import secrets
+from functools import lru_cache
+from decimal import Decimal, ROUND_HALF_UP
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F, Prefetch
+from django.db.models.functions import Round, RowNumber
 from django.utils.text import slugify
 from django.utils import timezone
 
 
+# Алфавит friend_code: 0-9A-Z без двусмысленных O/0/I/1 — ровно 32 символа
+_FRIEND_CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+
+
+@lru_cache(maxsize=4096)
+def _slug_for(text: str) -> str:
+    """slugify с кешем: при импорте одни и те же имена разработчиков/жанров повторяются."""
+    return slugify(text)
+
+
+
+class GameQuerySet(models.QuerySet):
+    def with_display(self):
+        """Для карточек/списков: developer одним JOIN, жанры — одним доп. запросом."""
+        return self.select_related('developer').prefetch_related('genres')
+
+    def with_media(self):
+        """with_display + скриншоты (страница игры, главная, сетки карточек со слайдами)."""
+        return self.with_display().prefetch_related('screenshots')
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_display(self):
+        """Позиции заказа вместе с играми: 1 запрос на заказы + 1 на позиции."""
+        return self.prefetch_related(
+            models.Prefetch('items_snapshot', queryset=OrderItem.objects.select_related('game'))
+        )
+
+
+class ReviewQuerySet(models.QuerySet):
+    def with_display(self):
+        """Автор/игра + счётчики helpful yes/no (для списков отзывов)."""
+        return self.select_related('user', 'game').annotate(
+            helpful_yes=models.Sum(models.Case(models.When(votes__helpful=True, then=1), default=0, output_field=models.IntegerField())),
+            helpful_no=models.Sum(models.Case(models.When(votes__helpful=False, then=1), default=0, output_field=models.IntegerField())),
+        )
+
+
 class Developer(models.Model):
     """
     Developer model: represents a game developer or studio.
@@ -19,9 +62,14 @@ class Developer(models.Model):
     appid = models.IntegerField(null=True, blank=True, unique=True)
     website = models.URLField(blank=True)
 
+    @classmethod
+    def build(cls, name: str, **kwargs):
+        """Несохранённый экземпляр с готовым slug (для bulk_create, минуя save())."""
+        return cls(name=name, slug=_slug_for(name), **kwargs)
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = _slug_for(self.name)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -38,9 +86,33 @@ class Genre(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
 
+    @classmethod
+    def build(cls, name: str):
+        return cls(name=name, slug=_slug_for(name))
+
+    @classmethod
+    def get_or_create_many(cls, names):
+        """Жанры по списку имён (в исходном порядке): один SELECT + bulk_create недостающих.
+
+        Заменяет get_or_create на каждый жанр в циклах импорта.
+        """
+        names = list(dict.fromkeys(n for n in names if n))
+        if not names:
+            return []
+        found = {g.name: g for g in cls.objects.filter(name__in=names)}
+        missing = [n for n in names if n not in found]
+        if missing:
+            cls.objects.bulk_create([cls.build(n) for n in missing], ignore_conflicts=True)
+            found.update({g.name: g for g in cls.objects.filter(name__in=missing)})
+            for n in missing:
+                if n not in found:
+                    # конфликт по slug с другим именем — пусть get_or_create разберётся/упадёт как раньше
+                    found[n], _ = cls.objects.get_or_create(name=n)
+        return [found[n] for n in names]
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = _slug_for(self.name)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -101,11 +173,41 @@ class Game(models.Model):
     is_top_seller = models.BooleanField(default=False)
     is_new_release = models.BooleanField(default=False)
 
+    # Денормализованные агрегаты по Review (обновляются сигналами, см. store/signals.py)
+    review_count = models.PositiveIntegerField(default=0)
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = GameQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Частичные индексы для блоков главной: содержат только помеченные строки
+            # и сразу отдают нужный порядок (ORDER BY) без сортировки всей таблицы
+            models.Index(fields=['-updated_at'], condition=models.Q(is_top_seller=True), name='game_top_seller_idx'),
+            models.Index(fields=['-release_date'], condition=models.Q(is_new_release=True), name='game_new_release_idx'),
+            # Скидки/промо: только игры со скидкой, сразу в порядке убывания процента
+            models.Index(fields=['-discount_percent'], condition=models.Q(discount_percent__gt=0), name='game_discounted_idx'),
+            # Sitemap: только игры с appid, в порядке slug; updated_at в ключе — index-only scan
+            models.Index(fields=['slug', 'updated_at'], condition=models.Q(appid__isnull=False), name='game_slug_has_appid'),
+        ]
+
+    @classmethod
+    def refresh_review_stats(cls, game_id) -> None:
+        """Пересчитать review_count/avg_rating одной агрегацией + UPDATE."""
+        agg = Review.objects.filter(game_id=game_id).aggregate(c=models.Count('id'), a=models.Avg('rating'))
+        avg = agg['a']
+        if avg is not None:
+            avg = Decimal(str(avg)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        cls.objects.filter(pk=game_id).update(review_count=agg['c'] or 0, avg_rating=avg)
+
+    @classmethod
+    def build(cls, title: str, **kwargs):
+        """Несохранённая игра с готовым slug (для bulk_create)."""
+        return cls(title=title, slug=slugify(title), **kwargs)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -126,7 +228,7 @@ class Screenshot(models.Model):
         ordering = ['order']
 
     def __str__(self):
-        return f"{self.game.title} - {self.caption or self.image.name}"
+        return f"Game#{self.game_id} - {self.caption or self.image.name}"
 
 
 
@@ -137,8 +239,14 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # корзина пользователя: filter(user=...).order_by('-added_at')
+            models.Index(fields=['user', '-added_at'], name='cartitem_user_added_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.user.username} - {self.game.title} x{self.quantity}"
+        return f"User#{self.user_id} Game#{self.game_id} x{self.quantity}"
 
 # Заказ: связывает пользователя, игры, статус, сумму
 class Order(models.Model):
@@ -155,6 +263,38 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # «Мои неоплаченные заказы»: в индекс попадают только pending
+            models.Index(fields=['user', 'status'], condition=models.Q(status='pending'), name='order_pending_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(status__in=['pending', 'paid', 'cancelled']), name='order_status_valid'),
+        ]
+
+    def compute_total(self) -> Decimal:
+        """Сумма позиций (price * quantity) считается в БД, без загрузки строк.
+
+        Один GROUP BY по валюте; позиции в другой валюте конвертируются в order.currency.
+        """
+        from store.utils.currency import convert_amount
+        line = models.ExpressionWrapper(F('price') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        total = Decimal('0.00')
+        for row in self.items_snapshot.order_by().values('currency').annotate(t=models.Sum(line)):
+            amount = Decimal(str(row['t'] or 0))
+            if row['currency'] != self.currency:
+                amount = convert_amount(amount, row['currency'], self.currency)
+            total += amount
+        return total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def refresh_total(self) -> Decimal:
+        """Пересчитать и сохранить total_price одним UPDATE."""
+        self.total_price = self.compute_total()
+        Order.objects.filter(pk=self.pk).update(total_price=self.total_price)
+        return self.total_price
+
     def __str__(self):
         return f"Order #{self.id} by {self.user.username} ({self.status})"
 
@@ -167,11 +307,28 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     currency = models.CharField(max_length=5, choices=Game.CURRENCY_CHOICES, default='USD')
 
+    @classmethod
+    def create_from_cart(cls, order, cart_items):
+        """Снимок позиций корзины в заказ одним bulk_create (cart_items — с select_related('game'))."""
+        objs = [
+            cls(
+                order=order,
+                game=ci.game,
+                quantity=ci.quantity or 1,
+                price=ci.game.price or Decimal('0.00'),
+                currency=ci.game.currency or order.currency,
+            )
+            for ci in cart_items
+        ]
+        batch_size = getattr(settings, 'STORE_BULK_BATCH_SIZE', 500)
+        with transaction.atomic():
+            return cls.objects.bulk_create(objs, batch_size=batch_size)
+
     def line_total(self) -> Decimal:
         return (self.price or Decimal('0')) * Decimal(self.quantity or 1)
 
     def __str__(self):
-        return f"{self.game.title} x{self.quantity} for Order #{self.order_id}"
+        return f"Game#{self.game_id} x{self.quantity} for Order #{self.order_id}"
 
 
 class OwnedGame(models.Model):
@@ -195,9 +352,27 @@ class OwnedGame(models.Model):
 
     class Meta:
         unique_together = ('user', 'game', 'source')
+        indexes = [
+            # "недавняя активность" в профиле: filter(user=...).order_by('-last_played')
+            models.Index(fields=['user', '-last_played'], name='owned_user_last_played_idx'),
+        ]
+
+    @classmethod
+    def upsert_many(cls, objs, update_fields):
+        """INSERT ... ON CONFLICT (user, game, source) DO UPDATE — одним запросом на пачку.
+
+        objs — несохранённые экземпляры (без pk); при конфликте обновляются только update_fields.
+        """
+        return cls.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['user', 'game', 'source'],
+            update_fields=update_fields,
+            batch_size=getattr(settings, 'STORE_BULK_BATCH_SIZE', 500),
+        )
 
     def __str__(self):
-        return f"{self.user} owns {self.game} ({self.source})"
+        return f"User#{self.user_id} owns Game#{self.game_id} ({self.source})"
 
 # Отзыв: пользователь, игра, текст, рейтинг
 class Review(models.Model):
@@ -217,6 +392,8 @@ class Review(models.Model):
     text = models.TextField(blank=True)
     rating = models.DecimalField(max_digits=2, decimal_places=1, default=Decimal('0.0'))
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ReviewQuerySet.as_manager()
     class Meta:
         unique_together = ('user', 'game')
         ordering = ['-created_at']
@@ -250,6 +427,10 @@ class ReviewVote(models.Model):
 
     class Meta:
         unique_together = ('review', 'user')
+        indexes = [
+            # подсчёт helpful yes/no по отзыву
+            models.Index(fields=['review', 'helpful'], name='reviewvote_review_helpful_idx'),
+        ]
 
     def __str__(self):
         sign = '+' if self.helpful else '-'
@@ -293,7 +474,7 @@ class UserProfile(models.Model):
     ]
     comment_privacy = models.CharField(max_length=10, choices=COMMENT_PRIVACY_CHOICES, default='public')
     friend_request_privacy = models.CharField(max_length=10, choices=FRIEND_REQUEST_PRIVACY_CHOICES, default='public')
-    wishlist = models.ManyToManyField(Game, blank=True, related_name='wishlisted_by')
+    wishlist = models.ManyToManyField(Game, blank=True, through='WishlistEntry', related_name='wishlisted_by')
     # track how much the user has spent on the platform (used to determine limited accounts)
     total_spent = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     # Текущий баланс кошелька пользователя (в валюте preferred_currency на момент последнего обновления).
@@ -330,6 +511,14 @@ class UserProfile(models.Model):
     # Публичный уникальный код для добавления в друзья (не зависит от username, стабильный).
     friend_code = models.CharField(max_length=16, unique=True, blank=True, null=True, help_text="Публичный код для добавления в друзья (вводится на странице 'Мои друзья')")
 
+    class Meta:
+        # Значения choices проверяет и БД (в т.ч. для update()/bulk_update(), минуя full_clean)
+        constraints = [
+            models.CheckConstraint(condition=models.Q(privacy__in=['public', 'friends', 'private']), name='userprofile_privacy_valid'),
+            models.CheckConstraint(condition=models.Q(comment_privacy__in=['public', 'friends', 'nobody']), name='userprofile_comment_privacy_valid'),
+            models.CheckConstraint(condition=models.Q(friend_request_privacy__in=['public', 'friends', 'nobody']), name='userprofile_fr_privacy_valid'),
+        ]
+
     def add_spending(self, amount):
         """Increase user's total_spent by Decimal amount and save."""
         try:
@@ -360,9 +549,12 @@ class UserProfile(models.Model):
                 amt = convert_amount(amt, cur, self.preferred_currency)
             except Exception:
                 pass
-        self.balance += amt
-        if save:
-            self.save(update_fields=['balance'])
+        if not save:
+            self.balance += amt
+            return
+        # Арифметика в БД: без гонки read-modify-write между параллельными запросами
+        UserProfile.objects.filter(pk=self.pk).update(balance=_balance_expr(F('balance') + amt))
+        self.refresh_from_db(fields=['balance'])
 
     def deduct_balance(self, amount, currency: str | None = None, allow_negative: bool = False, save: bool = True) -> bool:
         """Списать сумму с баланса. Возвращает True при успехе.
@@ -383,12 +575,19 @@ class UserProfile(models.Model):
                 amt = convert_amount(amt, cur, self.preferred_currency)
             except Exception:
                 pass
-        new_balance = self.balance - amt
-        if not allow_negative and new_balance < Decimal('0.00'):
+        if not save:
+            new_balance = self.balance - amt
+            if not allow_negative and new_balance < Decimal('0.00'):
+                return False
+            self.balance = new_balance
+            return True
+        qs = UserProfile.objects.filter(pk=self.pk)
+        if not allow_negative:
+            # проверка "хватает ли средств" — в том же UPDATE, атомарно
+            qs = qs.filter(balance__gte=amt)
+        if not qs.update(balance=_balance_expr(F('balance') - amt)):
             return False
-        self.balance = new_balance
-        if save:
-            self.save(update_fields=['balance'])
+        self.refresh_from_db(fields=['balance'])
         return True
 
     def convert_balance(self, new_currency: str, save: bool = True):
@@ -428,56 +627,132 @@ class UserProfile(models.Model):
         length: целевая длина.
         Возвращает строку, без гарантии уникальности (проверяется вызывающим кодом).
         """
-        import secrets, string
-        alphabet = ''.join([c for c in string.ascii_uppercase + string.digits if c not in {'O', '0', 'I', '1'}])
-        return ''.join(secrets.choice(alphabet) for _ in range(length))
+        # 32 символа -> маска 0x1F по случайному байту даёт равномерное распределение
+        return ''.join(_FRIEND_CODE_ALPHABET[b & 0x1F] for b in secrets.token_bytes(length))
 
     def ensure_friend_code(self):
         """Убедиться, что friend_code установлен. При коллизии пытается повторно.
 
+        Один UPDATE ... WHERE friend_code IS NULL на попытку: уникальность гарантирует
+        индекс (IntegrityError -> новая попытка), без предварительных exists()-проверок.
         Максимум 10 попыток прежде чем сдаться (маловероятно при длине 10).
         """
         if self.friend_code:
             return self.friend_code
-        attempts = 0
-        while attempts < 10:
-            code = self.generate_friend_code()
-            if not UserProfile.objects.filter(friend_code=code).exists():
-                self.friend_code = code
-                try:
-                    self.save(update_fields=['friend_code'])
-                except Exception:
-                    # Если редкая гонка – повторяем
-                    attempts += 1
-                    continue
-                return code
-            attempts += 1
+        if self.pk is None:
+            return None
+        for _ in range(10):
+            if self._claim_friend_code(self.generate_friend_code()):
+                return self.friend_code
         # Fallback: используем user.id в base36 (не самый красивый, но уникальный)
-        try:
-            base36 = ''
-            n = int(self.user.id)
-            chars = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-            if n == 0:
-                base36 = '0'
-            else:
-                while n > 0:
-                    n, r = divmod(n, 36)
-                    base36 = chars[r] + base36
-            self.friend_code = (base36 or 'U')[:16]
-            self.save(update_fields=['friend_code'])
-        except Exception:
-            pass
-        return self.friend_code
+        n = int(self.user_id)
+        chars = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        base36 = ''
+        while n > 0:
+            n, r = divmod(n, 36)
+            base36 = chars[r] + base36
+        if self._claim_friend_code((base36 or 'U')[:16]):
+            return self.friend_code
+        # и base36-код занят (или профиль уже удалён) — кода нет, вызывающий получит None
+        return None
 
-    def save(self, *args, **kwargs):
-        # При первом сохранении профиля гарантируем наличие friend_code
-        super().save(*args, **kwargs)
-        if not self.friend_code:
-            # Отдельно вызываем ensure после первичного сохранения, чтобы был доступен self.id / user.id
+    @classmethod
+    def backfill_friend_codes(cls, batch: int = 1000) -> int:
+        """Массово выдать friend_code профилям без кода.
+
+        Занятые коды читаются одним values_list в set, новые генерируются в памяти
+        с проверкой по нему и пишутся bulk_update пачками — вместо UPDATE на профиль.
+        Если параллельно кто-то занял тот же код (IntegrityError), пачка
+        досоздаётся поштучно через ensure_friend_code. Возвращает число обновлённых.
+        """
+        missing = models.Q(friend_code__isnull=True) | models.Q(friend_code='')
+        existing = set(cls.objects.exclude(missing).values_list('friend_code', flat=True))
+        bulk_size = getattr(settings, 'STORE_BULK_BATCH_SIZE', 500)
+        updated = 0
+        last_pk = 0
+        while True:
+            profiles = list(cls.objects.filter(missing, pk__gt=last_pk).order_by('pk').only('pk', 'user_id', 'friend_code')[:batch])
+            if not profiles:
+                break
+            last_pk = profiles[-1].pk
+            for p in profiles:
+                code = cls.generate_friend_code()
+                while code in existing:
+                    code = cls.generate_friend_code()
+                existing.add(code)
+                p.friend_code = code
             try:
-                self.ensure_friend_code()
-            except Exception:
-                pass
+                with transaction.atomic():
+                    cls.objects.bulk_update(profiles, ['friend_code'], batch_size=bulk_size)
+            except IntegrityError:
+                for p in profiles:
+                    p.friend_code = None
+                    p.ensure_friend_code()
+            updated += len(profiles)
+        return updated
+
+    def _claim_friend_code(self, code: str) -> bool:
+        """Атомарно записать code, если у профиля ещё нет friend_code.
+
+        False — коллизия, профиль не сохранён или его строки уже нет.
+        """
+        if self.pk is None:
+            return False
+        try:
+            with transaction.atomic():
+                updated = (
+                    UserProfile.objects
+                    .filter(pk=self.pk)
+                    .filter(models.Q(friend_code__isnull=True) | models.Q(friend_code=''))
+                    .update(friend_code=code)
+                )
+        except IntegrityError:
+            return False
+        if updated:
+            self.friend_code = code
+            return True
+        # код уже выставлен параллельно (другой запрос/воркер) — берём его; строки нет — False
+        row = UserProfile.objects.filter(pk=self.pk).values('friend_code').first()
+        if row is None or not row['friend_code']:
+            return False
+        self.friend_code = row['friend_code']
+        return True
+
+
+class WishlistEntry(models.Model):
+    """Строка вишлиста (through для UserProfile.wishlist).
+
+    last_notified_price — цена, о которой уже уведомили; cron по снижению цены
+    фильтрует прямо по ней, без повторного перебора всех игр.
+    """
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='wishlist_entries')
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='wishlist_entries')
+    added_at = models.DateTimeField(auto_now_add=True)
+    last_notified_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        unique_together = ('profile', 'game')
+        indexes = [
+            models.Index(fields=['game', 'last_notified_price'], name='wishlist_game_notified_idx'),
+        ]
+
+    def __str__(self):
+        return f"Wishlist({self.profile_id} → {self.game_id})"
+
+
+def _balance_expr(expr):
+    """Округление до 2 знаков: на SQLite decimal-арифметика идёт во float."""
+    return Round(expr, 2, output_field=models.DecimalField(max_digits=12, decimal_places=2))
+
+
+def _to_cents(value) -> int:
+    """Decimal/число -> целые центы (округление half-up)."""
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def _from_cents(cents) -> Decimal:
+    """Целые центы -> Decimal с двумя знаками (200 -> Decimal('2.00'))."""
+    return Decimal(int(cents)).scaleb(-2)
 
 
 class WalletTransaction(models.Model):
@@ -489,6 +764,9 @@ class WalletTransaction(models.Model):
     balance_after: баланс пользователя сразу после применения операции (в той же валюте, что и amount – preferred_currency).
     description: человеко-читаемое пояснение.
     created_at: время фиксации.
+
+    Суммы хранятся в центах (BIGINT *_cents) — узкие строки и быстрые SUM; amount/source_amount/
+    balance_after остаются Decimal-свойствами, поэтому create(amount=...) и шаблоны работают как раньше.
     """
     KIND_CHOICES = [
         ('topup', 'Пополнение'),
@@ -497,24 +775,58 @@ class WalletTransaction(models.Model):
         ('refund', 'Возврат'),
     ]
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallet_transactions')
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount_cents = models.BigIntegerField(help_text="Сумма в центах (amount * 100)")
     currency = models.CharField(max_length=5, choices=Game.CURRENCY_CHOICES, help_text="Валюта amount (preferred_currency пользователя).")
-    source_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Исходная введённая сумма (если отличалась)")
+    source_amount_cents = models.BigIntegerField(null=True, blank=True, help_text="Исходная введённая сумма в центах (если отличалась)")
     source_currency = models.CharField(max_length=5, choices=Game.CURRENCY_CHOICES, null=True, blank=True)
     kind = models.CharField(max_length=20, choices=KIND_CHOICES)
-    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after_cents = models.BigIntegerField(help_text="Баланс после операции в центах")
     description = models.CharField(max_length=300, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        # На PostgreSQL дополнительно есть покрывающий wallettx_user_ts_cover (миграция 0054)
         indexes = [
             models.Index(fields=['user', 'created_at']),
-            models.Index(fields=['user', 'kind']),
+            # фильтр истории по типу операции + сортировка по дате
+            models.Index(fields=['user', 'kind', '-created_at'], name='wallettx_user_kind_created_idx'),
         ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(kind__in=['topup', 'purchase_deduct', 'manual_adjust', 'refund']), name='wallettx_kind_valid'),
+        ]
+
+    @classmethod
+    def bulk_log(cls, txns):
+        """Записать пачку транзакций одним INSERT (вызывать в той же atomic, что и изменение баланса)."""
+        return cls.objects.bulk_create(txns, batch_size=getattr(settings, 'STORE_BULK_BATCH_SIZE', 500))
+
+    @property
+    def amount(self) -> Decimal:
+        return _from_cents(self.amount_cents)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = _to_cents(value)
+
+    @property
+    def source_amount(self) -> Decimal | None:
+        return None if self.source_amount_cents is None else _from_cents(self.source_amount_cents)
+
+    @source_amount.setter
+    def source_amount(self, value):
+        self.source_amount_cents = None if value is None else _to_cents(value)
+
+    @property
+    def balance_after(self) -> Decimal:
+        return _from_cents(self.balance_after_cents)
+
+    @balance_after.setter
+    def balance_after(self, value):
+        self.balance_after_cents = _to_cents(value)
 
     def __str__(self):
-        sign = '+' if self.amount >= 0 else '-'
+        sign = '+' if self.amount_cents >= 0 else '-'
         return f"{self.user} {sign}{abs(self.amount):.2f} {self.currency} ({self.kind})"
 
 
@@ -544,6 +856,9 @@ class SupportTicket(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(status__in=['new', 'in_progress', 'closed']), name='supportticket_status_valid'),
+        ]
 
     def __str__(self):
         who = self.user.username if self.user else (self.email or 'anonymous')
@@ -564,6 +879,9 @@ class SupportMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']  # хронологический порядок для удобства чтения
+        indexes = [
+            models.Index(fields=['ticket', 'created_at'], name='supportmsg_ticket_created_idx'),
+        ]
 
     def __str__(self):
         return f"Msg #{self.id} for Ticket #{self.ticket_id}"
@@ -615,6 +933,33 @@ class Friendship(models.Model):
         return f"Friendship({self.user_a} ↔ {self.user_b})"
 
 
+FRIENDS_CACHE_TTL = 60 * 60
+
+
+def _friends_cache_key(user_id) -> str:
+    return f'friends:{user_id}'
+
+
+def friends_of(user_id) -> frozenset:
+    """id друзей пользователя (frozenset), закешировано в django cache.
+
+    Кеш сбрасывается сигналами post_save/post_delete на Friendship (store/signals.py).
+    """
+    from django.core.cache import cache
+    key = _friends_cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        pairs = Friendship.objects.filter(models.Q(user_a_id=user_id) | models.Q(user_b_id=user_id)).values_list('user_a_id', 'user_b_id')
+        ids = frozenset(b if a == user_id else a for a, b in pairs)
+        cache.set(key, ids, FRIENDS_CACHE_TTL)
+    return ids
+
+
+def invalidate_friends_cache(*user_ids) -> None:
+    from django.core.cache import cache
+    cache.delete_many([_friends_cache_key(uid) for uid in user_ids])
+
+
 class ProfileCommentSubscription(models.Model):
     """Подписка пользователя на комментарии на конкретном профиле."""
     subscriber = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile_comment_subs')
@@ -663,16 +1008,25 @@ class Notification(models.Model):
     ]
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    # На PostgreSQL есть GIN-индекс notif_payload_gin (миграция 0050) — используйте payload__contains.
+    # Бинарный payload (struct) не вводим: у всех kind'ов в полезной нагрузке строки переменной длины
+    # (название игры, цена с валютой, имена пользователей, тема тикета), а GIN работает только по jsonb.
     payload = models.JSONField(default=dict, blank=True)
     link_url = models.CharField(max_length=300, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    # TTL / auto-expire можно реализовать через периодическую задачу, пока просто поле для будущей чистки
+    # TTL: просроченные уведомления удаляет команда cleanup_notifications (пачками)
     expires_at = models.DateTimeField(null=True, blank=True, help_text="Когда уведомление можно авто-удалить")
 
     class Meta:
         ordering = ['-created_at']
-        indexes = [models.Index(fields=['user', 'is_read', 'created_at'])]
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at']),
+            # Для cleanup_notifications: в индекс попадают только уведомления с TTL
+            models.Index(fields=['expires_at'], condition=models.Q(expires_at__isnull=False), name='notif_expires_idx'),
+            # Только непрочитанные: счётчик в шапке и bulk_mark_read работают по маленькому индексу
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='notif_unread_user_idx'),
+        ]
 
     def __str__(self):
         return f"Notify {self.user} {self.kind}"
@@ -683,9 +1037,15 @@ class Notification(models.Model):
             self.is_read = True
             self.save(update_fields=['is_read'])
 
+    @classmethod
+    def fanout(cls, user_ids, kind, payload, link_url=''):
+        """Одно и то же уведомление многим получателям: multi-row INSERT пачками вместо create() в цикле."""
+        notifs = [cls(user_id=uid, kind=kind, payload=payload, link_url=link_url) for uid in user_ids]
+        return cls.objects.bulk_create(notifs, batch_size=getattr(settings, 'STORE_BULK_BATCH_SIZE', 500))
+
     @classmethod
     def bulk_mark_read(cls, user):
-        """Быстро отметить все непрочитанные уведомления пользователя."""
+        """Быстро отметить все непрочитанные уведомления пользователя (индекс notif_unread_user_idx)."""
         return cls.objects.filter(user=user, is_read=False).update(is_read=True)
 
 
@@ -697,13 +1057,17 @@ class CurrencyRate(models.Model):
     base = models.CharField(max_length=5)
     target = models.CharField(max_length=5)
     rate = models.DecimalField(max_digits=18, decimal_places=8)
+    # rate × 1_000_000 целым числом — для быстрой конвертации цен на витрине (int вместо Decimal).
+    # Заполняется из rate (сигнал pre_save; bulk_create в utils.currency проставляет сам).
+    rate_micro = models.BigIntegerField(null=True, blank=True)
     fetched_at = models.DateTimeField(auto_now_add=True)
 
+    RATE_MICRO = 1_000_000
+
     class Meta:
-        indexes = [
-            models.Index(fields=['base', 'target']),
-            models.Index(fields=['fetched_at']),
-        ]
+        # Отдельных индексов нет: уникальный (base, target, fetched_at) своим левым префиксом
+        # обслуживает выборки по base / (base, target) и "последний курс" обратным проходом.
+        # Для чистки по fetched_at на PostgreSQL есть BRIN curr_fetched_brin (миграция 0044).
         unique_together = ('base', 'target', 'fetched_at')
 
     def __str__(self):
@@ -713,21 +1077,74 @@ class CurrencyRate(models.Model):
     def latest_rate(cls, base: str, target: str):
         """Вернуть Decimal курса для самой свежей записи или None."""
         try:
-            obj = (
+            return (
                 cls.objects
                 .filter(base=base, target=target)
                 .order_by('-fetched_at')
+                .values_list('rate', flat=True)
                 .first()
             )
-            return obj.rate if obj else None
         except Exception:
             return None
 
+    @classmethod
+    def to_micro(cls, rate) -> int:
+        """Курс (Decimal/float/str) -> целые микроединицы с округлением."""
+        return int((Decimal(str(rate)) * cls.RATE_MICRO).to_integral_value(rounding=ROUND_HALF_UP))
+
+    @classmethod
+    def latest_rate_micro(cls, base: str, target: str) -> int | None:
+        """Как latest_rate, но курс в микроединицах (int) или None."""
+        try:
+            row = (
+                cls.objects
+                .filter(base=base, target=target)
+                .order_by('-fetched_at')
+                .values_list('rate_micro', 'rate')
+                .first()
+            )
+        except Exception:
+            return None
+        if row is None:
+            return None
+        micro, rate = row
+        return micro if micro is not None else cls.to_micro(rate)
+
+    @classmethod
+    def latest_rates_map(cls, pairs) -> dict:
+        """Самые свежие курсы для набора пар (base, target) одним запросом.
+
+        PostgreSQL: DISTINCT ON (base, target); остальные БД — ROW_NUMBER() по окну.
+        Возвращает {(base, target): Decimal}; пар без записей в словаре нет.
+        """
+        pairs = set(pairs)
+        if not pairs:
+            return {}
+        cond = models.Q()
+        for base, target in pairs:
+            cond |= models.Q(base=base, target=target)
+        qs = cls.objects.filter(cond)
+        if connections[qs.db].vendor == 'postgresql':
+            qs = qs.order_by('base', 'target', '-fetched_at').distinct('base', 'target')
+        else:
+            qs = qs.annotate(
+                rn=models.Window(
+                    expression=RowNumber(),
+                    partition_by=[F('base'), F('target')],
+                    order_by=F('fetched_at').desc(),
+                )
+            ).filter(rn=1)
+        return {(base, target): rate for base, target, rate in qs.values_list('base', 'target', 'rate')}
+
 
 class PriceSnapshot(models.Model):
     """Ежедневный снимок цены игры для отслеживания изменений.
 
-    Используется для уведомлений о снижении цены в вишлисте.
+    Используется для уведомлений о снижении цены в вишлисте. Последний снимок для
+    списка игр берите через prefetch, а не game.price_snapshots.latest() в цикле::
+
+        games = qs.prefetch_related(PriceSnapshot.latest_prefetch())
+        snap = game.latest_snapshot_list[0] if game.latest_snapshot_list else None
     """
     game = models.ForeignKey('Game', on_delete=models.CASCADE, related_name='price_snapshots')
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -736,6 +1153,8 @@ class PriceSnapshot(models.Model):
 
     class Meta:
         unique_together = ('game', 'snapshot_date')
+        # На PostgreSQL дополнительно есть BRIN pricesnap_date_brin по snapshot_date (миграция 0044)
+        # и покрывающий pricesnap_game_date_cover (game_id, snapshot_date DESC) INCLUDE (price, currency) (0056)
         indexes = [
             models.Index(fields=['game', 'snapshot_date']),
         ]
@@ -743,6 +1162,57 @@ class PriceSnapshot(models.Model):
     def __str__(self):
         return f"{self.game.title} {self.price} {self.currency} @ {self.snapshot_date}"
 
+    @classmethod
+    def latest_prefetch(cls, to_attr='latest_snapshot_list'):
+        """Prefetch только последнего снимка по каждой игре — один SELECT на весь queryset.
+
+        Срез в Prefetch Django превращает в ROW_NUMBER() OVER (PARTITION BY game_id),
+        поэтому работает и на SQLite (DISTINCT ON есть только в PostgreSQL).
+        """
+        return Prefetch(
+            'price_snapshots',
+            queryset=cls.objects.order_by('-snapshot_date')[:1],
+            to_attr=to_attr,
+        )
+
+    @classmethod
+    def upsert_daily(cls, rows):
+        """INSERT ... ON CONFLICT (game, snapshot_date) DO UPDATE price/currency — пачками.
+
+        rows — итерируемое (game_id, price, currency, snapshot_date).
+        """
+        objs = [cls(game_id=g, price=p, currency=c, snapshot_date=d) for g, p, c, d in rows]
+        return cls.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['game', 'snapshot_date'],
+            update_fields=['price', 'currency'],
+            batch_size=getattr(settings, 'STORE_BULK_BATCH_SIZE', 500),
+        )
+
+    @classmethod
+    def latest_two_per_game(cls, game_ids, until=None) -> dict:
+        """Два последних снимка по каждой игре одним запросом (ROW_NUMBER() по game_id).
+
+        until: учитывать снимки не позже этой даты. Возвращает {game_id: [новейший, предыдущий]}
+        (список короче, если снимков меньше). На PostgreSQL запрос читает покрывающий
+        индекс pricesnap_game_date_cover (миграция 0056).
+        """
+        qs = cls.objects.filter(game_id__in=list(game_ids))
+        if until is not None:
+            qs = qs.filter(snapshot_date__lte=until)
+        qs = qs.annotate(
+            rn=models.Window(
+                expression=RowNumber(),
+                partition_by=[F('game_id')],
+                order_by=F('snapshot_date').desc(),
+            )
+        ).filter(rn__lte=2).order_by('game_id', '-snapshot_date')
+        latest = {}
+        for snap in qs:
+            latest.setdefault(snap.game_id, []).append(snap)
+        return latest
+
 
 class FriendshipRequest(models.Model):
     """Запрос на дружбу (двухшаговая дружба)."""
@@ -760,7 +1230,18 @@ class FriendshipRequest(models.Model):
 
     class Meta:
         unique_together = ('sender', 'receiver')
-        indexes = [models.Index(fields=['receiver', 'status'])]
+        # Все выборки идут по status='pending' (бейдж входящих, исходящие на странице друзей):
+        # частичные индексы содержат только ожидающие заявки, а не всю историю
+        indexes = [
+            models.Index(fields=['receiver'], condition=models.Q(status='pending'), name='fr_pending_by_recv'),
+            models.Index(fields=['sender'], condition=models.Q(status='pending'), name='fr_pending_by_sender'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(status__in=['pending', 'accepted', 'rejected', 'cancelled']),
+                name='friendreq_status_valid',
+            ),
+        ]
 
     def __str__(self):
         return f"FR {self.sender} -> {self.receiver} [{self.status}]"
@@ -0,0 +1,85 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import CurrencyRate, Friendship, Game, Genre, Review, UserProfile, invalidate_friends_cache
+from .templatetags.store_extras import invalidate_category_covers
+from .utils.i18n import remember_language
+
+
+@receiver(user_logged_in)
+def store_preferred_language(sender, request, user, **kwargs):
+    """Кладём preferred_language в сессию при логине (см. LanguagePreferenceMiddleware)."""
+    prof = getattr(user, 'profile', None)
+    if request is not None and prof is not None:
+        remember_language(request, prof.preferred_language)
+
+
+@receiver(post_save, sender=UserProfile)
+def assign_friend_code(sender, instance, created, **kwargs):
+    """friend_code выдаём после коммита, вне транзакции создания профиля.
+
+    robust=True: сбой выдачи кода логируется и не ломает остальные on_commit-колбэки.
+    """
+    if created and not instance.friend_code:
+        transaction.on_commit(instance.ensure_friend_code, robust=True)
+
+
+@receiver([post_save, post_delete], sender=Friendship)
+def reset_friends_cache(sender, instance, **kwargs):
+    invalidate_friends_cache(instance.user_a_id, instance.user_b_id)
+
+
+@receiver(pre_save, sender=CurrencyRate)
+def fill_rate_micro(sender, instance, **kwargs):
+    if instance.rate is not None:
+        instance.rate_micro = CurrencyRate.to_micro(instance.rate)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def refresh_game_review_stats(sender, instance, **kwargs):
+    Game.refresh_review_stats(instance.game_id)
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def reset_category_cover_for_genre(sender, instance, **kwargs):
+    invalidate_category_covers([instance.slug])
+
+
+# поля, от которых зависит обложка категории (выбор игры и её URL)
+_CATEGORY_COVER_FIELDS = frozenset({'cover_image', 'appid', 'created_at'})
+
+
+@receiver(post_save, sender=Game)
+def reset_category_covers_for_game(sender, instance, created, update_fields=None, **kwargs):
+    # у только что созданной игры жанров ещё нет — их добавление ловит m2m_changed
+    if created:
+        return
+    if update_fields is not None and not _CATEGORY_COVER_FIELDS.intersection(update_fields):
+        return
+    invalidate_category_covers(instance.genres.values_list('slug', flat=True))
+
+
+@receiver(pre_delete, sender=Game)
+def remember_category_covers_for_game(sender, instance, **kwargs):
+    # к post_delete связи с жанрами уже удалены каскадом — запоминаем slug'и заранее
+    instance._cover_genre_slugs = list(instance.genres.values_list('slug', flat=True))
+
+
+@receiver(post_delete, sender=Game)
+def reset_category_covers_for_deleted_game(sender, instance, **kwargs):
+    invalidate_category_covers(getattr(instance, '_cover_genre_slugs', ()))
+
+
+@receiver(m2m_changed, sender=Game.genres.through)
+def reset_category_covers_for_genres(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if isinstance(instance, Game):
+        if action == 'pre_clear':
+            invalidate_category_covers(instance.genres.values_list('slug', flat=True))
+        elif pk_set:
+            invalidate_category_covers(Genre.objects.filter(pk__in=pk_set).values_list('slug', flat=True))
+    else:
+        invalidate_category_covers([instance.slug])
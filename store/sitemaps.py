@@ -1,5 +1,15 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
-from django.urls import reverse
+from django.contrib.sitemaps import views as sitemap_views
+from django.core.paginator import EmptyPage
+from django.http import FileResponse
+from django.template import loader
+from django.urls import get_script_prefix, reverse
 from .models import Game
 
 
@@ -8,14 +18,20 @@ class GameSitemap(Sitemap):
     priority = 0.8
 
     def items(self):
-        # Only index games that have valid slugs and appids
-        return Game.objects.filter(appid__isnull=False).only('slug', 'updated_at')
+        # Only index games that have valid slugs and appids.
+        # values() вместо моделей: на строку — маленький dict, без Model.__init__ и deferred-полей.
+        # Именно QuerySet (не iterator): пагинатору карты сайта нужны count() и срезы.
+        return (
+            Game.objects.filter(appid__isnull=False)
+            .order_by('slug')
+            .values('slug', 'updated_at')
+        )
 
     def location(self, obj):
-        return reverse('store:game_detail', args=[obj.slug])
+        return reverse('store:game_detail', args=[obj['slug']])
 
     def lastmod(self, obj):
-        return getattr(obj, 'updated_at', None)
+        return obj['updated_at']
 
 
 class StaticViewSitemap(Sitemap):
@@ -33,4 +49,74 @@ class StaticViewSitemap(Sitemap):
         ]
 
     def location(self, item):
-        return reverse(item)
+        return self._resolve(item, get_script_prefix())
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _resolve(name, script_prefix):
+        # набор имён фиксированный — reverse() один раз на имя; префикс в ключе на случай SCRIPT_NAME
+        return reverse(name)
+
+
+SITEMAPS = {
+    'static': StaticViewSitemap,
+    'games': GameSitemap,
+}
+
+SITEMAP_CACHE_SECONDS = 60 * 60
+
+
+def sitemap_dir() -> Path:
+    return Path(settings.MEDIA_ROOT) / 'sitemaps'
+
+
+def _page_filename(page: int) -> str:
+    return 'sitemap.xml' if page == 1 else f'sitemap-{page}.xml'
+
+
+def write_sitemap_files(domain: str, protocol: str = 'https') -> list[Path]:
+    """Отрендерить все страницы карты сайта в MEDIA_ROOT/sitemaps/ (для regenerate_sitemap).
+
+    Страница N объединяет N-е страницы всех разделов, как и ?p=N у стандартного view.
+    Файлы пишутся через временный + os.replace, чтобы view не отдал недописанный XML.
+    """
+    site = SimpleNamespace(domain=domain, name=domain)
+    maps = [cls() for cls in SITEMAPS.values()]
+    num_pages = max(m.paginator.num_pages for m in maps)
+    out_dir = sitemap_dir()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for page in range(1, num_pages + 1):
+        urls = []
+        for m in maps:
+            try:
+                urls.extend(m.get_urls(page=page, site=site, protocol=protocol))
+            except EmptyPage:
+                continue
+        xml = loader.render_to_string('sitemap.xml', {'urlset': urls})
+        path = out_dir / _page_filename(page)
+        tmp = path.with_suffix('.xml.tmp')
+        tmp.write_text(xml, encoding='utf-8')
+        os.replace(tmp, path)
+        written.append(path)
+    # страниц стало меньше — старые sitemap-N.xml иначе продолжат отдаваться view
+    for stale in out_dir.glob('sitemap-*.xml'):
+        suffix = stale.stem.rpartition('-')[2]
+        if suffix.isdigit() and int(suffix) > num_pages:
+            stale.unlink(missing_ok=True)
+    return written
+
+
+def sitemap_xml(request):
+    """Отдать заранее сгенерированный sitemap (regenerate_sitemap) без обращений к БД.
+
+    Если файла ещё нет — рендерим на лету стандартным view.
+    """
+    page = request.GET.get('p', '1')
+    if page.isdigit() and int(page) >= 1:
+        path = sitemap_dir() / _page_filename(int(page))
+        if path.is_file():
+            resp = FileResponse(path.open('rb'), content_type='application/xml')
+            resp['Cache-Control'] = f'public, max-age={SITEMAP_CACHE_SECONDS}'
+            return resp
+    return sitemap_views.sitemap(request, sitemaps=SITEMAPS)
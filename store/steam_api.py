@@ -8,19 +8,28 @@ Usage:
 This file is intentionally simple for the MVP. For production, add error handling,
 rate-limiting, caching, and storage via Django's Storage API (S3 etc.).
 """
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import hashlib
 import os
-import urllib.request
+import re
+import threading
 import urllib.error
-import json
-from urllib.parse import urlparse
+import urllib3
 
-# Minimal requests-like shim using urllib to avoid requiring the external 'requests' package.
+try:
+    # orjson парсит bytes напрямую (без decode) и заметно быстрее на 50–200 КБ ответах appdetails
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover - необязательная зависимость
+    from json import loads as json_loads
+
+# Minimal requests-like shim over urllib3 to avoid requiring the external 'requests' package.
 # It provides the parts of the API used in this file: get(...), Response.content, Response.json(), Response.raise_for_status().
 class _SimpleResponse:
-    def __init__(self, content: bytes, status: int, url: str):
+    def __init__(self, content: bytes, status: int, url: str, headers=None):
         self.content = content
         self.status_code = status
+        self.headers = headers or {}
         self._url = url
         self._json = None
 
@@ -30,31 +39,49 @@ class _SimpleResponse:
 
     def json(self):
         if self._json is None:
-            # decode as utf-8 and parse JSON
-            self._json = json.loads(self.content.decode('utf-8'))
+            # parse JSON straight from bytes (UTF-8)
+            self._json = json_loads(self.content)
         return self._json
 
-def _requests_get(url, timeout=10):
-    req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        data = resp.read()
-        status = resp.getcode()
-        return _SimpleResponse(data, status, url)
+# Общий пул соединений на процесс: keep-alive + повторное использование TLS-сессий
+# к store.steampowered.com вместо нового соединения на каждый запрос.
+# urllib3 потокобезопасен (fetch_app_and_images качает в нескольких потоках).
+POOL = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=10,
+    block=False,
+    headers={'User-Agent': 'Mozilla/5.0'},
+    retries=urllib3.Retry(total=2, backoff_factor=0.1),
+)
+
+
+def _requests_get(url, timeout=10, headers=None):
+    # заголовки запроса в urllib3 заменяют заголовки пула целиком — дополняем их
+    req_headers = {**POOL.headers, **headers} if headers else None
+    resp = POOL.request('GET', url, timeout=timeout, headers=req_headers)
+    return _SimpleResponse(resp.data, resp.status, url, headers=resp.headers)
 
 # compatibility shim: mimic `requests.get(...)`
 class _RequestsShim:
     @staticmethod
-    def get(url, timeout=10):
-        return _requests_get(url, timeout=timeout)
+    def get(url, timeout=10, headers=None):
+        return _requests_get(url, timeout=timeout, headers=headers)
 
 # expose a `requests` object with a .get method so existing code remains unchanged
 requests = _RequestsShim()
 
 from django.conf import settings
+from django.core.cache import cache
 
 
 STEAM_API_KEY = os.environ.get('STEAM_API_KEY')
 
+# Сколько картинок качаем одновременно (I/O-bound — потоки, без asyncio/aiohttp)
+IMAGE_DOWNLOAD_WORKERS = 8
+
+# Условные GET для appdetails: ETag/Last-Modified и последнее тело храним в кеше
+APPDETAILS_CACHE_TTL = 60 * 60 * 24
+
 
 def fetch_appdetails(appid: int, language: str = 'en', cc: str = 'us'):
     """Fetch app details from Steam Store API.
@@ -65,9 +92,32 @@ def fetch_appdetails(appid: int, language: str = 'en', cc: str = 'us'):
     # appdetails does not require key, but keep key param if provided
     if STEAM_API_KEY:
         url += f'&key={STEAM_API_KEY}'
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    j = resp.json()
+    meta_key = f'appdetails_meta_{appid}_{cc}_{language}'
+    body_key = f'appdetails_body_{appid}_{cc}_{language}'
+    meta = cache.get(meta_key) or {}
+    cond_headers = {}
+    if meta.get('etag'):
+        cond_headers['If-None-Match'] = meta['etag']
+    if meta.get('lm'):
+        cond_headers['If-Modified-Since'] = meta['lm']
+    resp = requests.get(url, timeout=10, headers=cond_headers or None)
+    j = None
+    if resp.status_code == 304:
+        # 304 Not Modified: тело не передаётся, берём сохранённое
+        j = cache.get(body_key)
+        if j is None:
+            # тело вытеснено из кеша — повторяем безусловный запрос
+            resp = requests.get(url, timeout=10)
+    if j is None:
+        resp.raise_for_status()
+        j = resp.json()
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if etag or last_modified:
+            cache.set_many({
+                meta_key: {'etag': etag, 'lm': last_modified},
+                body_key: j,
+            }, APPDETAILS_CACHE_TTL)
     # response is { "<appid>": { "success": True, "data": { ... } } }
     app_entry = j.get(str(appid)) or j.get(int(appid))
     if not app_entry:
@@ -77,18 +127,73 @@ def fetch_appdetails(appid: int, language: str = 'en', cc: str = 'us'):
     return app_entry.get('data')
 
 
-def _save_bytes_to_media(subpath: Path, content: bytes):
+def _by_hash_path(digest: str) -> Path:
+    return Path(settings.MEDIA_ROOT) / 'steam_imports' / '_by_hash' / digest[:2] / digest
+
+
+def _stream_to_media(subpath: Path, url: str, timeout=10) -> str | None:
+    """Скачать url сразу в файл MEDIA_ROOT/subpath кусками по 64 КБ (без bytes целиком в памяти).
+
+    Пишем во временный файл и переименовываем только после успешной загрузки,
+    чтобы оборванная закачка не оставила битую картинку. Попутно считаем BLAKE2b:
+    если такое же содержимое уже скачивалось (DLC часто переиспользуют картинки
+    базовой игры), кладём жёсткую ссылку на него вместо копии. None — не удалось.
+    """
     full_path = settings.MEDIA_ROOT / subpath
     full_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(full_path, 'wb') as f:
-        f.write(content)
+    tmp_path = full_path.with_name(f'.{full_path.name}.{os.getpid()}.{threading.get_ident()}.part')
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        resp = POOL.request('GET', url, timeout=timeout, preload_content=False)
+        try:
+            if resp.status >= 400:
+                return None
+            with open(tmp_path, 'wb') as f:
+                for chunk in resp.stream(64 * 1024):
+                    h.update(chunk)
+                    f.write(chunk)
+        finally:
+            resp.release_conn()
+        canonical = _by_hash_path(h.hexdigest())
+        if canonical.exists():
+            link_path = tmp_path.with_suffix('.lnk')
+            try:
+                os.link(canonical, link_path)
+                os.replace(link_path, full_path)
+            except OSError:
+                # ФС без жёстких ссылок — оставляем обычную копию
+                link_path.unlink(missing_ok=True)
+                os.replace(tmp_path, full_path)
+        else:
+            os.replace(tmp_path, full_path)
+            try:
+                canonical.parent.mkdir(parents=True, exist_ok=True)
+                os.link(full_path, canonical)
+            except OSError:
+                pass
+    except Exception:
+        return None
+    finally:
+        tmp_path.unlink(missing_ok=True)
     # return path relative to MEDIA_ROOT
     return str(subpath)
 
 
-def fetch_app_and_images(appid: int, max_images: int = 3, target_subdir: str = 'steam_imports'):
+_UNSAFE_FILENAME_RE = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def _basename(url: str) -> str:
+    # имя файла — последний сегмент пути URL (без ?t=... и т.п.); простой split
+    # вместо urlparse+Path — вызывается на каждую картинку
+    filename = url.rpartition('/')[2].partition('?')[0] or 'image'
+    return _UNSAFE_FILENAME_RE.sub('_', filename)[:128]
+
+
+def fetch_app_and_images(appid: int, max_images: int = 3, target_subdir: str = 'steam_imports', size: str = 'full'):
     """Fetch app details and download up to `max_images` to MEDIA_ROOT/target_subdir/<appid>/.
 
+    size: 'full' (по умолчанию) или 'thumbnail' — для скриншотов сначала берётся path_thumbnail
+    (в разы меньше байт, достаточно для превью).
     Returns dict: { 'app': <app_data or None>, 'images': [relative_paths...] }
     """
     data = fetch_appdetails(appid)
@@ -97,34 +202,38 @@ def fetch_app_and_images(appid: int, max_images: int = 3, target_subdir: str = '
         return {'app': None, 'images': images}
 
     # collect candidate image URLs: header_image + screenshots
-    candidates = []
+    urls = []
     header = data.get('header_image')
     if header:
-        candidates.append(header)
+        urls.append(header)
     screenshots = data.get('screenshots') or []
+    first, second = ('path_thumbnail', 'path_full') if size == 'thumbnail' else ('path_full', 'path_thumbnail')
     for s in screenshots:
         # screenshot objects often have 'path_thumbnail' and 'path_full'
-        url = s.get('path_full') or s.get('path_thumbnail')
+        url = s.get(first) or s.get(second)
         if url:
-            candidates.append(url)
-
-    # limit and download
+            urls.append(url)
+    # Дедупликация с сохранением порядка: по имени файла, т.к. оно и есть путь на диске
+    # (одинаковые картинки с разными ?t=... иначе качались бы и перезаписывали друг друга)
+    by_name: dict[str, str] = {}
+    for url in urls:
+        by_name.setdefault(_basename(url), url)
+    candidates = list(by_name.values())
+
+    # limit and download: параллельно, волнами по недостающему числу картинок.
+    # Порядок candidates сохраняется; на месте неудачных загрузок берутся следующие.
     base_dir = Path(target_subdir) / str(appid)
     count = 0
-    for url in candidates:
-        if count >= max_images:
-            break
-        try:
-            r = requests.get(url, timeout=10)
-            r.raise_for_status()
-        except Exception:
-            continue
-        parsed = urlparse(url)
-        filename = Path(parsed.path).name
-        # prepare relative subpath under MEDIA_ROOT
-        rel_subpath = base_dir / filename
-        rel_path_str = _save_bytes_to_media(rel_subpath, r.content)
-        images.append(rel_path_str)
-        count += 1
+    idx = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(IMAGE_DOWNLOAD_WORKERS, max_images))) as pool:
+        while count < max_images and idx < len(candidates):
+            wave = candidates[idx:idx + (max_images - count)]
+            idx += len(wave)
+            subpaths = [base_dir / _basename(url) for url in wave]
+            for rel_path_str in pool.map(_stream_to_media, subpaths, wave):
+                if rel_path_str is None:
+                    continue
+                images.append(rel_path_str)
+                count += 1
 
     return {'app': data, 'images': images}
@@ -1,48 +1,69 @@
-import json
-import urllib.request
-import urllib.error
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+import urllib3
 from django import template
 from django.core.cache import cache
 from django.conf import settings
+from django.urls import reverse
+from django.utils.html import format_html
+
+from store.steam_api import POOL, json_loads
 
 register = template.Library()
 
+CACHE_TTL = 60 * 60 * 24
+# «Тегов нет» (success: false / сеть) тоже кешируем, но коротко — чтобы не ждать таймаут на каждом рендере
+NEGATIVE_CACHE_TTL = 60 * 60
+# Dog-pile guard: один удалённый запрос на appid за это окно
+FETCH_LOCK_SECONDS = 5
+# Сколько appdetails тянем параллельно при пакетной загрузке
+FETCH_WORKERS = 8
+_PRELOAD_KEY = '_steam_tags_cache'
+# Не больше FETCH_RATE_PER_SECOND запросов в Steam в секунду на процесс: при холодном кеше
+# (деплой, всплеск трафика) лишние карточки просто рендерятся без тегов, а не ждут сеть
+FETCH_RATE_PER_SECOND = 2
+_BUCKET: deque = deque()
+_BUCKET_LOCK = threading.Lock()
 
-@register.simple_tag
-def steam_tags(appid, max_tags=5):
-    """Return a list of tag/genre names for the given Steam appid.
 
-    Uses store API: https://store.steampowered.com/api/appdetails?appids=<id>
-    Caches results in Django cache (if available) under key 'steam_tags_<appid>'.
-    If requests isn't available or network fails, returns an empty list.
-    """
-    if not appid:
-        return []
-    cache_key = f"steam_tags_{appid}"
-    try:
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return cached[:int(max_tags)]
-    except Exception:
-        # Cache not configured or other issue — continue without cache
-        cached = None
+def _take_token() -> bool:
+    """Скользящее окно в 1 с: True — можно идти в сеть, False — лимит исчерпан."""
+    now = time.monotonic()
+    with _BUCKET_LOCK:
+        while _BUCKET and now - _BUCKET[0] >= 1.0:
+            _BUCKET.popleft()
+        if len(_BUCKET) >= FETCH_RATE_PER_SECOND:
+            return False
+        _BUCKET.append(now)
+        return True
+
+
+def _cache_key(appid) -> str:
+    return f"steam_tags_{appid}"
+
 
+def _fetch_enabled() -> bool:
     # Feature flag: disable remote fetch by default to avoid slowing down page renders.
     # To enable fetching, set in settings.py: STORE_FETCH_STEAM_TAGS = True
-    fetch_enabled = bool(getattr(settings, 'STORE_FETCH_STEAM_TAGS', False))
-    if not fetch_enabled:
-        return cached[: int(max_tags)] if cached is not None else []
+    return bool(getattr(settings, 'STORE_FETCH_STEAM_TAGS', False))
 
+
+def _fetch_tags(appid, max_tags) -> list | None:
+    """Запросить жанры/категории из appdetails. None — данных нет (сеть/Steam)."""
     try:
         url = f"https://store.steampowered.com/api/appdetails?appids={appid}&cc=us&l=en"
-        # Keep a very short timeout; if Steam is slow, don't block our page render
-        with urllib.request.urlopen(url, timeout=0.8) as resp:
-            raw = resp.read()
-        data = json.loads(raw)
+        # Keep a very short timeout; if Steam is slow, don't block our page render.
+        # Пул соединений общий со steam_api; без ретраев — бюджет рендера важнее
+        resp = POOL.request('GET', url, timeout=urllib3.Timeout(connect=0.3, read=0.5), retries=False)
+        if resp.status != 200:
+            return None
+        data = json_loads(resp.data)
         app_data = data.get(str(appid), {})
         if not app_data.get('success'):
-            return []
+            return None
         info = app_data.get('data', {})
         tags = []
         # genres
@@ -56,13 +77,139 @@ def steam_tags(appid, max_tags=5):
                 name = c.get('description')
                 if name:
                     tags.append(name)
+        return tags
+    except Exception:
+        return None
+
+
+def steam_tags_bulk(appids, max_tags=5, fetch=True) -> dict:
+    """Теги для многих appid: один cache.get_many, недостающие — параллельно, затем set_many.
 
-        # persist to cache (best-effort)
+    Возвращает {appid: [tags]}; appid без данных получают []. fetch=False — только кеш.
+    """
+    appids = list(dict.fromkeys(a for a in appids if a))
+    if not appids:
+        return {}
+    keys = {_cache_key(a): a for a in appids}
+    try:
+        found = cache.get_many(list(keys))
+    except Exception:
+        found = {}
+    result = {keys[k]: v[:int(max_tags)] for k, v in found.items()}
+    missing = [a for a in appids if a not in result]
+    # сверх лимита запросов не делаем (и не кешируем) — такие appid получат [] в этот раз
+    to_fetch = [a for a in missing if _take_token()] if fetch and missing and _fetch_enabled() else []
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(to_fetch))) as pool:
+            fetched = dict(zip(to_fetch, pool.map(lambda a: _fetch_tags(a, max_tags), to_fetch)))
+        to_cache = {_cache_key(a): tags for a, tags in fetched.items() if tags is not None}
+        misses = {_cache_key(a): [] for a, tags in fetched.items() if tags is None}
         try:
-            cache.set(cache_key, tags, 60 * 60 * 24)
+            if to_cache:
+                cache.set_many(to_cache, CACHE_TTL)
+            if misses:
+                cache.set_many(misses, NEGATIVE_CACHE_TTL)
         except Exception:
             pass
+        for a, tags in fetched.items():
+            result[a] = (tags or [])[:int(max_tags)]
+    for a in missing:
+        result.setdefault(a, [])
+    return result
 
-        return tags[: int(max_tags)]
+
+@register.simple_tag(takes_context=True)
+def steam_tags_preload(context, games, max_tags=5):
+    """Загрузить теги для всех игр списка заранее (вызывать один раз перед циклом).
+
+    Последующие {% steam_tags g.appid %} в этом шаблоне берут данные из памяти.
+    """
+    appids = []
+    for g in games or []:
+        appid = g.get('appid') if isinstance(g, dict) else getattr(g, 'appid', None)
+        if appid:
+            appids.append(appid)
+    preloaded = context.render_context.setdefault(_PRELOAD_KEY, {})
+    # только кеш: промахи догружает браузер через {% steam_tags_lazy %}
+    preloaded.update(steam_tags_bulk(appids, max_tags=max_tags, fetch=False))
+    return ''
+
+
+def get_or_fetch_tags(appid, max_tags=5) -> list:
+    """Теги из кеша, при промахе — запрос в Steam (lock + лимит запросов). Для API-эндпоинта.
+
+    Из шаблонов не вызывается: сеть не должна задерживать рендер HTML.
+    """
+    return fetch_tags_status(appid, max_tags)[0]
+
+
+def fetch_tags_status(appid, max_tags=5) -> tuple[list, bool]:
+    """Как get_or_fetch_tags, но ещё и флаг «ответ окончательный».
+
+    False — [] из-за занятого lock, пустого лимита или выключенной загрузки: такой ответ
+    нельзя кешировать надолго (через пару секунд теги уже могут быть в кеше).
+    """
+    cache_key = _cache_key(appid)
+    try:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached[:int(max_tags)], True
+    except Exception:
+        # Cache not configured or other issue — continue without cache
+        pass
+
+    if not _fetch_enabled():
+        return [], False
+
+    # Только один запрос за FETCH_LOCK_SECONDS идёт в Steam за этим appid, остальные не ждут
+    try:
+        if not cache.add(f"steam_tags_lock_{appid}", 1, FETCH_LOCK_SECONDS):
+            return [], False
+    except Exception:
+        pass
+    if not _take_token():
+        return [], False
+    tags = _fetch_tags(appid, max_tags)
+    # persist to cache (best-effort); пустой результат — с коротким TTL
+    try:
+        if tags is None:
+            cache.set(cache_key, [], NEGATIVE_CACHE_TTL)
+        else:
+            cache.set(cache_key, tags, CACHE_TTL)
     except Exception:
+        pass
+    return (tags or [])[: int(max_tags)], True
+
+
+@register.simple_tag(takes_context=True)
+def steam_tags(context, appid, max_tags=5):
+    """Return a list of tag/genre names for the given Steam appid — только из памяти/кеша.
+
+    Caches results in Django cache under key 'steam_tags_<appid>'. В Steam отсюда не ходим:
+    при промахе возвращается [], а теги подгружает {% steam_tags_lazy %} через /api/steam_tags/.
+    После {% steam_tags_preload %} — без обращений к кешу.
+    """
+    if not appid:
         return []
+    preloaded = context.render_context.get(_PRELOAD_KEY)
+    if preloaded is not None and appid in preloaded:
+        return preloaded[appid][:int(max_tags)]
+    try:
+        cached = cache.get(_cache_key(appid))
+    except Exception:
+        cached = None
+    return cached[:int(max_tags)] if cached is not None else []
+
+
+@register.simple_tag
+def steam_tags_lazy(appid, max_tags=5):
+    """Плейсхолдер, который promo.js заполняет ответом /api/steam_tags/ после загрузки страницы.
+
+    Пусто, если appid нет или загрузка тегов выключена (STORE_FETCH_STEAM_TAGS).
+    """
+    if not appid or not _fetch_enabled():
+        return ''
+    return format_html(
+        '<span class="steam-tags-lazy" data-appid="{}" data-max="{}" data-url="{}"></span>',
+        appid, max_tags, reverse('store:steam_tags'),
+    )
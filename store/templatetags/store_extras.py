@@ -1,23 +1,96 @@
+import hashlib
+import logging
 import os
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Iterable, Optional, Union, List, Dict, cast
 
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from django import template
 from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
 from django.contrib.staticfiles import finders
+from django.db.models import F, QuerySet, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 from django.utils.text import slugify
+from django.utils.translation import get_language
 
 from store.models import Game, OrderItem
-from store.utils.currency import convert_amount
+from store.utils.currency import convert_amount, convert_amount_display
 
 register = template.Library()
+logger = logging.getLogger(__name__)
+
+# MEDIA_URL (со слешем в конце) и MEDIA_ROOT строками — вычисляем один раз, а не в каждом
+# вызове хелперов картинок; override_settings в тестах обновляет их через setting_changed
+_MEDIA_URL = ''
+_MEDIA_ROOT = ''
+
+
+def _refresh_media_settings(**kwargs: Any) -> None:
+    global _MEDIA_URL, _MEDIA_ROOT
+    if kwargs.get('setting') not in (None, 'MEDIA_URL', 'MEDIA_ROOT'):
+        return
+    _MEDIA_URL = str(settings.MEDIA_URL).rstrip('/') + '/'
+    _MEDIA_ROOT = str(settings.MEDIA_ROOT)
+
+
+_refresh_media_settings()
+setting_changed.connect(_refresh_media_settings)
+
+# Проверки файлов в MEDIA_ROOT кешируем в процессе: каталог рендерит сотни карточек,
+# и без кеша каждая — отдельный stat(). Новый импорт становится виден не позже чем через TTL.
+FS_CACHE_TTL = 60
+_FS_CACHE_MAX = 4096
+_ISFILE_CACHE: dict[str, tuple[float, bool]] = {}
+# abs_dir -> (mtime каталога, отсортированный список файлов)
+_LISTDIR_CACHE: dict[str, tuple[float, List[str]]] = {}
+# Готовые результаты local_screenshots / category_cover в общем кеше (между воркерами)
+RENDER_CACHE_TTL = 10 * 60
+
+
+def _isfile_cached(path: str) -> bool:
+    now = time.monotonic()
+    hit = _ISFILE_CACHE.get(path)
+    if hit is not None and now - hit[0] < FS_CACHE_TTL:
+        return hit[1]
+    ok = os.path.isfile(path)
+    if len(_ISFILE_CACHE) >= _FS_CACHE_MAX:
+        _ISFILE_CACHE.clear()
+    _ISFILE_CACHE[path] = (now, ok)
+    return ok
+
+
+def _listdir_files_cached(abs_dir: str) -> List[str]:
+    """Отсортированные имена файлов каталога; пересчёт только при смене mtime каталога."""
+    try:
+        mtime = os.stat(abs_dir).st_mtime
+    except OSError:
+        return []
+    hit = _LISTDIR_CACHE.get(abs_dir)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    # scandir: тип файла приходит из getdents (d_type) — без stat() на каждый элемент
+    with os.scandir(abs_dir) as it:
+        files = sorted(e.name for e in it if e.is_file())
+    if len(_LISTDIR_CACHE) >= _FS_CACHE_MAX:
+        _LISTDIR_CACHE.clear()
+    _LISTDIR_CACHE[abs_dir] = (mtime, files)
+    return files
 
 
 @register.filter
 def file_exists(rel_path: str) -> bool:
     """Check if file exists in MEDIA_ROOT/rel_path."""
-    abs_path = os.path.join(str(settings.MEDIA_ROOT), rel_path)
-    return os.path.isfile(abs_path)
+    abs_path = os.path.join(_MEDIA_ROOT, rel_path)
+    return _isfile_cached(abs_path)
 
 
 @register.filter
@@ -53,21 +126,21 @@ def local_screenshots(appid: Union[int, str], count: int = 2) -> List[str]:
         n = int(count)
     except (ValueError, TypeError):
         n = 2
+    return cache.get_or_set(f'locshots:{appid}:{n}', lambda: _local_screenshots(appid, n), RENDER_CACHE_TTL)
+
+
+def _local_screenshots(appid: Union[int, str], n: int) -> List[str]:
     rel_dir = os.path.join('steam_imports', str(appid))
-    abs_dir = os.path.join(str(settings.MEDIA_ROOT), rel_dir)
-    if not os.path.isdir(abs_dir):
-        return []
+    abs_dir = os.path.join(_MEDIA_ROOT, rel_dir)
     try:
-        files = sorted([f for f in os.listdir(abs_dir)
-                        if os.path.isfile(os.path.join(abs_dir, f))
-                        and 'header' not in f.lower()])
-    except Exception:
+        files = [f for f in _listdir_files_cached(abs_dir) if 'header' not in f.lower()]
+    except OSError:
         return []
     out: List[str] = []
     for f in files[:n]:
         # Build URL using MEDIA_URL and POSIX-style path
         rel_path = os.path.join(rel_dir, f).replace('\\', '/')
-        out.append(str(settings.MEDIA_URL) + rel_path)
+        out.append(_MEDIA_URL + rel_path)
     return out
 
 
@@ -95,6 +168,12 @@ def catalog_categories(catalog: Optional[Iterable[Any]], max_categories: int = 2
     if not catalog:
         return out
 
+    # Жанры догружаем одним запросом на весь каталог (без N+1 на items.all()).
+    # list(QuerySet) заполняет его кеш — шаблон потом итерирует тот же результат;
+    # уже prefetch-нутые экземпляры (with_display) повторно не запрашиваются.
+    catalog = list(catalog)
+    prefetch_related_objects([g for g in catalog if isinstance(g, Game)], 'genres')
+
     for g in catalog:
         # Prefer explicit tags if present; else use genres
         items = getattr(g, 'tags', None) or getattr(g, 'genres', None)
@@ -153,10 +232,14 @@ def paid_games(games: Optional[Iterable[Any]], min_count: int = 0, fallback: Opt
         except Exception:
             return False
 
+    # Ключи уже взятых игр (pk, для не-моделей — id объекта): дедуп за O(1) вместо `g not in out`
+    seen: set[Any] = set()
+
     # First pass: take paid items from the primary iterable
     for g in games:
         if _is_paid(g):
             out.append(g)
+            seen.add(getattr(g, 'pk', None) or id(g))
 
     # If we need more and a fallback iterable is provided, draw from it
     try:
@@ -175,16 +258,59 @@ def paid_games(games: Optional[Iterable[Any]], min_count: int = 0, fallback: Opt
             fb_iter = cast(Iterable[Any], fallback or [])
 
         for g in fb_iter:
-            if _is_paid(g) and g not in out:
-                out.append(g)
-                if len(out) >= min_n:
-                    break
+            if not _is_paid(g):
+                continue
+            k = getattr(g, 'pk', None) or id(g)
+            if k in seen:
+                continue
+            seen.add(k)
+            out.append(g)
+            if len(out) >= min_n:
+                break
 
     return out
 
 
-@register.simple_tag
-def category_cover(category_slug: str, catalog: Optional[Iterable[Any]] = None) -> str:
+_COVER_PRIME_KEY = '_category_cover_games'
+
+
+@register.simple_tag(takes_context=True)
+def prime_category_covers(context, categories: Optional[Iterable[Any]]) -> str:
+    """Подобрать игру-обложку для всех категорий одним запросом (вызывать перед циклом).
+
+    categories — dict'ы из catalog_categories или строки-slug. Slug'и, чья обложка уже
+    в кеше, не запрашиваются. Последующие {% category_cover %} берут игру из памяти.
+    """
+    slugs = []
+    for c in categories or []:
+        slug = c.get('slug') if isinstance(c, dict) else c
+        if slug:
+            slugs.append(str(slug))
+    try:
+        cached = cache.get_many([category_cover_cache_key(s) for s in slugs])
+    except Exception:
+        cached = {}
+    missing = [s for s in slugs if category_cover_cache_key(s) not in cached]
+    primed = context.render_context.setdefault(_COVER_PRIME_KEY, {})
+    if missing:
+        # самая свежая игра каждого жанра (как .first() при ordering -created_at) — ROW_NUMBER()
+        games = (
+            Game.objects.filter(genres__slug__in=missing)
+            .annotate(
+                cover_slug=F('genres__slug'),
+                rn=Window(RowNumber(), partition_by=[F('genres__slug')], order_by=F('created_at').desc()),
+            )
+            .filter(rn=1)
+        )
+        for g in games:
+            primed[g.cover_slug] = g
+        for s in missing:
+            primed.setdefault(s, None)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def category_cover(context, category_slug: str, catalog: Optional[Iterable[Any]] = None) -> str:
     """Return a background image URL for a category/genre slug.
 
     Priority:
@@ -197,20 +323,88 @@ def category_cover(category_slug: str, catalog: Optional[Iterable[Any]] = None)
     - MEDIA_URL + steam_imports/<appid>/header.jpg (when file exists)
     - Steam CDN header by appid
     Returns empty string if nothing found.
+    Кешируется по slug на RENDER_CACHE_TTL (сброс — сигналы Game/Genre) только результат,
+    не зависящий от catalog; совпадение в catalog считается до кеша, без запросов.
+    После {% prime_category_covers %} запасная игра из БД берётся без запроса.
     """
+    primed = context.render_context.get(_COVER_PRIME_KEY) or {}
+    if _catalog_match(category_slug, catalog) is not None:
+        return _category_cover(category_slug, catalog, primed)
+    return cache.get_or_set(
+        category_cover_cache_key(category_slug),
+        lambda: _category_cover(category_slug, None, primed),
+        RENDER_CACHE_TTL,
+    )
+
+
+def category_cover_cache_key(category_slug: str) -> str:
+    return f'catcover:{category_slug}'
+
+
+def invalidate_category_covers(slugs: Iterable[str]) -> None:
+    keys = [category_cover_cache_key(s) for s in slugs if s]
+    if keys:
+        cache.delete_many(keys)
+
+
+_CATEGORY_STATIC_EXTS = ('.webp', '.jpg', '.png', '.svg')  # в порядке приоритета
+
+
+@lru_cache(maxsize=1)
+def _category_static_map() -> Dict[str, str]:
+    """{slug: static URL} для store/categories/* — один проход по finders вместо
+    finders.find() на каждое расширение при каждом рендере."""
+    found: Dict[str, Dict[str, str]] = {}
+    try:
+        for finder in finders.get_finders():
+            for path, _storage in finder.list([]):
+                path = path.replace(os.sep, '/')
+                if not path.startswith('store/categories/') or path.count('/') != 2:
+                    continue
+                stem, ext = os.path.splitext(path.rpartition('/')[2])
+                if ext in _CATEGORY_STATIC_EXTS:
+                    # первый finder выигрывает, как и у finders.find()
+                    found.setdefault(stem, {}).setdefault(ext, path)
+    except Exception:
+        return {}
+    static_url = str(settings.STATIC_URL)
+    return {
+        slug: static_url + next(by_ext[e] for e in _CATEGORY_STATIC_EXTS if e in by_ext)
+        for slug, by_ext in found.items()
+    }
+
+
+def _reset_category_static_map(**kwargs: Any) -> None:
+    if kwargs.get('setting') in ('STATIC_URL', 'STATICFILES_DIRS', 'STATICFILES_FINDERS', 'INSTALLED_APPS'):
+        _category_static_map.cache_clear()
+
+
+setting_changed.connect(_reset_category_static_map)
+
+
+def _catalog_match(category_slug: str, catalog: Optional[Iterable[Any]]) -> Optional[Any]:
+    """Первая игра из catalog с жанром category_slug — только по уже загруженным данным."""
+    if catalog is None:
+        return None
+    if isinstance(catalog, QuerySet):
+        # bool()/.all() выполнили бы запрос по всему каталогу; смотрим только уже загруженное
+        catalog = catalog._result_cache or []
+    for g in catalog:
+        # только предзагруженные жанры: genres.all() без prefetch — запрос на каждую игру;
+        # такие игры оставляем на единственный запрос к БД
+        if 'genres' not in getattr(g, '_prefetched_objects_cache', {}):
+            continue
+        if any(x.slug == category_slug for x in g.genres.all()):
+            return g
+    return None
+
+
+def _category_cover(category_slug: str, catalog: Optional[Iterable[Any]] = None,
+                    primed: Optional[Dict[str, Any]] = None) -> str:
+    static_map = _category_static_map()
     # 1) curated static image, like Steam categories artwork
-    rel_candidates = [
-        f"store/categories/{category_slug}.webp",
-        f"store/categories/{category_slug}.jpg",
-        f"store/categories/{category_slug}.png",
-        f"store/categories/{category_slug}.svg",
-    ]
-    for rel in rel_candidates:
-        try:
-            if finders.find(rel):
-                return str(settings.STATIC_URL) + rel
-        except Exception:
-            pass
+    if category_slug in static_map:
+        return static_map[category_slug]
     # 1b) Mapping from settings for curated remote images (e.g., Steam-like category art)
     try:
         mapping = getattr(settings, 'STORE_CATEGORY_IMAGES', {}) or {}
@@ -220,34 +414,15 @@ def category_cover(category_slug: str, catalog: Optional[Iterable[Any]] = None)
     except Exception:
         pass
     # 1c) Generic curated default poster, if present — prefer it to game-based fallback for consistent look
-    try:
-        default_rel = "store/categories/default.svg"
-        if finders.find(default_rel):
-            return str(settings.STATIC_URL) + default_rel
-    except Exception:
-        pass
+    default_url = static_map.get('default', '')
+    if default_url.endswith('.svg'):
+        return default_url
     # try to find a game in provided catalog first
-    def iter_games(iterable: Optional[Iterable[Any]]) -> Iterable[Any]:
-        if not iterable:
-            return []
-        try:
-            if hasattr(iterable, 'all'):
-                return cast(Iterable[Any], iterable.all())  # type: ignore[attr-defined]
-            return iterable
-        except Exception:
-            return iterable or []
-
-    candidate = None
-    for g in iter_games(catalog):
-        try:
-            genres = getattr(g, 'genres', None)
-            if genres and (hasattr(genres, 'filter') and genres.filter(slug=category_slug).exists() or any(getattr(x, 'slug', None) == category_slug for x in (genres.all() if hasattr(genres, 'all') else genres))):
-                candidate = g
-                break
-        except Exception:
-            continue
+    candidate = _catalog_match(category_slug, catalog)
 
-    if candidate is None:
+    if candidate is None and primed and category_slug in primed:
+        candidate = primed[category_slug]
+    elif candidate is None:
         try:
             candidate = Game.objects.filter(genres__slug=category_slug).first()
         except Exception:
@@ -268,15 +443,36 @@ def category_cover(category_slug: str, catalog: Optional[Iterable[Any]] = None)
     appid = getattr(candidate, 'appid', None)
     if appid:
         rel = os.path.join('steam_imports', str(appid), 'header.jpg').replace('\\', '/')
-        abs_path = os.path.join(str(settings.MEDIA_ROOT), rel)
-        if os.path.isfile(abs_path):
-            return str(settings.MEDIA_URL) + rel
+        abs_path = os.path.join(_MEDIA_ROOT, rel)
+        if _isfile_cached(abs_path):
+            return _MEDIA_URL + rel
         # fallback to cdn
         return f"https://cdn.cloudflare.steamstatic.com/steam/apps/{appid}/header.jpg"
 
     return ''
 
 
+def _to_dec(x: Any) -> Decimal:
+    """Decimal как есть; остальное — через str (float -> Decimal без двоичного хвоста)."""
+    return x if isinstance(x, Decimal) else Decimal(str(x))
+
+
+# Мемо convert_price: ключ содержит минутную «эпоху», так что новый курс подхватывается за минуту
+CONVERT_MEMO_TTL = 60
+_CONVERT_MEMO: Dict[tuple, Decimal] = {}
+
+
+def _convert_memo(amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
+    key = (amount, from_currency, to_currency, int(time.time() // CONVERT_MEMO_TTL))
+    hit = _CONVERT_MEMO.get(key)
+    if hit is None:
+        hit = convert_amount(amount, from_currency, to_currency)
+        if len(_CONVERT_MEMO) >= 2048:
+            _CONVERT_MEMO.clear()
+        _CONVERT_MEMO[key] = hit
+    return hit
+
+
 @register.simple_tag
 def convert_price(amount: Union[int, float, Decimal], from_currency: str, to_currency: str) -> Decimal:
     """Convert amount to another currency using convert_amount utility.
@@ -285,11 +481,12 @@ def convert_price(amount: Union[int, float, Decimal], from_currency: str, to_cur
       {% convert_price game.price game.currency preferred_currency as price %}
     """
     try:
-        return convert_amount(amount, from_currency, to_currency)
+        # точный Decimal-результат; одинаковые (сумма, пара) за рендер не пересчитываем
+        return _convert_memo(_to_dec(amount), from_currency, to_currency)
     except Exception:
         try:
-            return Decimal(str(amount))
-        except Exception:
+            return _to_dec(amount)
+        except (InvalidOperation, TypeError, ValueError):
             return Decimal('0.00')
 
 
@@ -303,7 +500,15 @@ def is_owned(user: Any, game: Any) -> bool:
     try:
         if not user or not getattr(user, 'is_authenticated', False):
             return False
-        return OrderItem.objects.filter(order__user=user, order__status='paid', game=game).exists()
+        # Один запрос на рендер: множество купленных id кешируем на объекте user (живёт один запрос)
+        owned = getattr(user, '_owned_game_ids', None)
+        if owned is None:
+            owned = set(
+                OrderItem.objects.filter(order__user=user, order__status='paid')
+                .values_list('game_id', flat=True)
+            )
+            user._owned_game_ids = owned
+        return getattr(game, 'pk', game) in owned
     except Exception:
         return False
 
@@ -319,12 +524,17 @@ def stars() -> list[int]:
     return [1, 2, 3, 4, 5]
 
 
+# Готовый HTML price_display: зависит только от аргументов, языка и курса (минутная «эпоха», как у convert_price)
+_PD_CACHE: Dict[tuple, str] = {}
+_PD_CACHE_MAX = 4096
+
+
 @register.simple_tag
 def price_display(price: Union[int, float, Decimal, None], currency: str | None,
                   preferred_currency: str | None = None,
                   original_price: Union[int, float, Decimal, None] = None,
                   discount_percent: int | None = None) -> str:
-    """Вернуть HTML блок цены с учётом скидки и конвертации.
+    """Вернуть HTML блок цены с учётом скидки и конвертации (результат мемоизируется).
 
     Логика:
     - Если итоговая цена 0 -> выводим перевод 'Бесплатно'.
@@ -335,13 +545,30 @@ def price_display(price: Union[int, float, Decimal, None], currency: str | None,
     - Иначе обычная цена (+ ≈конвертированная при отличии валют)
     Все значения форматируются до 2 знаков.
     """
+    key = (
+        str(price), currency, preferred_currency, str(original_price), discount_percent,
+        get_language(), int(time.time() // CONVERT_MEMO_TTL),
+    )
+    hit = _PD_CACHE.get(key)
+    if hit is None:
+        hit = _price_display_html(price, currency, preferred_currency, original_price, discount_percent)
+        if len(_PD_CACHE) >= _PD_CACHE_MAX:
+            _PD_CACHE.clear()
+        _PD_CACHE[key] = hit
+    return hit
+
+
+def _price_display_html(price: Union[int, float, Decimal, None], currency: str | None,
+                        preferred_currency: str | None,
+                        original_price: Union[int, float, Decimal, None],
+                        discount_percent: int | None) -> str:
     from django.utils.html import format_html
     from django.utils.translation import gettext as _
     try:
         if price is None:
             return ''
-        p = Decimal(str(price))
-    except Exception:
+        p = _to_dec(price)
+    except (InvalidOperation, TypeError, ValueError):
         return ''
     cur = currency or ''
     # free case
@@ -353,10 +580,10 @@ def price_display(price: Union[int, float, Decimal, None], currency: str | None,
     orig_dec = None
     if discount_percent and discount_percent > 0 and original_price is not None:
         try:
-            orig_dec = Decimal(str(original_price))
+            orig_dec = _to_dec(original_price)
             if orig_dec > p:
                 show_discount = True
-        except Exception:
+        except (InvalidOperation, TypeError, ValueError):
             orig_dec = None
 
     # conversion
@@ -364,9 +591,10 @@ def price_display(price: Union[int, float, Decimal, None], currency: str | None,
     conv_orig = None
     if preferred_currency and preferred_currency != cur:
         try:
-            conv_price = convert_amount(p, cur, preferred_currency)
+            # «≈» только для показа — целочисленный путь по курсу в микроединицах
+            conv_price = convert_amount_display(p, cur, preferred_currency)
             if show_discount and orig_dec is not None:
-                conv_orig = convert_amount(orig_dec, cur, preferred_currency)
+                conv_orig = convert_amount_display(orig_dec, cur, preferred_currency)
         except Exception:
             conv_price = None
 
@@ -400,7 +628,7 @@ def n_reviews(count: Union[int, float, Decimal]) -> str:
     """
     try:
         c = int(count)
-    except Exception:
+    except (TypeError, ValueError, OverflowError):
         c = 0
     return ngettext("%(count)d review", "%(count)d reviews", c) % {"count": c}
 
@@ -410,7 +638,7 @@ def n_games(count: Union[int, float, Decimal]) -> str:
     """Return a localized '<count> game(s)' string using ngettext."""
     try:
         c = int(count)
-    except Exception:
+    except (TypeError, ValueError, OverflowError):
         c = 0
     return ngettext("%(count)d game", "%(count)d games", c) % {"count": c}
 
@@ -420,7 +648,7 @@ def n_minutes(count: Union[int, float, Decimal]) -> str:
     """Return a localized '<count> minute(s)' string using ngettext."""
     try:
         c = int(count)
-    except Exception:
+    except (TypeError, ValueError, OverflowError):
         c = 0
     return ngettext("%(count)d minute", "%(count)d minutes", c) % {"count": c}
 
@@ -428,57 +656,103 @@ def n_minutes(count: Union[int, float, Decimal]) -> str:
 # -----------------------------
 # Markdown sanitize for profile bio
 # -----------------------------
+try:
+    import markdown as _md  # type: ignore
+    import bleach  # type: ignore
+except ImportError:  # pragma: no cover - без них фильтр отдаёт экранированный текст
+    _md = None
+    bleach = None
+try:
+    # mistune 3 (собран mypyc) в разы быстрее Python-Markdown; тот остаётся запасным рендером.
+    # escape=False — сырой HTML как у Markdown, его вычищает санитайзер ниже
+    import mistune  # type: ignore
+    _mistune_render = mistune.create_markdown(escape=False, plugins=['strikethrough', 'table'])
+except (ImportError, AttributeError):
+    _mistune_render = None
+try:
+    # nh3 (Rust ammonia) санитайзит в разы быстрее bleach/html5lib; bleach — запасной вариант
+    import nh3  # type: ignore
+except ImportError:
+    nh3 = None
+
+# Для bleach: опасные блоки удаляем целиком (тег + содержимое) до санитайза —
+# strip=True оставил бы текст скрипта. nh3 вырезает script/style с содержимым сам.
+_SCRIPT_RE = re.compile(r'<script[^>]*>.*?</script>', re.I | re.S)
+_STYLE_RE = re.compile(r'<style[^>]*>.*?</style>', re.I | re.S)
+# Legacy-теги -> семантические: <b> -> <strong>, <i> -> <em> (открывающие — с атрибутами)
+_B_OPEN_RE = re.compile(r'<\s*b(\s+[^>]*)?>', re.I)
+_B_CLOSE_RE = re.compile(r'<\s*/\s*b\s*>', re.I)
+_I_OPEN_RE = re.compile(r'<\s*i(\s+[^>]*)?>', re.I)
+_I_CLOSE_RE = re.compile(r'<\s*/\s*i\s*>', re.I)
+
+MARKDOWN_ALLOWED_TAGS = frozenset([
+    'p', 'br', 'em', 'strong', 'code', 'pre', 'blockquote',
+    'ul', 'ol', 'li', 'a', 'h1', 'h2', 'h3', 'h4',
+])
+MARKDOWN_ALLOWED_ATTRS = {
+    'a': ['href', 'title', 'rel', 'target'],
+}
+MARKDOWN_ALLOWED_PROTOCOLS = frozenset(['http', 'https', 'mailto'])
+# Готовый HTML био в общем кеше; версию в префиксе меняем вместе с правилами санитайза
+MARKDOWN_CACHE_PREFIX = 'mdbio:v1:'
+MARKDOWN_CACHE_TTL = 60 * 60 * 24
+# nh3 сам проставляет rel="noopener noreferrer" и не допускает rel в списке атрибутов
+_NH3_ALLOWED_ATTRS = {'a': {'href', 'title', 'target'}}
+
+
+def _render_markdown(s: str) -> str:
+    if _mistune_render is not None:
+        return cast(str, _mistune_render(s))
+    return _md.markdown(s, extensions=['extra', 'sane_lists'])
+
+
+def _sanitize_html(html: str) -> str:
+    if nh3 is not None:
+        return nh3.clean(
+            html,
+            tags=set(MARKDOWN_ALLOWED_TAGS),
+            attributes=_NH3_ALLOWED_ATTRS,
+            url_schemes=set(MARKDOWN_ALLOWED_PROTOCOLS),
+        )
+    html = _SCRIPT_RE.sub('', html)
+    html = _STYLE_RE.sub('', html)
+    return bleach.clean(
+        html,
+        tags=MARKDOWN_ALLOWED_TAGS,
+        attributes=MARKDOWN_ALLOWED_ATTRS,
+        protocols=MARKDOWN_ALLOWED_PROTOCOLS,
+        strip=True,
+    )
+
+
 @register.filter(name='markdown_sanitize')
 def markdown_sanitize(text: Any) -> str:
-    """Render Markdown to HTML and sanitize using Bleach.
+    """Render Markdown to HTML and sanitize using nh3 (or Bleach if nh3 is not installed).
 
     Allowed tags/attrs are conservative: headings, emphasis, code, lists, links, paragraphs.
     Disallows images/iframes/scripts.
     """
-    from django.utils.safestring import mark_safe
     try:
         s = str(text or '')
     except Exception:
         return ''
     if not s:
         return ''
+    # ключ по содержимому: изменённое био — новый ключ, инвалидация не нужна
+    key = MARKDOWN_CACHE_PREFIX + hashlib.blake2b(s.encode('utf-8'), digest_size=12).hexdigest()
+    hit = cache.get(key)
+    if hit is not None:
+        return mark_safe(hit)
     try:
-        import markdown as _md  # type: ignore
-        import bleach  # type: ignore
+        if (_mistune_render is None and _md is None) or (nh3 is None and bleach is None):
+            raise ImportError('mistune/markdown or nh3/bleach not installed')
         # Render basic Markdown
-        html = _md.markdown(s, extensions=['extra', 'sane_lists'])
-        # Remove dangerous blocks entirely (strip tag + its content) before sanitizing
-        try:
-            import re as _re
-            html = _re.sub(r'(?is)<script[^>]*>.*?</script>', '', html)
-            html = _re.sub(r'(?is)<style[^>]*>.*?</style>', '', html)
-        except Exception:
-            pass
-        # Normalize legacy HTML tags to semantic equivalents before sanitizing
-        # e.g., <b> -> <strong>, <i> -> <em>
-        try:
-            import re as _re
-            # open tags with optional attributes
-            html = _re.sub(r"<\s*b(\s+[^>]*)?>", "<strong>", html, flags=_re.IGNORECASE)
-            html = _re.sub(r"<\s*/\s*b\s*>", "</strong>", html, flags=_re.IGNORECASE)
-            html = _re.sub(r"<\s*i(\s+[^>]*)?>", "<em>", html, flags=_re.IGNORECASE)
-            html = _re.sub(r"<\s*/\s*i\s*>", "</em>", html, flags=_re.IGNORECASE)
-        except Exception:
-            pass
-        allowed_tags = [
-            'p', 'br', 'em', 'strong', 'code', 'pre', 'blockquote',
-            'ul', 'ol', 'li', 'a', 'h1', 'h2', 'h3', 'h4'
-        ]
-        allowed_attrs = {
-            'a': ['href', 'title', 'rel', 'target'],
-        }
-        clean = bleach.clean(
-            html,
-            tags=allowed_tags,
-            attributes=allowed_attrs,
-            protocols=['http', 'https', 'mailto'],
-            strip=True,
-        )
+        html = _render_markdown(s)
+        html = _B_OPEN_RE.sub('<strong>', html)
+        html = _B_CLOSE_RE.sub('</strong>', html)
+        html = _I_OPEN_RE.sub('<em>', html)
+        html = _I_CLOSE_RE.sub('</em>', html)
+        clean = _sanitize_html(html)
         # Ensure links get rel and target for safety/UX
         # Apply linkify with safe rel/target; bleach 6+ exposes default callbacks via bleach.linkifier
         try:
@@ -489,10 +763,10 @@ def markdown_sanitize(text: Any) -> str:
         except Exception:
             # Fallback: leave links as-is if linkifier not available
             pass
+        cache.set(key, clean, MARKDOWN_CACHE_TTL)
         return mark_safe(clean)
     except Exception:
         # If markdown/bleach not available, fall back to escaped text with simple breaks
-        from django.utils.html import escape
         esc = escape(s).replace('\n', '<br>')
         return mark_safe(f"<p>{esc}</p>")
 
@@ -500,9 +774,11 @@ def markdown_sanitize(text: Any) -> str:
 @register.filter
 def get_item(d: Any, key: Any) -> Any:
     """Dictionary .get() helper for templates: {{ dict|get_item:key }}"""
+    if isinstance(d, dict):
+        return d.get(key)
     try:
         return d.get(key)
-    except Exception:
+    except (AttributeError, TypeError):
         return None
 
 
@@ -515,10 +791,9 @@ def star_fill(avg: Any, index: int) -> str:
     Logic: full if avg >= index; half if avg >= index - 0.5; else empty.
     """
     try:
-        from decimal import Decimal
-        a = Decimal(str(avg))
+        a = _to_dec(avg)
         i = int(index)
-    except Exception:
+    except (InvalidOperation, TypeError, ValueError):
         return 'empty'
     if a >= i:
         return 'full'
@@ -546,6 +821,15 @@ def star_steps() -> list[str]:
 # -----------------------------
 from PIL import Image, ImageFile  # type: ignore
 ImageFile.LOAD_TRUNCATED_IMAGES = True
+try:
+    # libvips: потоковый ресайз + WebP-кодирование в разы быстрее Pillow; без него — Pillow
+    import pyvips  # type: ignore
+except (ImportError, OSError):  # OSError — модуль есть, а libvips в системе нет
+    pyvips = None
+
+# Pillow WebP: method=6 примерно вдвое медленнее method=4 ради <1% размера
+WEBP_METHOD = 4
+WEBP_VIPS_EFFORT = 4
 
 
 def _posix_path(p: str) -> str:
@@ -559,31 +843,25 @@ def _url_to_local_path(src: str) -> Optional[str]:
     """
     if not src:
         return None
-    # Normalize MEDIA_URL (may be '/media/' or absolute)
-    media_url = str(settings.MEDIA_URL)
-    if not media_url.endswith('/'):
-        media_url += '/'
-
     s = str(src)
     if s.startswith('http://') or s.startswith('https://'):
         return None
     # Handle '/media/...'
-    if s.startswith(media_url):
-        rel = s[len(media_url):]
+    if s.startswith(_MEDIA_URL):
+        rel = s[len(_MEDIA_URL):]
     elif s.startswith('/media/'):
         rel = s[len('/media/'):]
     else:
         # allow passing a relative media path like 'covers/x.jpg' or 'steam_imports/...'
         rel = s
-    abs_path = os.path.join(str(settings.MEDIA_ROOT), rel)
-    return abs_path
+    return os.path.join(_MEDIA_ROOT, rel)
 
 
 def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def _variant_path(orig_abs: str, target_width: int, fmt: str = 'webp') -> tuple[str, str]:
+def _variant_path(orig_abs: str, target_width: int, fmt: str = 'webp', create_dir: bool = True) -> tuple[str, str]:
     """Return (variant_abs, variant_rel) paths for a given original file.
 
     Variants are stored alongside original in a 'variants/' subfolder:
@@ -593,10 +871,11 @@ def _variant_path(orig_abs: str, target_width: int, fmt: str = 'webp') -> tuple[
     base_dir, fname = os.path.split(orig_abs)
     name, _ext = os.path.splitext(fname)
     variants_dir = os.path.join(base_dir, 'variants')
-    _ensure_dir(variants_dir)
+    if create_dir:
+        _ensure_dir(variants_dir)
     variant_fname = f"{name}_w{int(target_width)}.{fmt.lower()}"
     variant_abs = os.path.join(variants_dir, variant_fname)
-    media_root = str(settings.MEDIA_ROOT)
+    media_root = _MEDIA_ROOT
     variant_rel = _posix_path(os.path.relpath(variant_abs, media_root))
     return variant_abs, variant_rel
 
@@ -612,6 +891,134 @@ def _needs_regen(src_abs: str, dst_abs: str) -> bool:
         return True
 
 
+def _vips_webp_variant(abs_path: str, variant_abs: str, width: int, quality: int) -> bool:
+    """Ресайз + WebP через libvips (без апскейла). False — не получилось, пусть работает Pillow."""
+    try:
+        image = pyvips.Image.thumbnail(abs_path, int(width), size='down')
+        image.webpsave(variant_abs, Q=int(quality), effort=WEBP_VIPS_EFFORT)
+        return True
+    except Exception:
+        return False
+
+
+def _pillow_variants(abs_path: str, targets: List[tuple[int, str]], fmt: str, quality: int) -> None:
+    """Все ширины из одного декодирования: open/convert один раз, дальше только resize+save."""
+    from PIL import Image as _Image  # local import for static analyzers
+    try:
+        resample = getattr(_Image, 'LANCZOS', getattr(_Image, 'Resampling', None).LANCZOS if hasattr(getattr(_Image, 'Resampling', None), 'LANCZOS') else getattr(_Image, 'BICUBIC', 1))  # type: ignore[attr-defined]
+    except Exception:  # fallback
+        resample = 1  # BILINEAR
+    save_kwargs: Dict[str, Any] = {}
+    if fmt.lower() == 'webp':
+        save_kwargs = {'quality': int(quality), 'method': WEBP_METHOD}
+    with _Image.open(abs_path) as im:  # type: ignore[assignment]
+        if im.mode in ('P', 'LA'):
+            im = im.convert('RGBA')
+        elif im.mode in ('CMYK',):
+            im = im.convert('RGB')
+        else:
+            im.load()
+        # keep aspect ratio, don't upscale
+        orig_w, orig_h = im.size
+        for w, variant_abs in targets:
+            target_w = min(w, orig_w)
+            target_h = max(1, int(round(orig_h * target_w / float(orig_w))))
+            resized = im.resize((int(target_w), int(target_h)), resample)
+            resized.save(variant_abs, fmt.upper(), optimize=True, **save_kwargs)
+
+
+def _generate_variants(abs_path: str, targets: List[tuple[int, str]], fmt: str, quality: int) -> None:
+    """Закодировать варианты во временные файлы и атомарно подменить (читатели не видят полуфайл).
+
+    targets — [(ширина, путь варианта)]; Pillow декодирует исходник один раз на все ширины.
+    """
+    suffix = f"{os.getpid()}.{threading.get_ident()}.part"
+    tmp = [(w, variant_abs, os.path.join(os.path.dirname(variant_abs), f".{os.path.basename(variant_abs)}.{suffix}"))
+           for w, variant_abs in targets]
+    try:
+        pending = tmp
+        if pyvips is not None and fmt.lower() == 'webp':
+            # libvips сам уменьшает при декодировании (shrink-on-load) — ему по вызову на ширину
+            pending = [t for t in tmp if not _vips_webp_variant(abs_path, t[2], t[0], quality)]
+        if pending:
+            _pillow_variants(abs_path, [(w, tmp_abs) for w, _, tmp_abs in pending], fmt, quality)
+        for _, variant_abs, tmp_abs in tmp:
+            os.replace(tmp_abs, variant_abs)
+    finally:
+        for _, _, tmp_abs in tmp:
+            if os.path.exists(tmp_abs):
+                os.unlink(tmp_abs)
+
+
+def _generate_variant(abs_path: str, variant_abs: str, w: int, fmt: str, quality: int) -> None:
+    _generate_variants(abs_path, [(w, variant_abs)], fmt, quality)
+
+
+# Кодирование вариантов — вне рендера: фоновые потоки процесса (Celery в проекте нет)
+VARIANT_WORKERS = 2
+VARIANT_LOCK_SECONDS = 60
+# битый/нечитаемый исходник: lock остаётся на час, чтобы каждый рендер не ставил задачу заново
+VARIANT_FAILED_SECONDS = 3600
+_VARIANT_EXECUTOR = ThreadPoolExecutor(max_workers=VARIANT_WORKERS, thread_name_prefix='img-variant')
+
+
+def _generate_variants_bg(abs_path: str, targets: List[tuple[int, str]], fmt: str, quality: int,
+                          lock_keys: List[str]) -> None:
+    try:
+        _generate_variants(abs_path, targets, fmt, quality)
+    except Exception:
+        logger.exception('Image variant generation failed for %s', abs_path)
+        cache.set_many({key: 'failed' for key in lock_keys}, VARIANT_FAILED_SECONDS)
+    else:
+        cache.delete_many(lock_keys)
+
+
+def _schedule_variants(abs_path: str, targets: List[tuple[int, str]], fmt: str, quality: int) -> None:
+    # один запуск на вариант, даже если его запросили десятки рендеров/воркеров одновременно;
+    # захваченные ширины одного исходника кодируются одной задачей
+    acquired: List[tuple[int, str]] = []
+    lock_keys: List[str] = []
+    for w, variant_abs in targets:
+        lock_key = f"imgvar_lock:{variant_abs}"
+        try:
+            if not cache.add(lock_key, 1, VARIANT_LOCK_SECONDS):
+                continue
+        except Exception:
+            pass
+        acquired.append((w, variant_abs))
+        lock_keys.append(lock_key)
+    if acquired:
+        _VARIANT_EXECUTOR.submit(_generate_variants_bg, abs_path, acquired, fmt, quality, lock_keys)
+
+
+def _schedule_variant(abs_path: str, variant_abs: str, w: int, fmt: str, quality: int) -> None:
+    _schedule_variants(abs_path, [(w, variant_abs)], fmt, quality)
+
+
+def ensure_img_variant(src: str, width: Union[int, str], fmt: str = 'webp', quality: int = 85) -> str:
+    """Синхронно создать (при необходимости) вариант и вернуть его URL; src — если не вышло.
+
+    Для management-команд и фоновых задач; в шаблонах — {% img_url_w %}.
+    """
+    try:
+        w = int(width)
+        if w <= 0:
+            return src
+    except Exception:
+        return src
+    abs_path = _url_to_local_path(src)
+    if not abs_path or not _isfile_cached(abs_path):
+        return src
+    try:
+        variant_abs, variant_rel = _variant_path(abs_path, w, fmt)
+        if _needs_regen(abs_path, variant_abs):
+            _generate_variant(abs_path, variant_abs, w, fmt, quality)
+        return _posix_path(_MEDIA_URL + variant_rel)
+    except Exception:
+        # On any error, fail soft and return original src
+        return src
+
+
 @register.simple_tag
 def img_url_w(src: str, width: Union[int, str], fmt: str = 'webp', quality: int = 85) -> str:
     """Return URL for a resized WebP variant of a media image at given width.
@@ -619,6 +1026,7 @@ def img_url_w(src: str, width: Union[int, str], fmt: str = 'webp', quality: int
     - If src is not under MEDIA_URL or file missing, returns src unchanged.
     - Variants are cached under '<orig_dir>/variants/<name>_w<width>.<fmt>'.
     - No upscaling: if original width < requested width, original width is used.
+    - Нет варианта — ставим кодирование в фон и пока отдаём src (устаревший вариант — отдаём его).
     """
     try:
         w = int(width)
@@ -628,38 +1036,41 @@ def img_url_w(src: str, width: Union[int, str], fmt: str = 'webp', quality: int
         return src
 
     abs_path = _url_to_local_path(src)
-    if not abs_path or not os.path.isfile(abs_path):
+    if not abs_path or not _isfile_cached(abs_path):
         return src
 
     try:
         variant_abs, variant_rel = _variant_path(abs_path, w, fmt)
-        if _needs_regen(abs_path, variant_abs):
-            from PIL import Image as _Image  # local import for static analyzers
-            with _Image.open(abs_path) as im:  # type: ignore[assignment]
-                # keep aspect ratio, don't upscale
-                orig_w, orig_h = im.size
-                target_w = min(w, orig_w)
-                if im.mode in ('P', 'LA'):
-                    im = im.convert('RGBA')
-                elif im.mode in ('CMYK',):
-                    im = im.convert('RGB')
-                ratio = target_w / float(orig_w)
-                target_h = max(1, int(round(orig_h * ratio)))
-                try:
-                    resample = getattr(_Image, 'LANCZOS', getattr(_Image, 'Resampling', None).LANCZOS if hasattr(getattr(_Image, 'Resampling', None), 'LANCZOS') else getattr(_Image, 'BICUBIC', 1))  # type: ignore[attr-defined]
-                except Exception:  # fallback
-                    resample = 1  # BILINEAR
-                im = im.resize((int(target_w), int(target_h)), resample)
-                save_kwargs: Dict[str, Any] = {}
-                if fmt.lower() == 'webp':
-                    save_kwargs = {'quality': int(quality), 'method': 6}
-                im.save(variant_abs, fmt.upper(), optimize=True, **save_kwargs)
-        return _posix_path(str(settings.MEDIA_URL) + variant_rel)
+        url = _posix_path(_MEDIA_URL + variant_rel)
+        if not _needs_regen(abs_path, variant_abs):
+            return url
+        _schedule_variant(abs_path, variant_abs, w, fmt, quality)
+        return url if os.path.exists(variant_abs) else src
     except Exception:
         # On any error, fail soft and return original src
         return src
 
 
+@register.simple_tag
+def img_variant_ready(src: str, width: Union[int, str], fmt: str = 'webp') -> str:
+    """Return URL of an already generated variant, or `src` if it is missing/stale.
+
+    Unlike img_url_w this never encodes images during render: variants are
+    produced off the request path (e.g. by `manage.py generate_avatar_variants`).
+    """
+    try:
+        w = int(width)
+    except (TypeError, ValueError):
+        return src
+    abs_path = _url_to_local_path(src)
+    if not abs_path or w <= 0:
+        return src
+    variant_abs, variant_rel = _variant_path(abs_path, w, fmt, create_dir=False)
+    if _needs_regen(abs_path, variant_abs):
+        return src
+    return _posix_path(_MEDIA_URL + variant_rel)
+
+
 @register.simple_tag
 def srcset_webp(src: str, widths: str = '320,480,640,800', quality: int = 85) -> str:
     """Build a WebP srcset string for a media image.
@@ -669,9 +1080,10 @@ def srcset_webp(src: str, widths: str = '320,480,640,800', quality: int = 85) ->
     """
     try:
         abs_path = _url_to_local_path(src)
-        if not abs_path or not os.path.isfile(abs_path):
+        if not abs_path or not _isfile_cached(abs_path):
             return ''
-        pairs: List[str] = []
+        variants: List[tuple[int, str, str]] = []
+        missing: List[tuple[int, str]] = []
         for token in str(widths).split(','):
             token = token.strip()
             if not token:
@@ -680,43 +1092,130 @@ def srcset_webp(src: str, widths: str = '320,480,640,800', quality: int = 85) ->
                 w = int(token)
             except Exception:
                 continue
-            url = img_url_w(src, w, 'webp', quality)
-            if url:
-                pairs.append(f"{url} {w}w")
-        return ', '.join(pairs)
+            if w <= 0:
+                continue
+            variant_abs, variant_rel = _variant_path(abs_path, w, 'webp')
+            variants.append((w, variant_abs, variant_rel))
+            if _needs_regen(abs_path, variant_abs):
+                missing.append((w, variant_abs))
+        if missing:
+            # все недостающие ширины — одной фоновой задачей (одно декодирование исходника)
+            _schedule_variants(abs_path, missing, 'webp', quality)
+        # вариант ещё кодируется в фоне — оригинал под видом "{w}w" не подставляем
+        return ', '.join(
+            f"{_posix_path(_MEDIA_URL + variant_rel)} {w}w"
+            for w, variant_abs, variant_rel in variants
+            if os.path.exists(variant_abs)
+        )
     except Exception:
         return ''
 
 # -----------------------------
 # Dimension helper for CLS
 # -----------------------------
-_DIM_CACHE: dict[str, tuple[int, int]] = {}
-
-def _local_media_abs(src: str) -> Optional[str]:
-    """Map MEDIA_URL or relative media path to absolute path under MEDIA_ROOT."""
-    if not src:
-        return None
-    media_url = str(settings.MEDIA_URL)
-    if not media_url.endswith('/'):
-        media_url += '/'
-    s = str(src)
-    if s.startswith('http://') or s.startswith('https://'):
-        return None
-    if s.startswith(media_url):
-        rel = s[len(media_url):]
-    elif s.startswith('/media/'):
-        rel = s[len('/media/'):]
-    else:
-        rel = s
-    abs_path = os.path.join(str(settings.MEDIA_ROOT), rel)
-    return abs_path
+# (путь, mtime) -> размеры; только удачные замеры, битый файл перепроверяется
+_DIM_CACHE: dict[tuple[str, int], tuple[int, int]] = {}
+DIM_CACHE_TTL = 24 * 3600
+DIM_FAILURE_TTL = 60
+
+
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_dims(f: Any) -> Optional[tuple[int, int]]:
+    """Пройти по сегментам JPEG до SOFn (EXIF/ICC перед ним пропускаем seek'ом)."""
+    f.seek(2)
+    for _ in range(256):
+        b = f.read(1)
+        while b == b'\xff':
+            b = f.read(1)
+        if not b:
+            return None
+        marker = b[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue  # маркеры без длины
+        seg = f.read(2)
+        if len(seg) < 2:
+            return None
+        length = struct.unpack('>H', seg)[0]
+        if marker in _JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            h, w = struct.unpack('>HH', data[1:5])
+            return w, h
+        f.seek(length - 2, os.SEEK_CUR)
+        # следующий сегмент обязан начинаться с 0xFF
+        b = f.read(1)
+        if b != b'\xff':
+            return None
+        f.seek(-1, os.SEEK_CUR)
+    return None
+
+
+def _fast_dims(abs_path: str) -> Optional[tuple[int, int]]:
+    """Размеры PNG/GIF/JPEG/WebP из заголовка файла без Pillow. None — формат не распознан."""
+    with open(abs_path, 'rb') as f:
+        head = f.read(32)
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', head[6:10])
+        if head[:2] == b'\xff\xd8':
+            return _jpeg_dims(f)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            chunk = head[12:16]
+            if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+                w, h = struct.unpack('<HH', head[26:30])
+                return w & 0x3FFF, h & 0x3FFF
+            if chunk == b'VP8L' and head[20:21] == b'\x2f':
+                bits = int.from_bytes(head[21:25], 'little')
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b'VP8X':
+                return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    return None
+
+
+def _probe_dims(abs_path: str) -> tuple[int, int]:
+    """Размеры файла: общий кеш (все воркеры, переживает рестарт) -> заголовок -> Pillow.
+
+    Ключ содержит mtime — заменённый файл получает новую запись без явной инвалидации;
+    старые записи истекают по TTL. (0, 0) — не удалось, кешируется ненадолго.
+    """
+    try:
+        mtime = int(os.path.getmtime(abs_path))
+    except OSError:
+        return (0, 0)
+    local = _DIM_CACHE.get((abs_path, mtime))
+    if local is not None:
+        return local
+    key = f"dim:{abs_path}:{mtime}"
+    dims = cache.get(key)
+    if dims is None:
+        try:
+            # сначала заголовок файла (микросекунды), Pillow — для прочих форматов
+            dims = _fast_dims(abs_path)
+        except Exception:
+            dims = None
+        if dims is None:
+            try:
+                with Image.open(abs_path) as im:  # type: ignore[assignment]
+                    w, h = im.size
+                dims = (int(w), int(h))
+            except Exception:
+                dims = (0, 0)
+        cache.set(key, dims, DIM_CACHE_TTL if dims != (0, 0) else DIM_FAILURE_TTL)
+    dims = tuple(dims)
+    if dims != (0, 0):
+        _DIM_CACHE[(abs_path, mtime)] = dims  # type: ignore[assignment]
+    return dims  # type: ignore[return-value]
 
 @register.simple_tag
 def img_dims(src: str) -> str:
     """Return width/height attributes for an image to reduce layout shift.
 
     Priority:
-      1. Local media file -> probe via Pillow (cached in-process)
+      1. Local media file -> probe via Pillow (cached in-process and in the shared cache)
       2. Steam CDN header heuristic (460x215) if URL matches header pattern
       3. Empty string if unknown.
 
@@ -728,17 +1227,9 @@ def img_dims(src: str) -> str:
         # Heuristic for Steam headers
         if ('steamstatic.com/steam/apps/' in src) and ('header' in src):
             return 'width="460" height="215"'
-        abs_path = _local_media_abs(src)
-        if abs_path and os.path.isfile(abs_path):
-            cached = _DIM_CACHE.get(abs_path)
-            if not cached:
-                try:
-                    with Image.open(abs_path) as im:  # type: ignore[assignment]
-                        w, h = im.size
-                    _DIM_CACHE[abs_path] = (int(w), int(h))
-                except Exception:
-                    _DIM_CACHE[abs_path] = (0, 0)
-            w, h = _DIM_CACHE.get(abs_path, (0, 0))
+        abs_path = _url_to_local_path(src)
+        if abs_path and _isfile_cached(abs_path):
+            w, h = _probe_dims(abs_path)
             if w > 0 and h > 0:
                 return f'width="{w}" height="{h}"'
         return ''
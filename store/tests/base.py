@@ -0,0 +1,10 @@
+from django.test import TestCase, override_settings
+
+# PBKDF2 (сотни тысяч итераций) на каждый client.login — основная цена тестов с логином;
+# в тестах стойкость хеша не нужна
+FAST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(PASSWORD_HASHERS=FAST_PASSWORD_HASHERS)
+class FastHashTestCase(TestCase):
+    """TestCase с дешёвым MD5-хешером паролей."""
@@ -0,0 +1,33 @@
+"""Фабрики тестовых пользователей.
+
+factory_boy в зависимостях нет — обычные функции. Хеш пароля считается один раз
+на строку пароля, а не в каждом create_user (PBKDF2 — основная цена setUp).
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from store.models import UserProfile
+
+
+@lru_cache(maxsize=None)
+def _hashed_with(raw_password: str, hashers: tuple) -> str:
+    return make_password(raw_password)
+
+
+def _hashed(raw_password: str) -> str:
+    # ключ включает PASSWORD_HASHERS: хеш из-под override_settings (MD5) не должен
+    # попасть в класс с другим набором хешеров, и наоборот
+    return _hashed_with(raw_password, tuple(settings.PASSWORD_HASHERS))
+
+
+def make_user(username: str, password: str = 'pw', **fields):
+    """User с готовым хешем пароля: client.login(username, password) работает как обычно."""
+    return get_user_model().objects.create(username=username, password=_hashed(password), **fields)
+
+
+def make_profile(username: str, password: str = 'pw', email: str = '', **profile_fields) -> UserProfile:
+    """User + UserProfile; поля профиля — kwargs (preferred_currency='USD', ...)."""
+    return UserProfile.objects.create(user=make_user(username, password, email=email), **profile_fields)
@@ -1,52 +1,82 @@
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.test import TestCase
 from django.urls import reverse
 
 from store.models import Game, CartItem, Order, OrderItem
+from store.tests.base import FastHashTestCase
+from store.tests.factories import make_user
 
 
-class CheckoutFlowTests(TestCase):
-    def setUp(self):
-        User = get_user_model()
-        self.user = User.objects.create_user(username="buyer", password="pass1234")
+class CheckoutFlowTests(FastHashTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("buyer")
+        # статические URL резолвим один раз на класс
+        cls.checkout_url = reverse("store:checkout")
+        cls.cart_url = reverse("store:cart")
         # Two games with different currencies to test conversion path
-        self.g1 = Game.objects.create(title="Game USD", slug="game-usd", price=Decimal("10.00"), currency="USD")
-        self.g2 = Game.objects.create(title="Game EUR", slug="game-eur", price=Decimal("5.00"), currency="EUR")
+        cls.g1 = Game.objects.create(title="Game USD", slug="game-usd", price=Decimal("10.00"), currency="USD")
+        cls.g2 = Game.objects.create(title="Game EUR", slug="game-eur", price=Decimal("5.00"), currency="EUR")
 
     def login(self):
-        self.client.login(username="buyer", password="pass1234")
+        self.client.force_login(self.user)
 
     def test_checkout_then_fake_pay_clears_cart_and_creates_order(self):
         self.login()
         # Add items to cart
-        CartItem.objects.create(user=self.user, game=self.g1, quantity=2)
-        CartItem.objects.create(user=self.user, game=self.g2, quantity=1)
+        CartItem.objects.bulk_create([
+            CartItem(user=self.user, game=self.g1, quantity=2),
+            CartItem(user=self.user, game=self.g2, quantity=1),
+        ])
 
         # Step 1: POST checkout -> creates pending order and redirects to pay
-        resp = self.client.post(reverse("store:checkout"))
+        resp = self.client.post(self.checkout_url)
         self.assertEqual(resp.status_code, 302)
         self.assertIn("/pay/", resp.headers.get("Location", ""))
 
-        # Fetch created order
-        order = Order.objects.filter(user=self.user).order_by("-id").first()
+        # Fetch created order together with its snapshot size (one query)
+        order = (
+            Order.objects.filter(user=self.user).order_by("-id")
+            .annotate(n_items=Count("items_snapshot"))
+            .values("id", "status", "total_price", "n_items").first()
+        )
         self.assertIsNotNone(order)
-        self.assertEqual(order.status, "pending")
-        self.assertGreater(order.total_price, Decimal("0.00"))
+        self.assertEqual(order["status"], "pending")
+        self.assertGreater(order["total_price"], Decimal("0.00"))
         # Snapshot must exist and reflect 2 entries
-        self.assertEqual(OrderItem.objects.filter(order=order).count(), 2)
+        self.assertEqual(order["n_items"], 2)
 
         # Step 2: POST to payment -> marks paid, clears cart
-        pay_url = reverse("store:pay", args=[order.id])
+        pay_url = reverse("store:pay", args=[order["id"]])
         resp2 = self.client.post(pay_url)
         self.assertEqual(resp2.status_code, 302)
-        order.refresh_from_db()
-        self.assertEqual(order.status, "paid")
-        # Cart emptied
-        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 0)
+        # Paid and cart emptied (one query)
+        after = (
+            Order.objects.filter(pk=order["id"])
+            .annotate(cart_left=Count("user__cart_items"))
+            .values("status", "cart_left").get()
+        )
+        self.assertEqual(after, {"status": "paid", "cart_left": 0})
 
     def test_checkout_empty_cart_redirects(self):
         self.login()
-        resp = self.client.post(reverse("store:checkout"))
+        resp = self.client.post(self.checkout_url)
         self.assertEqual(resp.status_code, 302)
-        self.assertIn(reverse("store:cart"), resp.headers.get("Location", ""))
+        self.assertIn(self.cart_url, resp.headers.get("Location", ""))
+
+
+class OrderTotalTests(TestCase):
+    def test_compute_total_aggregates_in_db(self):
+        User = get_user_model()
+        user = User.objects.create_user(username='tot', password='pwd')
+        g1 = Game.objects.create(title='A', slug='a-tot', price=Decimal('3.50'), currency='USD')
+        g2 = Game.objects.create(title='B', slug='b-tot', price=Decimal('2.25'), currency='USD')
+        order = Order.objects.create(user=user, currency='USD')
+        OrderItem.objects.create(order=order, game=g1, quantity=2, price=Decimal('3.50'), currency='USD')
+        OrderItem.objects.create(order=order, game=g2, quantity=1, price=Decimal('2.25'), currency='USD')
+        with self.assertNumQueries(2):
+            self.assertEqual(order.refresh_total(), Decimal('9.25'))
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal('9.25'))
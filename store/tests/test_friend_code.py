@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from store.models import UserProfile
+
+
+class FriendCodeTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='fc', password='pwd')
+        self.other = User.objects.create_user(username='fc2', password='pwd')
+
+    def test_code_assigned_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            prof = UserProfile.objects.create(user=self.user)
+        self.assertTrue(prof.friend_code)
+        prof.refresh_from_db()
+        self.assertEqual(len(prof.friend_code), 10)
+
+    def test_collision_retries_with_new_code(self):
+        UserProfile.objects.create(user=self.other, friend_code='TAKENCODE1')
+        prof = UserProfile.objects.create(user=self.user)
+        codes = iter(['TAKENCODE1', 'FRESHCODE2'])
+        prof.generate_friend_code = lambda: next(codes)
+        self.assertEqual(prof.ensure_friend_code(), 'FRESHCODE2')
+        prof.refresh_from_db()
+        self.assertEqual(prof.friend_code, 'FRESHCODE2')
+
+    def test_generated_code_uses_unambiguous_alphabet(self):
+        code = UserProfile.generate_friend_code(64)
+        self.assertEqual(len(code), 64)
+        self.assertFalse(set(code) & {'O', '0', 'I', '1'})
+
+    def test_backfill_assigns_unique_codes_in_bulk(self):
+        UserProfile.objects.create(user=self.other, friend_code='TAKENCODE1')
+        User = get_user_model()
+        for i in range(5):
+            UserProfile.objects.create(user=User.objects.create_user(username=f'bf{i}', password='pwd'))
+        self.assertEqual(UserProfile.backfill_friend_codes(batch=2), 5)
+        codes = list(UserProfile.objects.values_list('friend_code', flat=True))
+        self.assertNotIn(None, codes)
+        self.assertEqual(len(codes), len(set(codes)))
+
+    def test_claim_fails_when_profile_row_is_gone(self):
+        prof = UserProfile.objects.create(user=self.user)
+        UserProfile.objects.filter(pk=prof.pk).delete()
+        self.assertFalse(prof._claim_friend_code('GONECODE12'))
+        self.assertIsNone(prof.ensure_friend_code())
+        self.assertFalse(UserProfile(user=self.other)._claim_friend_code('NOPKCODE12'))
+
+    def test_fallback_collision_returns_none(self):
+        prof = UserProfile.objects.create(user=self.user)
+        fallback = ''
+        n = self.user.pk
+        while n:
+            n, r = divmod(n, 36)
+            fallback = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'[r] + fallback
+        UserProfile.objects.create(user=self.other, friend_code=fallback)
+        prof.generate_friend_code = lambda: fallback
+        self.assertIsNone(prof.ensure_friend_code())
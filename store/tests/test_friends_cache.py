@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from django.test import TestCase
+from store.models import Friendship, friends_of
+from store.tests.factories import make_user
+
+
+class FriendsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.a = make_user('fa', 'pwd')
+        cls.b = make_user('fb', 'pwd')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_friends_of_is_cached_and_invalidated(self):
+        self.assertEqual(friends_of(self.a.id), frozenset())
+        Friendship.objects.create(user_a=self.b, user_b=self.a)
+        self.assertEqual(friends_of(self.a.id), frozenset({self.b.id}))
+        friends_of(self.b.id)
+        with self.assertNumQueries(0):
+            self.assertIn(self.a.id, friends_of(self.b.id))
+        Friendship.objects.all().delete()
+        self.assertEqual(friends_of(self.b.id), frozenset())
@@ -0,0 +1,17 @@
+from django.test import TestCase
+from store.models import Genre, Developer
+
+
+class GenreBulkTests(TestCase):
+    def test_get_or_create_many_keeps_order_and_reuses_existing(self):
+        existing = Genre.objects.create(name='Action')
+        with self.assertNumQueries(3):
+            genres = Genre.get_or_create_many(['RPG', 'Action', '', 'RPG', 'Indie'])
+        self.assertEqual([g.name for g in genres], ['RPG', 'Action', 'Indie'])
+        self.assertEqual(genres[1].pk, existing.pk)
+        self.assertEqual(Genre.objects.get(name='Indie').slug, 'indie')
+
+    def test_build_sets_slug_without_save(self):
+        dev = Developer.build('Valve Corporation')
+        self.assertIsNone(dev.pk)
+        self.assertEqual(dev.slug, 'valve-corporation')
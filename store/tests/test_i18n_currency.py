@@ -1,17 +1,21 @@
 from decimal import Decimal
+from django.core.cache import cache
 from django.test import TestCase, Client, override_settings
-from django.contrib.auth import get_user_model
 from django.urls import reverse
-from store.models import UserProfile, CurrencyRate
+from store.models import CurrencyRate
+from store.utils import currency as currency_utils
 from store.utils.currency import convert_amount
 from unittest.mock import patch
+from store.tests.base import FastHashTestCase
+from store.tests.factories import make_profile
 
 
-class LanguagePreferenceTests(TestCase):
+class LanguagePreferenceTests(FastHashTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_profile('ivan', 'pwd', email='i@example.com', preferred_language='uk').user
+
     def setUp(self):
-        self.User = get_user_model()
-        self.user = self.User.objects.create_user(username='ivan', password='pwd', email='i@example.com')
-        UserProfile.objects.create(user=self.user, preferred_language='uk')
         self.client = Client()
 
     def test_home_contains_ukrainian_translation_fragment(self):
@@ -27,17 +31,64 @@ class LanguagePreferenceTests(TestCase):
 
 
 class CurrencyConversionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        currency_utils._CACHE.clear()
+        currency_utils._CACHE_TS.clear()
+        currency_utils._MICRO_MEMO.clear()
+
     def test_convert_uses_db_rates_when_available(self):
         # Создаём записи курсов для USD base
         CurrencyRate.objects.create(base='USD', target='EUR', rate=Decimal('0.90'))
         CurrencyRate.objects.create(base='USD', target='UAH', rate=Decimal('40.00'))
-        # Форсим падение сетевого запроса, чтобы использовать БД fallback
-        with patch('store.utils.currency.requests.get', side_effect=Exception('network disabled')):
-            eur = convert_amount(Decimal('10'), 'USD', 'EUR')
-            self.assertEqual(eur, Decimal('9.00'))
-            uah = convert_amount(Decimal('5'), 'USD', 'UAH')
-            self.assertEqual(uah, Decimal('200.00'))
+        # сеть в тестах отключена (conftest) — используется БД fallback
+        eur = convert_amount(Decimal('10'), 'USD', 'EUR')
+        self.assertEqual(eur, Decimal('9.00'))
+        uah = convert_amount(Decimal('5'), 'USD', 'UAH')
+        self.assertEqual(uah, Decimal('200.00'))
 
     def test_convert_same_currency_rounding(self):
         amt = convert_amount(Decimal('10.005'), 'USD', 'USD')
         self.assertEqual(amt, Decimal('10.01'))
+
+    @override_settings(CURRENCY_FETCH_ENABLED=False)
+    def test_fallback_rates_cached_between_calls(self):
+        convert_amount(Decimal('1'), 'USD', 'EUR')
+        # курсов в БД нет — повторная конвертация не должна снова ходить в БД
+        with self.assertNumQueries(0):
+            self.assertEqual(convert_amount(Decimal('10'), 'USD', 'EUR'), Decimal('9.20'))
+
+    def test_latest_rates_map_picks_newest_per_pair(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        old = CurrencyRate.objects.create(base='USD', target='EUR', rate=Decimal('0.80'))
+        CurrencyRate.objects.filter(pk=old.pk).update(fetched_at=timezone.now() - timedelta(days=1))
+        CurrencyRate.objects.create(base='USD', target='EUR', rate=Decimal('0.95'))
+        CurrencyRate.objects.create(base='USD', target='UAH', rate=Decimal('41.00'))
+        with self.assertNumQueries(1):
+            rates = CurrencyRate.latest_rates_map([('USD', 'EUR'), ('USD', 'UAH'), ('USD', 'JPY')])
+        self.assertEqual(rates, {('USD', 'EUR'): Decimal('0.95'), ('USD', 'UAH'): Decimal('41.00')})
+
+    def test_rate_micro_filled_on_save(self):
+        CurrencyRate.objects.create(base='USD', target='EUR', rate=Decimal('0.9234567'))
+        self.assertEqual(CurrencyRate.latest_rate_micro('USD', 'EUR'), 923457)
+        self.assertIsNone(CurrencyRate.latest_rate_micro('USD', 'JPY'))
+
+    @override_settings(CURRENCY_FETCH_ENABLED=False)
+    def test_display_conversion_uses_integer_rate(self):
+        self.assertEqual(currency_utils.convert_cents(1000, 920_000), 920)
+        self.assertEqual(currency_utils.convert_amount_display(Decimal('41.00'), 'UAH', 'USD'), Decimal('1.00'))
+        self.assertEqual(currency_utils.convert_amount_display(Decimal('10'), 'USD', 'EUR'), convert_amount(Decimal('10'), 'USD', 'EUR'))
+
+    @override_settings(CURRENCY_FETCH_ENABLED=False)
+    def test_rate_micro_memoized_per_pair(self):
+        currency_utils.rate_micro('USD', 'EUR')
+        with patch.object(currency_utils, '_fetch_rates', side_effect=AssertionError('rates lookup')):
+            self.assertEqual(currency_utils.rate_micro('USD', 'EUR'), 920_000)
+
+    @override_settings(CURRENCY_FETCH_ENABLED=False)
+    def test_rate_micro_reads_stored_integer(self):
+        CurrencyRate.objects.create(base='USD', target='EUR', rate=Decimal('0.90'))
+        # rate_micro в строке расходится с float-курсом — должно использоваться именно оно
+        CurrencyRate.objects.update(rate_micro=912_345)
+        self.assertEqual(currency_utils.rate_micro('USD', 'EUR'), 912_345)
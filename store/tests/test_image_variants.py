@@ -1,32 +1,61 @@
 from __future__ import annotations
 import os
 import shutil
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
 from django.test import TestCase
 from django.conf import settings
 from PIL import Image
 
-from store.templatetags.store_extras import img_url_w, srcset_webp
+from store.templatetags import store_extras
+from store.templatetags.store_extras import ensure_img_variant, img_url_w, img_variant_ready, srcset_webp
+
+
+class _InlineExecutor:
+    """Выполняет «фоновое» кодирование сразу — тестам нужен готовый файл."""
+    def submit(self, fn, *args, **kwargs):
+        fn(*args, **kwargs)
 
 
 class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # исходник 800x450 (16:9) кодируем один раз на класс, а не в каждом тесте
+        cls.media_root = str(settings.MEDIA_ROOT)
+        cls.test_dir = os.path.join(cls.media_root, 'test_src')
+        os.makedirs(cls.test_dir, exist_ok=True)
+        cls.src_abs = os.path.join(cls.test_dir, 'sample.jpg')
+        Image.new('RGB', (800, 450), color=(10, 40, 90)).save(cls.src_abs, 'JPEG', quality=92)
+        cls.src_url = f"{settings.MEDIA_URL}test_src/sample.jpg"
+        # готовый крошечный WebP: тесты «быстрого пути» раскладывают его как уже созданный вариант
+        buf = BytesIO()
+        Image.new('RGB', (1, 1)).save(buf, 'WEBP')
+        cls.tiny_webp = buf.getvalue()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+        super().tearDownClass()
+
     def setUp(self):
-        self.media_root = str(settings.MEDIA_ROOT)
-        self.test_dir = os.path.join(self.media_root, 'test_src')
-        os.makedirs(self.test_dir, exist_ok=True)
-        # Create a sample image 800x450 (16:9)
-        self.src_abs = os.path.join(self.test_dir, 'sample.jpg')
-        if not os.path.exists(self.src_abs):
-            img = Image.new('RGB', (800, 450), color=(10, 40, 90))
-            img.save(self.src_abs, 'JPEG', quality=92)
-        self.src_url = f"{settings.MEDIA_URL}test_src/sample.jpg"
-
-    def tearDown(self):
-        # Clean up test directory to avoid residue between runs
-        if os.path.isdir(self.test_dir):
-            try:
-                shutil.rmtree(self.test_dir)
-            except Exception:
-                pass
+        cache.clear()
+        executor = patch.object(store_extras, '_VARIANT_EXECUTOR', _InlineExecutor())
+        executor.start()
+        self.addCleanup(executor.stop)
+        # тесты проверяют размеры/пути, а не степень сжатия: самый быстрый режим libwebp
+        for name in ('WEBP_METHOD', 'WEBP_VIPS_EFFORT'):
+            fast = patch.object(store_extras, name, 0)
+            fast.start()
+            self.addCleanup(fast.stop)
+        # варианты — результат теста; исходник остаётся до конца класса
+        self.addCleanup(shutil.rmtree, os.path.join(self.test_dir, 'variants'), ignore_errors=True)
+
+    def _seed_variant(self, width: int) -> str:
+        variant_abs, _rel = store_extras._variant_path(self.src_abs, width, 'webp')
+        with open(variant_abs, 'wb') as f:
+            f.write(self.tiny_webp)
+        return variant_abs
 
     def _url_to_abs(self, url: str) -> str:
         media_url = str(settings.MEDIA_URL)
@@ -49,10 +78,76 @@ class ImageVariantsTest(TestCase):
             self.assertLessEqual(im.size[0], 320)
 
     def test_srcset_webp_returns_expected_pairs(self):
-        ss = srcset_webp(self.src_url, '320,640')
+        # варианты уже на диске — srcset собирается без кодирования
+        seeded = {self._seed_variant(320), self._seed_variant(640)}
+        with patch.object(store_extras, '_generate_variants', side_effect=AssertionError('encoded')):
+            ss = srcset_webp(self.src_url, '320,640')
         self.assertIn('320w', ss)
         self.assertIn('640w', ss)
-        # and files exist for both widths
         parts = [p.strip().split(' ')[0] for p in ss.split(',') if p.strip()]
-        for url in parts:
-            self.assertTrue(os.path.isfile(self._url_to_abs(url)))
+        self.assertEqual({self._url_to_abs(url) for url in parts}, seeded)
+
+    def test_srcset_webp_decodes_source_once_for_all_widths(self):
+        with patch.object(store_extras, 'pyvips', None), \
+                patch('PIL.Image.open', wraps=Image.open) as opened:
+            ss = srcset_webp(self.src_url, '160,320,480')
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(ss.split(', ')), 3)
+
+    def test_img_variant_ready_falls_back_until_generated(self):
+        # no variant yet -> original URL, and nothing is encoded during render
+        self.assertEqual(img_variant_ready(self.src_url, 64), self.src_url)
+        self.assertFalse(os.path.isdir(os.path.join(self.test_dir, 'variants')))
+        generated = img_url_w(self.src_url, 64)
+        self.assertEqual(img_variant_ready(self.src_url, 64), generated)
+
+    def test_img_url_w_defers_encoding_to_background(self):
+        fake = MagicMock()
+        with patch.object(store_extras, '_VARIANT_EXECUTOR', fake):
+            self.assertEqual(img_url_w(self.src_url, 200), self.src_url)
+            self.assertEqual(img_url_w(self.src_url, 200), self.src_url)
+        # повторный рендер не ставит вторую задачу, пока держится lock
+        fake.submit.assert_called_once()
+        self.assertFalse(os.path.isfile(os.path.join(self.test_dir, 'variants', 'sample_w200.webp')))
+
+    def test_failed_source_logged_and_not_requeued(self):
+        fake = MagicMock()
+        with patch.object(store_extras, '_generate_variants', side_effect=OSError('broken')), \
+                self.assertLogs('store.templatetags.store_extras', 'ERROR'):
+            self.assertEqual(img_url_w(self.src_url, 120), self.src_url)
+        # lock остался как метка неудачи — следующий рендер не ставит задачу снова
+        with patch.object(store_extras, '_VARIANT_EXECUTOR', fake):
+            self.assertEqual(img_url_w(self.src_url, 120), self.src_url)
+        fake.submit.assert_not_called()
+
+    def test_ensure_img_variant_is_synchronous(self):
+        url = ensure_img_variant('/media/test_src/sample.jpg', 16)
+        self.assertEqual(url, '/media/test_src/variants/sample_w16.webp')
+        with Image.open(self._url_to_abs(url)) as im:
+            self.assertEqual(im.size, (16, 9))
+        leftovers = [f for f in os.listdir(os.path.join(self.test_dir, 'variants')) if f.endswith('.part')]
+        self.assertEqual(leftovers, [])
+
+    def test_img_dims_shared_cache_survives_worker_restart(self):
+        self.assertEqual(store_extras.img_dims(self.src_url), 'width="800" height="450"')
+        store_extras._DIM_CACHE.clear()  # «новый воркер»: пустой кеш процесса
+        with patch.object(store_extras.Image, 'open', side_effect=AssertionError('decoded again')):
+            self.assertEqual(store_extras.img_dims(self.src_url), 'width="800" height="450"')
+
+    def test_img_dims_follow_replaced_file_in_same_process(self):
+        path = os.path.join(self.test_dir, 'swap.png')
+        Image.new('RGB', (30, 20)).save(path, 'PNG')
+        url = f"{settings.MEDIA_URL}test_src/swap.png"
+        self.assertEqual(store_extras.img_dims(url), 'width="30" height="20"')
+        Image.new('RGB', (60, 40)).save(path, 'PNG')
+        mtime = os.path.getmtime(path) + 10
+        os.utime(path, (mtime, mtime))
+        self.assertEqual(store_extras.img_dims(url), 'width="60" height="40"')
+
+    def test_fast_dims_reads_headers_without_pillow(self):
+        for fmt, ext in [('PNG', 'png'), ('WEBP', 'webp'), ('GIF', 'gif')]:
+            path = os.path.join(self.test_dir, f'hdr.{ext}')
+            Image.new('RGB', (37, 21)).save(path, fmt)
+            self.assertEqual(tuple(store_extras._fast_dims(path)), (37, 21), fmt)
+        # JPEG: размеры в SOFn после APP-сегментов
+        self.assertEqual(tuple(store_extras._fast_dims(self.src_abs)), (800, 450))
@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from store.models import UserProfile
+
+
+class ActivityMiddlewareTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='act', password='pwd')
+        self.profile = UserProfile.objects.create(user=self.user)
+        cache.clear()
+
+    def test_last_seen_updated_on_request(self):
+        self.client.login(username='act', password='pwd')
+        before = timezone.now()
+        self.client.get(reverse('store:home'))
+        self.profile.refresh_from_db()
+        self.assertIsNotNone(self.profile.last_seen)
+        self.assertGreaterEqual(self.profile.last_seen, before)
+
+    def test_second_request_within_window_skips_update(self):
+        self.client.login(username='act', password='pwd')
+        self.client.get(reverse('store:home'))
+        UserProfile.objects.filter(pk=self.profile.pk).update(last_seen=None)
+        self.client.get(reverse('store:home'))
+        self.profile.refresh_from_db()
+        self.assertIsNone(self.profile.last_seen)
+
+
+class LanguageCacheKeyTests(TestCase):
+    def test_lang_key_follows_active_language(self):
+        from django.utils import translation
+        from store.utils.i18n import lang_key
+        with translation.override('uk'):
+            self.assertEqual(lang_key(), 'uk')
+        with translation.override('en'):
+            self.assertEqual(lang_key(), 'en')
+
+    def test_response_varies_on_accept_language(self):
+        resp = self.client.get(reverse('store:home'))
+        self.assertIn('Accept-Language', resp.get('Vary', ''))
+
+
+class ActivityMiddlewareErrorTests(TestCase):
+    def test_database_error_is_logged_not_raised(self):
+        from unittest.mock import patch
+        from django.db import DatabaseError
+        from store.middleware import ActivityMiddleware
+        User = get_user_model()
+        user = User.objects.create_user(username='err', password='pwd')
+        UserProfile.objects.create(user=user)
+        self.client.login(username='err', password='pwd')
+        ActivityMiddleware._last_error_log = None
+        cache.clear()
+        with patch('store.middleware.UserProfile.objects.filter', side_effect=DatabaseError('db down')):
+            with self.assertLogs('store.middleware', level='WARNING'):
+                resp = self.client.get(reverse('store:home'))
+        self.assertEqual(resp.status_code, 200)
+
+
+class SessionLanguageTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='lang', password='pwd')
+        UserProfile.objects.create(user=self.user, preferred_language='uk')
+
+    def test_login_stores_language_in_session(self):
+        self.client.login(username='lang', password='pwd')
+        self.assertEqual(self.client.session.get('preferred_language'), 'uk')
+
+    def test_session_language_used_without_profile_lookup(self):
+        self.client.login(username='lang', password='pwd')
+        # профиль меняем в обход view — сессия остаётся источником языка
+        UserProfile.objects.filter(user=self.user).update(preferred_language='en')
+        resp = self.client.get(reverse('store:home'))
+        self.assertEqual(resp.wsgi_request.LANGUAGE_CODE, 'uk')
+
+    def test_language_set_updates_session(self):
+        self.client.login(username='lang', password='pwd')
+        resp = self.client.post(reverse('store:lang_set'), data='{"lang": "en"}', content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.client.session.get('preferred_language'), 'en')
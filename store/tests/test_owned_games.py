@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from store.models import Game, OwnedGame
+
+
+class OwnedGameUpsertTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='og', password='pwd')
+        self.g1 = Game.objects.create(title='One', slug='one', appid=1)
+        self.g2 = Game.objects.create(title='Two', slug='two', appid=2)
+
+    def test_upsert_inserts_new_and_updates_existing(self):
+        OwnedGame.objects.create(user=self.user, game=self.g1, source='steam', playtime_forever=5)
+        OwnedGame.upsert_many([
+            OwnedGame(user=self.user, game=self.g1, source='steam', playtime_forever=50),
+            OwnedGame(user=self.user, game=self.g2, source='steam', playtime_forever=7),
+        ], ['playtime_forever', 'playtime_2weeks', 'last_played'])
+        rows = dict(OwnedGame.objects.filter(user=self.user).values_list('game__appid', 'playtime_forever'))
+        self.assertEqual(rows, {1: 50, 2: 7})
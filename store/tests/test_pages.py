@@ -1,18 +1,10 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
-from django.contrib.auth import get_user_model
+from store.tests.factories import make_user
 
 
-class PagesSmokeTests(TestCase):
-    def setUp(self):
-        User = get_user_model()
-        self.user = User.objects.create_user(username='u1', password='p1')
-
-    def test_homepage_loads(self):
-        url = reverse('store:home')
-        resp = self.client.get(url)
-        self.assertEqual(resp.status_code, 200)
-        self.assertIn(b'<div', resp.content)
+class AnonymousPagesTests(SimpleTestCase):
+    """Без БД: редирект на логин отдаётся до любых запросов."""
 
     def test_friends_requires_login(self):
         url = reverse('store:friends')
@@ -20,9 +12,23 @@ class PagesSmokeTests(TestCase):
         # expect redirect to login
         self.assertIn(resp.status_code, (302, 301))
 
+
+class PagesSmokeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('u1', 'p1')
+        cls.home_url = reverse('store:home')
+        cls.friends_url = reverse('store:friends')
+
+    def test_homepage_loads(self):
+        url = self.home_url
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(b'<div', resp.content)
+
     def test_friends_page_loads_when_logged_in(self):
         self.client.login(username='u1', password='p1')
-        url = reverse('store:friends')
+        url = self.friends_url
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 200)
         self.assertIn(b'\xd0\x94\xd1\x80\xd1\x83\xd0\xb7\xd1\x8c\xd1\x8f', resp.content)  # 'Друзья' in bytes
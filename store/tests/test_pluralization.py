@@ -1,16 +1,24 @@
 from django.test import SimpleTestCase
 from django.template import Context, Template
-from django.utils.translation import activate
+from django.utils.translation import activate, deactivate
 
 class PluralizationTagTests(SimpleTestCase):
     def render(self, tpl: str, **ctx):
         t = Template('{% load store_extras %}' + tpl)
         return t.render(Context(ctx)).strip()
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
         # Use English to test base msgids; adjust if default language differs.
+        # Тесты класса язык не меняют — активируем один раз
         activate('en')
 
+    @classmethod
+    def tearDownClass(cls):
+        deactivate()
+        super().tearDownClass()
+
     def test_reviews_pluralization(self):
         self.assertEqual(self.render('{% n_reviews 1 %}'), '1 review')
         self.assertEqual(self.render('{% n_reviews 2 %}'), '2 reviews')
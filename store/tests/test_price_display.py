@@ -30,3 +30,14 @@ class PriceDisplayI18NTests(SimpleTestCase):
             # Should contain approximation marker (≈)
             self.assertIn('≈', html)
             self.assertIn('UAH', html)
+
+    def test_output_memoized_per_language(self):
+        from unittest.mock import patch
+        from store.templatetags import store_extras
+        store_extras._PD_CACHE.clear()
+        with translation.override('en'):
+            first = price_display(Decimal('0.00'), 'USD', preferred_currency='USD')
+            with patch.object(store_extras, '_price_display_html', side_effect=AssertionError('rebuilt')):
+                self.assertEqual(price_display(Decimal('0.00'), 'USD', preferred_currency='USD'), first)
+        with translation.override('uk'):
+            self.assertIn('Безкоштовно', price_display(Decimal('0.00'), 'USD', preferred_currency='USD'))
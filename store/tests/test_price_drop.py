@@ -1,30 +1,31 @@
 from django.test import TestCase
 from django.core.management import call_command
-from django.contrib.auth import get_user_model
 from decimal import Decimal
-from store.models import Game, UserProfile, Notification, PriceSnapshot
+from store.models import Game, Notification, PriceSnapshot, WishlistEntry
+from store.tests.factories import make_profile
+from store.utils.price_snapshot import run_snapshot
 
 class PriceDropAlertTests(TestCase):
-    def setUp(self):
-        User = get_user_model()
-        self.user = User.objects.create_user(username='wish', password='pw', email='wish@example.com')
-        self.profile = UserProfile.objects.create(user=self.user, preferred_currency='USD')
-        self.game = Game.objects.create(title='GalaxyRun', slug='galaxy-run', price=Decimal('20.00'), currency='USD', appid=777)
-        self.profile.wishlist.add(self.game)
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = make_profile('wish', email='wish@example.com', preferred_currency='USD')
+        cls.user = cls.profile.user
+        cls.game = Game.objects.create(title='GalaxyRun', slug='galaxy-run', price=Decimal('20.00'), currency='USD', appid=777)
+        cls.profile.wishlist.add(cls.game)
 
     def test_snapshot_and_no_drop_no_notification(self):
+        # через команду — проверяем и её обвязку; остальные тесты зовут run_snapshot напрямую
         call_command('snapshot_prices', threshold=10)
         self.assertEqual(PriceSnapshot.objects.count(), 1)
         self.assertEqual(Notification.objects.filter(kind='price_drop').count(), 0)
 
     def test_price_drop_generates_notification(self):
         # Day 1 snapshot
-        call_command('snapshot_prices', threshold=10)
+        run_snapshot(threshold=10)
         # Simulate price drop
-        self.game.price = Decimal('14.00')
-        self.game.save(update_fields=['price'])
+        Game.objects.filter(pk=self.game.pk).update(price=Decimal('14.00'))
         # Day 2 snapshot triggers alert (30% drop)
-        call_command('snapshot_prices', threshold=10)
+        run_snapshot(threshold=10)
         self.assertEqual(Notification.objects.filter(kind='price_drop').count(), 1)
         n = Notification.objects.filter(kind='price_drop').first()
         self.assertIn('GalaxyRun', n.payload.get('game_title',''))
@@ -32,9 +33,56 @@ class PriceDropAlertTests(TestCase):
 
     def test_free_now_counts_as_drop(self):
         # First snapshot
-        call_command('snapshot_prices', threshold=5)
+        run_snapshot(threshold=5)
         # Drop to free
-        self.game.price = Decimal('0.00')
-        self.game.save(update_fields=['price'])
-        call_command('snapshot_prices', threshold=5)
+        Game.objects.filter(pk=self.game.pk).update(price=Decimal('0.00'))
+        run_snapshot(threshold=5)
+        self.assertEqual(Notification.objects.filter(kind='price_drop').count(), 1)
+
+    def test_same_drop_not_notified_twice(self):
+        run_snapshot(threshold=10)
+        Game.objects.filter(pk=self.game.pk).update(price=Decimal('14.00'))
+        run_snapshot(threshold=10)
+        entry = WishlistEntry.objects.get(profile=self.profile, game=self.game)
+        self.assertEqual(entry.last_notified_price, Decimal('14.00'))
+        # снимок за сегодня сброшен на старую цену — падение «видно» снова, но о 14.00 уже сообщили
+        PriceSnapshot.objects.filter(game=self.game).update(price=Decimal('20.00'))
+        run_snapshot(threshold=10)
         self.assertEqual(Notification.objects.filter(kind='price_drop').count(), 1)
+
+    def test_drop_fans_out_to_all_wishlisters(self):
+        for i in range(3):
+            make_profile(f'wish{i}').wishlist.add(self.game)
+        run_snapshot(threshold=10)
+        Game.objects.filter(pk=self.game.pk).update(price=Decimal('10.00'))
+        run_snapshot(threshold=10)
+        self.assertEqual(Notification.objects.filter(kind='price_drop').values('user').distinct().count(), 4)
+
+    def test_latest_two_per_game_single_query(self):
+        from datetime import date
+        other = Game.objects.create(title='Other', slug='other', price=Decimal('5.00'), currency='USD', appid=778)
+        for d, price in [(1, '20.00'), (2, '18.00'), (3, '15.00')]:
+            PriceSnapshot.objects.create(game=self.game, snapshot_date=date(2024, 1, d), price=Decimal(price))
+        PriceSnapshot.objects.create(game=other, snapshot_date=date(2024, 1, 1), price=Decimal('5.00'))
+        with self.assertNumQueries(1):
+            latest = PriceSnapshot.latest_two_per_game([self.game.id, other.id], until=date(2024, 1, 2))
+        self.assertEqual([s.price for s in latest[self.game.id]], [Decimal('18.00'), Decimal('20.00')])
+        self.assertEqual(len(latest[other.id]), 1)
+
+    def test_upsert_daily_inserts_and_updates(self):
+        from datetime import date
+        d = date(2024, 2, 1)
+        PriceSnapshot.upsert_daily([(self.game.id, Decimal('20.00'), 'USD', d)])
+        PriceSnapshot.upsert_daily([(self.game.id, Decimal('12.00'), 'USD', d)])
+        snap = PriceSnapshot.objects.get(game=self.game, snapshot_date=d)
+        self.assertEqual(snap.price, Decimal('12.00'))
+
+    def test_latest_prefetch_binds_newest_snapshot(self):
+        from datetime import date
+        other = Game.objects.create(title='Other', slug='other', price=Decimal('5.00'), currency='USD', appid=778)
+        for d, price in [(1, '20.00'), (2, '18.00')]:
+            PriceSnapshot.objects.create(game=self.game, snapshot_date=date(2024, 1, d), price=Decimal(price))
+        with self.assertNumQueries(2):
+            games = {g.id: g for g in Game.objects.filter(id__in=[self.game.id, other.id]).prefetch_related(PriceSnapshot.latest_prefetch())}
+        self.assertEqual([s.price for s in games[self.game.id].latest_snapshot_list], [Decimal('18.00')])
+        self.assertEqual(games[other.id].latest_snapshot_list, [])
@@ -2,37 +2,50 @@ from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from store.tests.base import FastHashTestCase
+from store.tests.factories import make_user
+
+# Fallback raw tiny PNG if Pillow not available
+_FALLBACK_PNG = (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR' +
+                 b'\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00' +
+                 b'\x90wS\xDE\x00\x00\x00\x0bIDAT\x08\xD7c````\x00\x00\x00\x05\x00\x01' +
+                 b'\r\n-\xB4\x00\x00\x00\x00IEND\xAE\x42\x60\x82')
+
+
+def _make_png() -> bytes:
+    # Generate a valid in-memory PNG via Pillow to satisfy ImageField validation
+    try:
+        from io import BytesIO
+        from PIL import Image
+        bio = BytesIO()
+        Image.new('RGBA', (2, 2), (255, 0, 0, 255)).save(bio, format='PNG')
+        return bio.getvalue()
+    except ImportError:
+        return _FALLBACK_PNG
+
+
+# кодируем один раз на модуль, а не в каждом тесте
+_PNG_BYTES = _make_png()
+
+
+class ProfileEditTests(FastHashTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('alice', 'testpass123')
+        cls.edit_url = reverse('store:profile_edit')
 
-class ProfileEditTests(TestCase):
     def setUp(self):
-        User = get_user_model()
-        self.user = User.objects.create_user(username='alice', password='testpass123')
-        self.client.login(username='alice', password='testpass123')
+        self.client.force_login(self.user)
 
     def test_get_profile_edit(self):
-        url = reverse('store:profile_edit')
+        url = self.edit_url
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, 'Редактирование профиля')
 
     def test_update_persona_and_avatar(self):
-        url = reverse('store:profile_edit')
-        # minimal 1x1 PNG
-        # Generate a valid in-memory PNG via Pillow to satisfy ImageField validation
-        from io import BytesIO
-        try:
-            from PIL import Image
-            bio = BytesIO()
-            img = Image.new('RGBA', (2, 2), (255, 0, 0, 255))
-            img.save(bio, format='PNG')
-            png_bytes = bio.getvalue()
-        except Exception:
-            # Fallback raw tiny PNG if Pillow not available
-            png_bytes = (b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR' +
-                         b'\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00' +
-                         b'\x90wS\xDE\x00\x00\x00\x0bIDAT\x08\xD7c````\x00\x00\x00\x05\x00\x01' +
-                         b'\r\n-\xB4\x00\x00\x00\x00IEND\xAE\x42\x60\x82')
-        avatar = SimpleUploadedFile('avatar.png', png_bytes, content_type='image/png')
+        url = self.edit_url
+        avatar = SimpleUploadedFile('avatar.png', _PNG_BYTES, content_type='image/png')
         resp = self.client.post(url, data={
             'steam_persona': 'Alice Persona',
             'preferred_language': 'en',
@@ -57,6 +70,19 @@ class ProfileEditTests(TestCase):
             except Exception:
                 pass
         self.assertEqual(resp.status_code, 302)  # redirect after success
+        # force_login отдаёт в сигналы этот же объект — его кеш user.profile устарел
+        self.user.refresh_from_db()
         prof = self.user.profile
         self.assertEqual(prof.steam_persona, 'Alice Persona')
         self.assertTrue(prof.avatar)
+
+
+class ProfileChoiceConstraintTests(TestCase):
+    def test_invalid_privacy_rejected_by_db(self):
+        from django.db import IntegrityError, transaction
+        from store.models import UserProfile
+        User = get_user_model()
+        prof = UserProfile.objects.create(user=User.objects.create_user(username='bob', password='pw'))
+        # update() минует full_clean — значение отсекает CheckConstraint
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserProfile.objects.filter(pk=prof.pk).update(privacy='everyone')
@@ -0,0 +1,23 @@
+from decimal import Decimal
+from django.test import TestCase
+from store.models import Game, Review
+from store.tests.factories import make_user
+
+
+class ReviewStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = make_user('r1')
+        cls.u2 = make_user('r2')
+        cls.game = Game.objects.create(title='Rated', slug='rated', price=Decimal('1.00'))
+
+    def test_review_create_and_delete_refresh_stats(self):
+        Review.objects.create(user=self.u1, game=self.game, rating=8, text='a')
+        r2 = Review.objects.create(user=self.u2, game=self.game, rating=5, text='b')
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.review_count, 2)
+        self.assertEqual(self.game.avg_rating, Decimal('6.50'))
+        r2.delete()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.review_count, 1)
+        self.assertEqual(self.game.avg_rating, Decimal('8.00'))
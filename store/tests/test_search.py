@@ -1,40 +1,50 @@
 from django.test import TestCase
 from django.urls import reverse
-from django.core.files.uploadedfile import SimpleUploadedFile
-from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.text import slugify
+from store.tests.factories import make_user
 from store.models import Game, Developer, Genre, Review
 from decimal import Decimal
-import json
+import re
 
 DUMMY_GIF = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00' \
              b'\x00\x00\x00\xFF\xFF\xFF!\xF9\x04\x01\x00\x00\x00\x00,' \
              b'\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+_SLUG_RE = re.compile(r'/game/([a-z0-9\-]+)/')
+
 
 class SearchRankingTests(TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         # Create developer & genre
-        self.dev = Developer.objects.create(name='StarForge Studios')
-        self.genre = Genre.objects.create(name='Space Exploration')
-        # Helper to create game with cover
-        def make(title, discount=0):
-            img = SimpleUploadedFile('cover.gif', DUMMY_GIF, content_type='image/gif')
-            g = Game.objects.create(title=title, price=Decimal('10.00'), currency='USD', appid=1000 + Game.objects.count(), developer=self.dev, discount_percent=discount, cover_image=img)
-            g.genres.add(self.genre)
-            return g
-        self.g_exact = make('Star')
-        self.g_prefix1 = make('Starfall', discount=15)
-        self.g_prefix2 = make('Stardust')
-        self.g_contains1 = make('XStarX')
-        self.g_contains2 = make('A Star Tale')
+        cls.dev = Developer.objects.create(name='StarForge Studios')
+        cls.genre = Genre.objects.create(name='Space Exploration')
+        # Один файл обложки на все игры и один INSERT на все строки
+        cls.cover_name = default_storage.save('covers/search_rank.gif', ContentFile(DUMMY_GIF))
+        titles = [('Star', 0), ('Starfall', 15), ('Stardust', 0), ('XStarX', 0), ('A Star Tale', 0)]
+        games = Game.objects.bulk_create([
+            Game(title=title, slug=slugify(title), price=Decimal('10.00'), currency='USD', appid=1000 + i,
+                 developer=cls.dev, discount_percent=discount, cover_image=cls.cover_name)
+            for i, (title, discount) in enumerate(titles)
+        ])
+        Game.genres.through.objects.bulk_create([
+            Game.genres.through(game_id=g.pk, genre_id=cls.genre.pk) for g in games
+        ])
+        cls.g_exact, cls.g_prefix1, cls.g_prefix2, cls.g_contains1, cls.g_contains2 = games
         # Add one review to one prefix game to ensure rating fields don't override rank order except after exact
-        user = get_user_model().objects.create_user(username='rater', password='pw')
-        Review.objects.create(user=user, game=self.g_prefix1, rating=8, text='Nice')
+        Review.objects.create(user=make_user('rater'), game=cls.g_prefix1, rating=8, text='Nice')
+
+    @classmethod
+    def tearDownClass(cls):
+        default_storage.delete(cls.cover_name)
+        super().tearDownClass()
 
     def test_search_suggest_ordering(self):
         url = reverse('store:search_suggest') + '?q=star'
         resp = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
         self.assertEqual(resp.status_code, 200)
-        data = json.loads(resp.content.decode('utf-8'))
+        data = resp.json()
         items = data.get('items', [])
         titles = [i['title'] for i in items]
         # Ensure exact match first
@@ -57,8 +67,7 @@ class SearchRankingTests(TestCase):
         # Extract context games from response by their slugs in order of appearance
         # Simple heuristic: find occurrences of href links to /game/<slug>/ in raw HTML order
         html = resp.content.decode('utf-8')
-        import re
-        slugs = re.findall(r'/game/([a-z0-9\-]+)/', html)
+        slugs = _SLUG_RE.findall(html)
         # Map back to titles for known games
         slug_to_title = {self.g_exact.slug: 'Star', self.g_prefix1.slug: 'Starfall', self.g_prefix2.slug: 'Stardust', self.g_contains1.slug: 'XStarX', self.g_contains2.slug: 'A Star Tale'}
         ordered_titles = [slug_to_title.get(s) for s in slugs if s in slug_to_title]
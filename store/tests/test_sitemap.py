@@ -0,0 +1,42 @@
+import io
+import tempfile
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from store.models import Game
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        self._media = tempfile.TemporaryDirectory()
+        self.addCleanup(self._media.cleanup)
+        override = override_settings(MEDIA_ROOT=self._media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        Game.objects.create(title='Indexed', slug='indexed', price=Decimal('1.00'), appid=10)
+        Game.objects.create(title='Hidden', slug='hidden', price=Decimal('1.00'))
+
+    def test_sitemap_lists_games_with_appid(self):
+        resp = self.client.get('/sitemap.xml')
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, '/game/indexed/')
+        self.assertNotContains(resp, '/game/hidden/')
+        self.assertContains(resp, '<lastmod>')
+
+    def test_prerendered_sitemap_served_without_queries(self):
+        call_command('regenerate_sitemap', domain='example.com', stdout=io.StringIO())
+        with self.assertNumQueries(0):
+            resp = self.client.get('/sitemap.xml')
+        body = b''.join(resp.streaming_content).decode()
+        resp.close()
+        self.assertIn('https://example.com/game/indexed/', body)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=3600')
+
+    def test_regenerate_removes_stale_pages(self):
+        from store.sitemaps import sitemap_dir
+        out = sitemap_dir()
+        out.mkdir(parents=True, exist_ok=True)
+        (out / 'sitemap-2.xml').write_text('<urlset/>', encoding='utf-8')
+        call_command('regenerate_sitemap', domain='example.com', stdout=io.StringIO())
+        self.assertTrue((out / 'sitemap.xml').exists())
+        self.assertFalse((out / 'sitemap-2.xml').exists())
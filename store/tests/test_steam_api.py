@@ -0,0 +1,57 @@
+import json
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from store import steam_api
+
+
+def _resp(status, body=b'', headers=None):
+    r = MagicMock()
+    r.status = status
+    r.data = body
+    r.headers = headers or {}
+    return r
+
+
+class AppDetailsConditionalGetTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified_reuses_cached_body(self):
+        body = json.dumps({'570': {'success': True, 'data': {'name': 'Dota 2'}}}).encode()
+        responses = [_resp(200, body, {'ETag': '"v1"'}), _resp(304)]
+        with patch.object(steam_api.POOL, 'request', side_effect=responses) as req:
+            self.assertEqual(steam_api.fetch_appdetails(570)['name'], 'Dota 2')
+            self.assertEqual(steam_api.fetch_appdetails(570)['name'], 'Dota 2')
+        self.assertEqual(req.call_args_list[1].kwargs['headers']['If-None-Match'], '"v1"')
+
+
+class StreamToMediaDedupTests(SimpleTestCase):
+    def _stream_resp(self, body):
+        r = MagicMock()
+        r.status = 200
+        r.stream.return_value = iter([body])
+        return r
+
+    def test_same_content_is_hardlinked(self):
+        import os
+        import tempfile
+        from pathlib import Path
+        from django.test import override_settings
+        body = b'\x89PNG fake image bytes'
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=Path(tmp)):
+            with patch.object(steam_api.POOL, 'request', side_effect=[self._stream_resp(body), self._stream_resp(body)]):
+                a = steam_api._stream_to_media(Path('steam_imports/1/a.jpg'), 'http://x/a.jpg')
+                b = steam_api._stream_to_media(Path('steam_imports/2/a.jpg'), 'http://x/a.jpg')
+            self.assertIsNotNone(a)
+            self.assertIsNotNone(b)
+            sa, sb = os.stat(Path(tmp) / a), os.stat(Path(tmp) / b)
+            self.assertEqual(sa.st_ino, sb.st_ino)
+            self.assertEqual((Path(tmp) / b).read_bytes(), body)
+
+
+class BasenameTests(SimpleTestCase):
+    def test_strips_query_and_unsafe_chars(self):
+        self.assertEqual(steam_api._basename('https://cdn/x/header.jpg?t=123'), 'header.jpg')
+        self.assertEqual(steam_api._basename('https://cdn/x/a b(1).jpg'), 'a_b_1_.jpg')
+        self.assertEqual(steam_api._basename('https://cdn/x/'), 'image')
@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+from store.templatetags import steam_tags as st
+
+
+class SteamTagsPreloadTests(SimpleTestCase):
+    def test_preload_serves_tags_with_single_cache_round_trip(self):
+        fake_cache = MagicMock()
+        fake_cache.get_many.return_value = {'steam_tags_10': ['Action', 'Indie'], 'steam_tags_20': ['RPG']}
+        fake_cache.get.side_effect = AssertionError('per-card cache hit')
+        tpl = Template(
+            '{% load steam_tags %}{% steam_tags_preload games %}'
+            '{% for g in games %}{% steam_tags g.appid 5 as tags %}{{ tags|join:"," }};{% endfor %}'
+        )
+        games = [{'appid': 10}, {'appid': 20}, {'appid': 30}]
+        with patch('store.templatetags.steam_tags.cache', fake_cache):
+            out = tpl.render(Context({'games': games}))
+        self.assertEqual(out, 'Action,Indie;RPG;;')
+        fake_cache.get_many.assert_called_once()
+
+
+class SteamTagsNegativeCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        st._BUCKET.clear()
+
+    def test_failed_fetch_is_cached_as_empty(self):
+        with override_settings(STORE_FETCH_STEAM_TAGS=True), \
+                patch.object(st, '_fetch_tags', return_value=None) as fetch:
+            self.assertEqual(st.get_or_fetch_tags(99), [])
+            cache.delete('steam_tags_lock_99')
+            self.assertEqual(st.get_or_fetch_tags(99), [])
+        fetch.assert_called_once()
+
+
+class SteamTagsLazyTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        st._BUCKET.clear()
+
+    @override_settings(STORE_FETCH_STEAM_TAGS=True)
+    def test_render_never_hits_network(self):
+        tpl = Template(
+            '{% load steam_tags %}{% steam_tags 42 5 as tags %}'
+            '{% if tags %}{{ tags|join:"," }}{% else %}{% steam_tags_lazy 42 5 %}{% endif %}'
+        )
+        with patch.object(st, '_fetch_tags', side_effect=AssertionError('network in render')):
+            out = tpl.render(Context({}))
+        self.assertIn('class="steam-tags-lazy" data-appid="42" data-max="5"', out)
+
+    @override_settings(STORE_FETCH_STEAM_TAGS=True)
+    def test_endpoint_fetches_and_caches(self):
+        with patch.object(st, '_fetch_tags', return_value=['Action', 'RPG']) as fetch:
+            resp = self.client.get('/api/steam_tags/', {'appid': 7, 'max': 1})
+            self.assertEqual(resp.json(), {'tags': ['Action']})
+            self.client.get('/api/steam_tags/', {'appid': 7})
+        fetch.assert_called_once()
+        self.assertEqual(self.client.get('/api/steam_tags/', {'appid': 'x'}).status_code, 400)
+
+    @override_settings(STORE_FETCH_STEAM_TAGS=True)
+    def test_throttled_empty_response_not_cached_by_clients(self):
+        cache.add('steam_tags_lock_8', 1, 60)  # запрос за этим appid уже идёт
+        with patch.object(st, '_fetch_tags', return_value=['Action']):
+            resp = self.client.get('/api/steam_tags/', {'appid': 8})
+        self.assertEqual(resp.json(), {'tags': []})
+        self.assertEqual(resp['Cache-Control'], 'no-store')
+        cache.set(st._cache_key(8), ['Action'])
+        self.assertEqual(self.client.get('/api/steam_tags/', {'appid': 8})['Cache-Control'], 'public, max-age=3600')
+
+
+class SteamTagsRateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        st._BUCKET.clear()
+
+    @override_settings(STORE_FETCH_STEAM_TAGS=True)
+    def test_bulk_fetch_respects_rate_limit(self):
+        with patch.object(st, '_fetch_tags', return_value=['Action']) as fetch:
+            tags = st.steam_tags_bulk([1, 2, 3, 4])
+        self.assertEqual(fetch.call_count, st.FETCH_RATE_PER_SECOND)
+        self.assertEqual(set(tags), {1, 2, 3, 4})
+        self.assertEqual(sum(1 for t in tags.values() if t), st.FETCH_RATE_PER_SECOND)
@@ -0,0 +1,197 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+from store.models import Game, Genre
+from store.templatetags import store_extras
+
+
+class CatalogCategoriesTests(TestCase):
+    def setUp(self):
+        action = Genre.objects.create(name='Action', slug='action')
+        rpg = Genre.objects.create(name='RPG', slug='rpg')
+        for i in range(5):
+            g = Game.objects.create(title=f'G{i}', slug=f'g{i}', price=Decimal('1.00'))
+            g.genres.add(action if i % 2 else rpg)
+
+    def test_genres_loaded_without_n_plus_one(self):
+        catalog = Game.objects.order_by('slug')
+        with self.assertNumQueries(2):
+            cats = store_extras.catalog_categories(catalog, 24)
+            list(catalog)  # шаблон итерирует тот же QuerySet — уже из кеша
+        self.assertEqual({c['slug'] for c in cats}, {'action', 'rpg'})
+
+
+class IsOwnedTests(TestCase):
+    def test_ownership_loaded_once_per_user_object(self):
+        from django.contrib.auth import get_user_model
+        from store.models import Order, OrderItem
+        user = get_user_model().objects.create_user(username='own', password='pw')
+        games = [Game.objects.create(title=f'O{i}', slug=f'o{i}', price=Decimal('1.00')) for i in range(3)]
+        order = Order.objects.create(user=user, total_price=Decimal('1.00'), currency='USD', status='paid')
+        OrderItem.objects.create(order=order, game=games[0], quantity=1, price=Decimal('1.00'), currency='USD')
+        with self.assertNumQueries(1):
+            flags = [store_extras.is_owned(user, g) for g in games]
+        self.assertEqual(flags, [True, False, False])
+
+
+class FsCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_local_screenshots_refresh_when_directory_changes(self):
+        import os
+        import tempfile
+        from unittest.mock import patch
+        from django.test import override_settings
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=tmp, MEDIA_URL='/media/'):
+            d = os.path.join(tmp, 'steam_imports', '5')
+            os.makedirs(d)
+            open(os.path.join(d, 'a.jpg'), 'wb').close()
+            self.assertEqual(store_extras.local_screenshots(5), ['/media/steam_imports/5/a.jpg'])
+            with patch('store.templatetags.store_extras.os.scandir', side_effect=AssertionError('scandir')):
+                self.assertEqual(len(store_extras.local_screenshots(5)), 1)
+            open(os.path.join(d, 'b.jpg'), 'wb').close()
+            os.utime(d, (0, 12345))  # гарантируем смену mtime каталога
+            cache.clear()  # готовый результат живёт в общем кеше RENDER_CACHE_TTL
+            self.assertEqual(len(store_extras.local_screenshots(5)), 2)
+            self.assertTrue(store_extras.file_exists('steam_imports/5/a.jpg'))
+            with patch('store.templatetags.store_extras.os.path.isfile', side_effect=AssertionError('stat')):
+                self.assertTrue(store_extras.file_exists('steam_imports/5/a.jpg'))
+
+
+class MarkdownSanitizeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_strips_scripts_and_normalizes_legacy_tags(self):
+        out = store_extras.markdown_sanitize('**hi** <b>x</b><script>alert(1)</script> [l](javascript:alert(1))')
+        self.assertIn('<strong>hi</strong>', out)
+        self.assertIn('<strong>x</strong>', out)
+        self.assertNotIn('script', out)
+        self.assertNotIn('javascript:', out)
+
+    def test_prefers_nh3_when_installed(self):
+        from unittest.mock import MagicMock, patch
+        fake = MagicMock()
+        fake.clean.return_value = '<p>ok</p>'
+        with patch.object(store_extras, 'nh3', fake):
+            out = store_extras.markdown_sanitize('ok')
+        self.assertIn('ok', out)
+        kwargs = fake.clean.call_args.kwargs
+        self.assertNotIn('rel', kwargs['attributes']['a'])
+        self.assertEqual(kwargs['url_schemes'], {'http', 'https', 'mailto'})
+
+    def test_prefers_mistune_when_installed(self):
+        from unittest.mock import patch
+        with patch.object(store_extras, '_mistune_render', return_value='<p><b>hi</b></p>') as render:
+            out = store_extras.markdown_sanitize('**hi**')
+        render.assert_called_once_with('**hi**')
+        self.assertIn('<strong>hi</strong>', out)
+
+    def test_rendered_html_cached_by_content(self):
+        from unittest.mock import patch
+        first = store_extras.markdown_sanitize('**bio**')
+        with patch.object(store_extras, '_render_markdown', side_effect=AssertionError('rendered again')):
+            self.assertEqual(store_extras.markdown_sanitize('**bio**'), first)
+        self.assertNotEqual(store_extras.markdown_sanitize('**other**'), first)
+
+
+class CategoryCoverCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cover_cached_and_reset_on_genre_change(self):
+        from unittest.mock import patch
+        genre = Genre.objects.create(name='Puzzle', slug='puzzle')
+        with patch.object(store_extras, '_category_cover', return_value='/a.jpg') as compute:
+            store_extras.category_cover(Context(), 'puzzle')
+            store_extras.category_cover(Context(), 'puzzle')
+            self.assertEqual(compute.call_count, 1)
+            g = Game.objects.create(title='P', slug='p', price=Decimal('1.00'))
+            g.genres.add(genre)
+            store_extras.category_cover(Context(), 'puzzle')
+            self.assertEqual(compute.call_count, 2)
+
+    def test_cover_reset_only_for_relevant_game_saves_and_deletes(self):
+        genre = Genre.objects.create(name='Puzzle', slug='puzzle')
+        g = Game.objects.create(title='P', slug='p', price=Decimal('1.00'))
+        g.genres.add(genre)
+        key = store_extras.category_cover_cache_key('puzzle')
+        cache.set(key, '/a.jpg')
+        g.price = Decimal('2.00')
+        g.save(update_fields=['price'])
+        self.assertEqual(cache.get(key), '/a.jpg')
+        g.appid = 77
+        g.save(update_fields=['appid'])
+        self.assertIsNone(cache.get(key))
+        cache.set(key, '/a.jpg')
+        g.delete()
+        self.assertIsNone(cache.get(key))
+
+    def test_primed_covers_use_single_query(self):
+        from unittest.mock import patch
+        for i, slug in enumerate(['a', 'b', 'c']):
+            genre = Genre.objects.create(name=slug.upper(), slug=slug)
+            g = Game.objects.create(title=f'C{i}', slug=f'c{i}', price=Decimal('1.00'), appid=900 + i)
+            g.genres.add(genre)
+        tpl = Template(
+            '{% load store_extras %}{% prime_category_covers cats %}'
+            '{% for c in cats %}{% category_cover c %};{% endfor %}'
+        )
+        with patch.object(store_extras, '_category_static_map', return_value={}), self.assertNumQueries(1):
+            out = tpl.render(Context({'cats': ['a', 'b', 'c']}))
+        self.assertIn('/steam/apps/901/header.jpg', out)
+
+    def test_catalog_scan_does_not_query_per_game(self):
+        from unittest.mock import patch
+        from django.db.models import Prefetch
+        genre = Genre.objects.create(name='RPG', slug='rpg')
+        other = Genre.objects.create(name='Other', slug='other')
+        for i in range(5):
+            g = Game.objects.create(title=f'R{i}', slug=f'r{i}', price=Decimal('1.00'), appid=700 + i)
+            g.genres.add(genre if i == 4 else other)
+        catalog = list(Game.objects.order_by('slug').prefetch_related(Prefetch('genres')))
+        with patch.object(store_extras, '_category_static_map', return_value={}), self.assertNumQueries(0):
+            url = store_extras._category_cover('rpg', catalog)
+        self.assertIn('/704/', url)
+
+    def test_catalog_match_not_shared_through_cache(self):
+        from unittest.mock import patch
+        from django.db.models import Prefetch
+        genre = Genre.objects.create(name='RPG', slug='rpg')
+        for i in range(2):
+            Game.objects.create(title=f'K{i}', slug=f'k{i}', price=Decimal('1.00'), appid=800 + i).genres.add(genre)
+        first, second = (list(Game.objects.filter(slug=s).prefetch_related(Prefetch('genres'))) for s in ('k0', 'k1'))
+        with patch.object(store_extras, '_category_static_map', return_value={}):
+            self.assertIn('/800/', store_extras.category_cover(Context(), 'rpg', first))
+            self.assertIn('/801/', store_extras.category_cover(Context(), 'rpg', second))
+
+    def test_static_covers_found_without_per_call_finder_lookups(self):
+        from unittest.mock import patch
+        store_extras._category_static_map.cache_clear()
+        self.addCleanup(store_extras._category_static_map.cache_clear)
+        with patch.object(store_extras.finders, 'find') as find:
+            url = store_extras._category_cover('action')
+            self.assertEqual(store_extras._category_cover('no-such-genre'), '/static/store/categories/default.svg')
+        self.assertEqual(url, '/static/store/categories/action.svg')
+        find.assert_not_called()
+
+
+
+class PaidGamesTests(TestCase):
+    def test_fallback_skips_games_already_taken(self):
+        games = [Game.objects.create(title=f'P{i}', slug=f'p{i}', price=Decimal('2.00')) for i in range(3)]
+        free = Game.objects.create(title='F', slug='f', price=Decimal('0.00'))
+        out = store_extras.paid_games(games[:1], 3, [Game.objects.get(pk=games[0].pk), free] + games[1:])
+        self.assertEqual([g.pk for g in out], [g.pk for g in games])
+
+
+class SimpleTagInputTests(SimpleTestCase):
+    def test_bad_inputs_fall_back_without_catch_all(self):
+        self.assertEqual(store_extras.star_fill('n/a', 1), 'empty')
+        self.assertEqual(store_extras.star_fill(None, 1), 'empty')
+        self.assertEqual(store_extras.n_games(None), store_extras.n_games(0))
+        self.assertIsNone(store_extras.get_item(None, 'k'))
+        self.assertEqual(store_extras.get_item({'k': 1}, 'k'), 1)
+        self.assertEqual(store_extras.convert_price('n/a', 'USD', 'EUR'), Decimal('0.00'))
@@ -1,15 +1,11 @@
 from django.test import TestCase
-from django.contrib.auth import get_user_model
 from store.forms import ProfileAppearanceForm
-from store.models import UserProfile
-
-User = get_user_model()
+from store.tests.factories import make_profile
 
 class ThemeColorValidationTests(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username='tester', password='pass123')
-        # Ensure profile exists
-        UserProfile.objects.create(user=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_profile('tester', 'pass123').user
 
     def get_form(self, color_value):
         profile = self.user.profile
@@ -1,21 +1,21 @@
-from django.test import TestCase
 from django.urls import reverse
-from django.contrib.auth import get_user_model
 from store.models import UserProfile
+from store.tests.base import FastHashTestCase
+from store.tests.factories import make_profile
 
-User = get_user_model()
+class UsernameChangeTests(FastHashTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_profile('userA', 'pass123').user
+        # second user to test uniqueness
+        cls.other = make_profile('takenName', 'pass123').user
+        cls.edit_url = reverse('store:profile_edit')
 
-class UsernameChangeTests(TestCase):
     def setUp(self):
-        self.user = User.objects.create_user(username='userA', password='pass123')
-        UserProfile.objects.get_or_create(user=self.user)  # ensure profile
-        self.client.login(username='userA', password='pass123')
-        # second user to test uniqueness
-        self.other = User.objects.create_user(username='takenName', password='pass123')
-        UserProfile.objects.get_or_create(user=self.other)
+        self.client.force_login(self.user)
 
     def _post(self, new_username, extra=None):
-        url = reverse('store:profile_edit')
+        url = self.edit_url
         data = {
             'steam_persona': '',
             'bg_appid': '',
@@ -49,9 +49,7 @@ class UsernameChangeTests(TestCase):
 
     def test_steam_linked_cannot_change(self):
         # Simulate Steam-linked profile: assign steam_id
-        prof = self.user.profile
-        prof.steam_id = '12345678901234567'
-        prof.save(update_fields=['steam_id'])
+        UserProfile.objects.filter(user=self.user).update(steam_id='12345678901234567')
         resp = self._post('anotherNick')
         # Form should show error and not redirect
         self.assertEqual(resp.status_code, 200)
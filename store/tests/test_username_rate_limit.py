@@ -1,20 +1,21 @@
-from django.test import TestCase
 from django.urls import reverse
-from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
 from store.models import UserProfile
+from store.tests.base import FastHashTestCase
+from store.tests.factories import make_profile
 
-User = get_user_model()
+class UsernameRateLimitTests(FastHashTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_profile('rateuser', 'pass123').user
+        cls.edit_url = reverse('store:profile_edit')
 
-class UsernameRateLimitTests(TestCase):
     def setUp(self):
-        self.user = User.objects.create_user(username='rateuser', password='pass123')
-        UserProfile.objects.get_or_create(user=self.user)
-        self.client.login(username='rateuser', password='pass123')
+        self.client.force_login(self.user)
 
     def _post(self, new_username):
-        url = reverse('store:profile_edit')
+        url = self.edit_url
         data = {
             'steam_persona': '',
             'bg_appid': '',
@@ -39,9 +40,7 @@ class UsernameRateLimitTests(TestCase):
         r1 = self._post('nickone')
         self.assertEqual(r1.status_code, 302)
         # simulate passage of >24h
-        prof = self.user.profile
-        prof.last_username_change = timezone.now() - timedelta(hours=25)
-        prof.save(update_fields=['last_username_change'])
+        UserProfile.objects.filter(user=self.user).update(last_username_change=timezone.now() - timedelta(hours=25))
         r2 = self._post('nicktwo')
         self.assertEqual(r2.status_code, 302)
         self.user.refresh_from_db()
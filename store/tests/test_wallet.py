@@ -1,21 +1,22 @@
 from decimal import Decimal
-from django.test import TestCase
-from django.contrib.auth import get_user_model
+from django.test import override_settings
 from django.urls import reverse
-from django.conf import settings
 from store.models import UserProfile, WalletTransaction, Game, Order, OrderItem
+from store.tests.base import FastHashTestCase
+from store.tests.factories import make_profile
 
 
-class WalletTests(TestCase):
-    def setUp(self):
-        settings.CURRENCY_FETCH_ENABLED = False  # avoid network in tests
-        User = get_user_model()
-        self.user = User.objects.create_user(username='wal', password='pw')
-        self.profile = UserProfile.objects.create(user=self.user, preferred_currency='USD')
+@override_settings(CURRENCY_FETCH_ENABLED=False)  # avoid network in tests
+class WalletTests(FastHashTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = make_profile('wal', preferred_currency='USD')
+        cls.user = cls.profile.user
+        cls.topup_url = reverse('store:wallet_topup')
 
     def test_topup_rejects_below_minimum(self):
         self.client.login(username='wal', password='pw')
-        url = reverse('store:wallet_topup')
+        url = self.topup_url
         resp = self.client.post(url, data={'amount': '0.50', 'currency': 'USD'}, follow=True)
         self.assertEqual(resp.status_code, 200)
         self.profile.refresh_from_db()
@@ -24,7 +25,7 @@ class WalletTests(TestCase):
 
     def test_topup_same_currency_creates_transaction(self):
         self.client.login(username='wal', password='pw')
-        url = reverse('store:wallet_topup')
+        url = self.topup_url
         resp = self.client.post(url, data={'amount': '2.00', 'currency': 'USD'})
         self.assertEqual(resp.status_code, 302)
         self.profile.refresh_from_db()
@@ -36,7 +37,7 @@ class WalletTests(TestCase):
 
     def test_topup_foreign_currency_converts_and_logs_source(self):
         self.client.login(username='wal', password='pw')
-        url = reverse('store:wallet_topup')
+        url = self.topup_url
         # Using fallback conversion rates: 41 UAH ≈ 1 USD
         resp = self.client.post(url, data={'amount': '41.00', 'currency': 'UAH'})
         self.assertEqual(resp.status_code, 302)
@@ -63,3 +64,13 @@ class WalletTests(TestCase):
         self.assertIsNotNone(tx)
         self.assertTrue(tx.amount < 0)
         self.assertEqual(tx.currency, 'USD')
+
+    def test_deduct_is_atomic_against_stale_instance(self):
+        self.profile.add_balance(Decimal('10.00'), 'USD')
+        stale = UserProfile.objects.get(pk=self.profile.pk)
+        # параллельное списание через другой экземпляр
+        self.assertTrue(self.profile.deduct_balance(Decimal('7.00'), 'USD'))
+        # у stale в памяти всё ещё 10.00, но БД не даст уйти в минус
+        self.assertFalse(stale.deduct_balance(Decimal('7.00'), 'USD'))
+        stale.refresh_from_db()
+        self.assertEqual(stale.balance, Decimal('3.00'))
@@ -23,6 +23,7 @@ from .views import (
     LogoutView,
     AboutView,
     SearchSuggestView,
+    SteamTagsView,
     WishlistListView,
     WishlistToggleView,
     RegisterView,
@@ -76,6 +77,7 @@ urlpatterns = [
     path('recommendations/hide/<int:pk>/', RecommendationsHideView.as_view(), name='recommendations_hide'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('api/search_suggest/', SearchSuggestView.as_view(), name='search_suggest'),
+    path('api/steam_tags/', SteamTagsView.as_view(), name='steam_tags'),
     path('games/', GameListView.as_view(), name='game_list'),
     path('discounts/', DiscountsListView.as_view(), name='discounts'),
     path('game/<slug:slug>/', GameDetailView.as_view(), name='game_detail'),
@@ -15,6 +15,7 @@ Currency utilities for:
 from decimal import Decimal, ROUND_HALF_UP
 import requests
 from django.conf import settings
+from django.core.cache import cache
 import time
 from typing import Dict, Any
 from django.db import transaction
@@ -27,6 +28,9 @@ except Exception:  # pragma: no cover - модель может быть нед
 _CACHE: Dict[str, Dict[str, float]] = {}
 _CACHE_TS: Dict[str, float] = {}
 _TTL_SECONDS = 60 * 60  # 1 hour
+# Fallback (сеть/БД без курсов) кешируем коротко: иначе каждый convert_amount
+# заново ходит в БД и/или ждёт таймаут API
+_MISS_TTL_SECONDS = 5 * 60
 
 _FALLBACK_USD = {
     'USD': 1.0,
@@ -41,88 +45,91 @@ _FALLBACK_USD = {
     'PLN': 3.98,
 }
 
+def _rates_cache_key(base: str) -> str:
+    # Ключ по часу: все воркеры в пределах часа делят один набор курсов
+    return f"fx:{base}:{int(time.time() // _TTL_SECONDS)}"
+
+
+def _fallback_rates(base: str) -> Dict[str, float]:
+    """Статическая таблица относительно base (через USD)."""
+    if base == 'USD':
+        return _FALLBACK_USD
+    if base in _FALLBACK_USD:
+        rate_base = _FALLBACK_USD[base]
+        return {cur: (val / rate_base) for cur, val in _FALLBACK_USD.items()}
+    return _FALLBACK_USD
+
+
+def _db_rates(base: str) -> Dict[str, float]:
+    if not CurrencyRate:
+        return {}
+    try:
+        # последний курс по каждой паре (base, target) — один запрос
+        latest = CurrencyRate.latest_rates_map((base, target) for target in _FALLBACK_USD)
+        return {target: float(rate) for (_base, target), rate in latest.items()}
+    except Exception:
+        return {}
+
+
+def _remember(base: str, key: str, rates: Dict[str, float], now: float) -> Dict[str, float]:
+    _CACHE[base] = rates
+    _CACHE_TS[base] = now
+    cache.set(key, rates, _TTL_SECONDS)
+    return rates
+
+
 def _fetch_rates(base: str) -> Dict[str, float]:
     now = time.time()
     if base in _CACHE and (now - _CACHE_TS.get(base, 0)) < _TTL_SECONDS:
         return _CACHE[base]
+    key = _rates_cache_key(base)
+    shared = cache.get(key)
+    if shared is not None:
+        return shared
     # Fast path: disable live fetching entirely if feature flag off
-    if not getattr(settings, 'CURRENCY_FETCH_ENABLED', True):
-        # Try DB cache first
-        if CurrencyRate:
-            try:
-                recs = CurrencyRate.objects.filter(base=base).order_by('-fetched_at')[:len(_FALLBACK_USD)]
-                if recs:
-                    db_rates = {r.target: float(r.rate) for r in recs if r.target in _FALLBACK_USD}
-                    if db_rates:
-                        _CACHE[base] = db_rates; _CACHE_TS[base] = now
-                        return db_rates
-            except Exception:
-                pass
-        # Fallback generation
-        if base == 'USD':
-            return _FALLBACK_USD
-        if base in _FALLBACK_USD:
-            rate_base = _FALLBACK_USD[base]
-            derived = {cur: (val / rate_base) for cur, val in _FALLBACK_USD.items()}
-            return derived
-        return _FALLBACK_USD
-    try:
-        # Use a much shorter timeout to avoid blocking page renders.
-        # Allow override via settings.CURRENCY_FETCH_TIMEOUT (seconds).
-        timeout = getattr(settings, 'CURRENCY_FETCH_TIMEOUT', 1.2)
-        url = f'https://api.exchangerate.host/latest?base={base}'
-        resp = requests.get(url, timeout=timeout)
-        resp.raise_for_status()
-        raw = resp.json() or {}
-        data: Dict[str, Any] = raw if isinstance(raw, dict) else {}
-        raw_rates = data.get('rates', {}) or {}
-        rates: Dict[str, Any] = raw_rates if isinstance(raw_rates, dict) else {}
-        # keep only currencies we care about
-        filtered: Dict[str, float] = {str(k): float(v) for k, v in rates.items() if str(k) in _FALLBACK_USD.keys()}
-        if filtered:
-            _CACHE[base] = filtered
-            _CACHE_TS[base] = now
-            # Persist to DB (best-effort)
-            if CurrencyRate:
-                # timestamp recorded implicitly via model default; explicit variable removed
-                try:
-                    with transaction.atomic():
-                        objects = []
-                        for tgt, val in filtered.items():
-                            objects.append(CurrencyRate(base=base, target=str(tgt), rate=Decimal(str(val))))
-                        CurrencyRate.objects.bulk_create(objects)
-                except Exception:
-                    pass
-            return filtered
-    except Exception:
-        pass
-    # Try DB fallback (latest rates for base)
-    if CurrencyRate:
+    if getattr(settings, 'CURRENCY_FETCH_ENABLED', True):
         try:
-            recs = CurrencyRate.objects.filter(base=base).order_by('-fetched_at')[:len(_FALLBACK_USD)]
-            if recs:
-                db_rates = {r.target: float(r.rate) for r in recs if r.target in _FALLBACK_USD}
-                if db_rates:
-                    _CACHE[base] = db_rates
-                    _CACHE_TS[base] = now
-                    return db_rates
+            # Use a much shorter timeout to avoid blocking page renders.
+            # Allow override via settings.CURRENCY_FETCH_TIMEOUT (seconds).
+            timeout = getattr(settings, 'CURRENCY_FETCH_TIMEOUT', 1.2)
+            url = f'https://api.exchangerate.host/latest?base={base}'
+            resp = requests.get(url, timeout=timeout)
+            resp.raise_for_status()
+            raw = resp.json() or {}
+            data: Dict[str, Any] = raw if isinstance(raw, dict) else {}
+            raw_rates = data.get('rates', {}) or {}
+            rates: Dict[str, Any] = raw_rates if isinstance(raw_rates, dict) else {}
+            # keep only currencies we care about
+            filtered: Dict[str, float] = {str(k): float(v) for k, v in rates.items() if str(k) in _FALLBACK_USD.keys()}
+            if filtered:
+                # Persist to DB (best-effort)
+                if CurrencyRate:
+                    # timestamp recorded implicitly via model default; explicit variable removed
+                    try:
+                        with transaction.atomic():
+                            objects = []
+                            for tgt, val in filtered.items():
+                                rate = Decimal(str(val))
+                                # bulk_create минует pre_save — rate_micro проставляем сами
+                                objects.append(CurrencyRate(base=base, target=str(tgt), rate=rate,
+                                                            rate_micro=CurrencyRate.to_micro(rate)))
+                            CurrencyRate.objects.bulk_create(objects)
+                    except Exception:
+                        pass
+                return _remember(base, key, filtered, now)
         except Exception:
             pass
+    # Try DB fallback (latest rates for base)
+    db_rates = _db_rates(base)
+    if db_rates:
+        return _remember(base, key, db_rates, now)
     # build fallback relative to requested base via USD pivot
-    try:
-        if base == 'USD':
-            return _FALLBACK_USD
-        # pivot: amount_in_base = amount_in_usd / rate_base
-        if base in _FALLBACK_USD:
-            rate_base = _FALLBACK_USD[base]
-            derived = {cur: (val / rate_base) for cur, val in _FALLBACK_USD.items()}
-            return derived
-    except Exception:
-        pass
-    return _FALLBACK_USD  # last resort
+    fallback = _fallback_rates(base)
+    cache.set(key, fallback, _MISS_TTL_SECONDS)
+    return fallback
 
 def convert_amount(amount: Decimal | float, from_currency: str, to_currency: str) -> Decimal:
-    amount_dec = Decimal(str(amount))
+    amount_dec = amount if isinstance(amount, Decimal) else Decimal(str(amount))
     if from_currency == to_currency:
         return amount_dec.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
     rates_from = _fetch_rates(from_currency)
@@ -142,3 +149,59 @@ def convert_amount(amount: Decimal | float, from_currency: str, to_currency: str
         return amount_dec.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
     converted = amount_dec * Decimal(str(rate_to))
     return converted.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+RATE_MICRO = 1_000_000
+# Витрина конвертирует цены карточек в несколько пар валют, а не в 100 разных:
+# курс пары запоминаем на минуту, и каждая карточка — один dict lookup
+_MICRO_MEMO_TTL = 60
+_MICRO_MEMO: Dict[tuple, tuple] = {}
+
+
+def rate_micro(from_currency: str, to_currency: str) -> int | None:
+    """Курс from -> to в микроединицах (rate × 1_000_000, int) или None, если курса нет."""
+    if from_currency == to_currency:
+        return RATE_MICRO
+    now = time.monotonic()
+    key = (from_currency, to_currency)
+    hit = _MICRO_MEMO.get(key)
+    if hit is not None and now - hit[0] < _MICRO_MEMO_TTL:
+        return hit[1]
+    micro = _rate_micro(from_currency, to_currency)
+    _MICRO_MEMO[key] = (now, micro)
+    return micro
+
+
+def _rate_micro(from_currency: str, to_currency: str) -> int | None:
+    rate_to = _fetch_rates(from_currency).get(to_currency)
+    if rate_to is not None and CurrencyRate:
+        # _fetch_rates уже записал свежий курс в БД (или взял его оттуда) —
+        # берём сохранённое целое rate_micro, а не пересчитываем из float
+        stored = CurrencyRate.latest_rate_micro(from_currency, to_currency)
+        if stored is not None:
+            return stored
+    if rate_to is None:
+        usd_rates = _fetch_rates('USD')
+        r_from = usd_rates.get(from_currency)
+        r_to = usd_rates.get(to_currency)
+        if not (r_from and r_to):
+            return None
+        rate_to = r_to / r_from
+    return round(rate_to * RATE_MICRO)
+
+
+def convert_cents(cents: int, micro: int) -> int:
+    """Целочисленная конвертация: центы × курс в микроединицах, округление half-up."""
+    return (cents * micro + RATE_MICRO // 2) // RATE_MICRO
+
+
+def convert_amount_display(amount: Decimal | float, from_currency: str, to_currency: str) -> Decimal:
+    """Приблизительная конвертация для показа «≈ цена» на витрине — в целых числах.
+
+    Точность курса 6 знаков; для денег (баланс, оплата) используйте convert_amount.
+    """
+    micro = rate_micro(from_currency, to_currency)
+    if micro is None:
+        return Decimal(str(amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    cents = int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+    return Decimal(convert_cents(cents, micro)).scaleb(-2)
@@ -0,0 +1,21 @@
+"""Small i18n helpers shared by views/templatetags.
+
+`lang_key()` — текущий активный язык для составных ключей кеша, чтобы
+закешированный в одном языке HTML не отдавался пользователю с другим.
+"""
+from django.conf import settings
+from django.utils import translation
+
+
+def lang_key() -> str:
+    return translation.get_language() or settings.LANGUAGE_CODE
+
+
+# Язык пользователя дублируется в сессии, чтобы middleware не ходил за профилем
+SESSION_LANGUAGE_KEY = 'preferred_language'
+
+
+def remember_language(request, lang: str) -> None:
+    session = getattr(request, 'session', None)
+    if session is not None and session.get(SESSION_LANGUAGE_KEY) != lang:
+        session[SESSION_LANGUAGE_KEY] = lang
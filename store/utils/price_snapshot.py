@@ -0,0 +1,98 @@
+"""Ежедневные снимки цен и уведомления о снижении цены для списков желаемого.
+
+Логика вынесена из management-команды snapshot_prices, чтобы её можно было
+вызывать напрямую (тесты, другие команды) без обвязки BaseCommand.
+"""
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from store.models import Game, PriceSnapshot, Notification, WishlistEntry
+
+BATCH_SIZE = 500
+
+
+def run_snapshot(threshold: Optional[int] = None, dry: bool = False) -> Dict[str, int]:
+    """Снять сегодняшние цены и разослать уведомления о падении на threshold% и больше.
+
+    Возвращает счётчики {'created', 'updated', 'notified'}.
+    """
+    if threshold is None:
+        threshold = getattr(settings, 'PRICE_DROP_THRESHOLD_PERCENT', 15)
+    today = timezone.now().date()
+    created = 0
+    updated = 0
+    notified = 0
+    qs = Game.objects.filter(appid__isnull=False)
+    games = qs.iterator(chunk_size=BATCH_SIZE)
+    while True:
+        chunk = list(islice(games, BATCH_SIZE))
+        if not chunk:
+            break
+        # Последние снимки для всей пачки — один запрос вместо запроса на игру
+        latest_map = PriceSnapshot.latest_two_per_game([g.id for g in chunk], until=today)
+        # Сегодняшние снимки (новые или с изменившейся ценой) пишем одним upsert на пачку
+        upserts = []
+        for g in chunk:
+            current_price = g.price or Decimal('0')
+            current_currency = g.currency
+            # Latest snapshot (<= today) из заранее собранного словаря пачки
+            latest = (latest_map.get(g.id) or [None])[0]
+            old_price = None
+            old_currency = None
+            if latest and latest.snapshot_date == today:
+                old_price = latest.price
+                old_currency = latest.currency
+                # Update today's snapshot to reflect current price if changed
+                if latest.price != current_price or latest.currency != current_currency:
+                    upserts.append((g.id, current_price, current_currency, today))
+                    updated += 1
+            else:
+                # create today's snapshot with current price
+                upserts.append((g.id, current_price, current_currency, today))
+                created += 1
+                if latest:
+                    old_price = latest.price
+                    old_currency = latest.currency
+            # Compare if we have an old price in same currency
+            if old_price is not None and old_currency == current_currency:
+                try:
+                    drop_percent = Decimal('0')
+                    if old_price > 0:
+                        drop_percent = ((old_price - current_price) / old_price) * 100
+                except Exception:
+                    drop_percent = Decimal('0')
+                if drop_percent >= threshold and current_price < old_price and not dry:
+                    # Один JOIN по вишлисту: только те, кого ещё не уведомляли о такой (или более низкой) цене
+                    entries = list(
+                        WishlistEntry.objects
+                        .filter(game_id=g.id, profile__notify_price_drop=True)
+                        .filter(Q(last_notified_price__isnull=True) | Q(last_notified_price__gt=current_price))
+                        .values_list('pk', 'profile__user_id')
+                    )
+                    if entries:
+                        try:
+                            with transaction.atomic():
+                                Notification.fanout(
+                                    [uid for _pk, uid in entries],
+                                    kind='price_drop',
+                                    payload={
+                                        'game_title': g.title,
+                                        'old_price': f"{old_price:.2f} {old_currency}",
+                                        'new_price': f"{current_price:.2f} {current_currency}",
+                                        'percent': int(drop_percent),
+                                    },
+                                    link_url=f"/game/{g.slug}/",
+                                )
+                                WishlistEntry.objects.filter(pk__in=[pk for pk, _uid in entries]).update(last_notified_price=current_price)
+                            notified += len(entries)
+                        except Exception:
+                            pass
+        if upserts:
+            PriceSnapshot.upsert_daily(upserts)
+    return {'created': created, 'updated': updated, 'notified': notified}
@@ -20,7 +20,9 @@ from django.db import transaction
 from django.contrib import messages
 from .models import (
     Game, UserProfile, CartItem, SupportTicket, Order, OrderItem, Review, ReviewVote, Genre,
-    ProfileComment, Friendship, ProfileCommentSubscription, ProfileCommentBan, Notification, FriendshipRequest
+    ProfileComment, Friendship, ProfileCommentSubscription, ProfileCommentBan, Notification, FriendshipRequest,
+    PriceSnapshot,
+    friends_of,
 )
 from .forms import (
     ProfileSettingsForm,  # legacy (single form)
@@ -33,6 +35,8 @@ from .forms import (
     NotificationSettingsForm,
 )
 from .utils.currency import convert_amount
+from .utils.i18n import lang_key, remember_language
+from .templatetags.steam_tags import fetch_tags_status
 import requests
 from django.utils import translation
 from django.utils.translation import gettext as _
@@ -105,8 +109,7 @@ class GameListView(ListView):
         qs = (
             super().get_queryset()
             .filter(appid__isnull=False)
-            .select_related('developer')
-            .prefetch_related('genres')
+            .with_display()
         )
         request = self.request
         q = request.GET.get('q')
@@ -183,7 +186,7 @@ class GameListView(ListView):
                 qs = qs.filter(platform_q)
 
         # annotate average rating and count
-        qs = qs.annotate(rating_avg=Avg('reviews__rating'), rating_count=Count('reviews'))
+        qs = qs.annotate(rating_avg=F('avg_rating'), rating_count=F('review_count'))
         # sorting by rating
         sort = request.GET.get('sort')
         if sort in ('rating', '-rating'):
@@ -200,7 +203,7 @@ class GameListView(ListView):
     # Кешируем только для гостей (нет персонализации wishlist/owned)
     def dispatch(self, request, *args, **kwargs):
         if request.method == 'GET' and not request.user.is_authenticated:
-            key = f"catalog_page:{request.get_full_path()}"
+            key = f"catalog_page:{lang_key()}:{request.get_full_path()}"
             cached = cache.get(key)
             if cached is not None:
                 return cached
@@ -227,10 +230,8 @@ class GameDetailView(DetailView):
 
     def get_queryset(self):
         # Жадно подтягиваем связанные объекты для страницы игры
-        return (
-            Game.objects.select_related('developer')
-            .prefetch_related('genres', 'screenshots', 'reviews__user')
-        )
+        # (отзывы грузятся отдельно, с аннотациями — см. ReviewQuerySet.with_display)
+        return Game.objects.with_media()
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -296,37 +297,29 @@ class GameDetailView(DetailView):
             by_dev = (
                 Game.objects.filter(developer=self.object.developer)
                 .exclude(id=self.object.id)
-                .select_related('developer')
-                .prefetch_related('genres')
-                .annotate(rating_avg=Avg('reviews__rating'), rating_count=Count('reviews'))[:10]
+                .with_display()
+                .annotate(rating_avg=F('avg_rating'), rating_count=F('review_count'))[:10]
             )
         by_genres = (
             Game.objects.filter(genres__in=self.object.genres.all())
             .exclude(id=self.object.id)
             .distinct()
-            .select_related('developer')
-            .prefetch_related('genres')
-            .annotate(rating_avg=Avg('reviews__rating'), rating_count=Count('reviews'))[:12]
+            .with_display()
+            .annotate(rating_avg=F('avg_rating'), rating_count=F('review_count'))[:12]
         )
         ctx['more_from_developer'] = by_dev
         ctx['similar_games'] = by_genres
 
         # reviews aggregate + sorting
         try:
-            # reviews.prefetched выше (reviews__user) – используем .all() без дополнительных запросов
             reviews_qs = self.object.reviews.all()
-            count = reviews_qs.count()
-            avg = 0
-            if count:
-                avg = reviews_qs.aggregate(Avg('rating'))['rating__avg'] or 0
+            # счётчик и средняя — денормализованные поля Game (без COUNT/AVG на каждый просмотр)
+            count = self.object.review_count
             ctx['reviews_count'] = count
-            ctx['reviews_avg'] = avg
+            ctx['reviews_avg'] = self.object.avg_rating or 0
 
-            # annotate helpful yes/no counts
-            reviews_qs = reviews_qs.annotate(
-                helpful_yes=Sum(Case(When(votes__helpful=True, then=1), default=0, output_field=IntegerField())),
-                helpful_no=Sum(Case(When(votes__helpful=False, then=1), default=0, output_field=IntegerField())),
-            )
+            # helpful yes/no + автор одним запросом
+            reviews_qs = reviews_qs.with_display()
 
             # sorting param: rsort = 'date' | '-date' | 'help' (default: help)
             rsort = self.request.GET.get('rsort', 'help')
@@ -547,7 +540,9 @@ class ProfileSettingsView(LoginRequiredMixin, UpdateView):
                 form.instance.balance = obj.balance
         except Exception:
             pass
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        remember_language(self.request, self.object.preferred_language)
+        return response
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -651,7 +646,9 @@ class SettingsView(LoginRequiredMixin, View):
                         form.instance.balance = prof.balance
             except Exception:
                 pass
-            form.save()
+            prof = form.save()
+            if section == 'general':
+                remember_language(request, prof.preferred_language)
             messages.success(request, _('Настройки сохранены.'))
             return redirect('store:settings', section=section)
         messages.error(request, _('Исправьте ошибки формы.'))
@@ -679,7 +676,7 @@ class HomeView(TemplateView):
     # Гостевой кеш на короткий срок (120 сек), т.к. блоки без персонализации
     def dispatch(self, request, *args, **kwargs):
         if request.method == 'GET' and not request.user.is_authenticated:
-            key = f"home_page:{request.get_full_path()}"
+            key = f"home_page:{lang_key()}:{request.get_full_path()}"
             cached = cache.get(key)
             if cached is not None:
                 return cached
@@ -711,8 +708,7 @@ class HomeView(TemplateView):
         with_images = (
             Game.objects.filter(Q(cover_image__isnull=False) | Q(screenshots__isnull=False))
             .distinct()
-            .select_related('developer')
-            .prefetch_related('screenshots', 'genres')
+            .with_media()
         )
         # featured: свежие/со скидкой для хиро и слайдов
         featured_qs = with_images.order_by(F('discount_percent').desc(nulls_last=True), F('updated_at').desc())
@@ -772,7 +768,7 @@ class RecommendationsView(ListView):
             # Fallback для гостей: популярные и со скидками/оценками
             return (
                 with_images
-                .annotate(rating_avg=Avg('reviews__rating'), rating_count=Count('reviews'))
+                .annotate(rating_avg=F('avg_rating'), rating_count=F('review_count'))
                 .order_by(
                     F('discount_percent').desc(nulls_last=True),
                     F('rating_avg').desc(nulls_last=True),
@@ -820,7 +816,7 @@ class RecommendationsView(ListView):
             return (
                 with_images
                 .exclude(id__in=owned_ids)
-                .annotate(rating_avg=Avg('reviews__rating'), rating_count=Count('reviews'))
+                .annotate(rating_avg=F('avg_rating'), rating_count=F('review_count'))
                 .order_by(F('discount_percent').desc(nulls_last=True), '-updated_at')[:60]
             )
 
@@ -864,8 +860,8 @@ class RecommendationsView(ListView):
             .annotate(
                 genre_match=Count('genres', filter=Q(genres__in=genre_ids), distinct=True),
                 wishlist_match=Count('genres', filter=Q(genres__in=wishlist_genre_ids), distinct=True),
-                rating_avg=Avg('reviews__rating'),
-                rating_count=Count('reviews'),
+                rating_avg=F('avg_rating'),
+                rating_count=F('review_count'),
                 is_fresh=Case(When(release_date__gte=fresh_cut, then=1), default=0, output_field=IntegerField()),
             )
         )
@@ -1013,14 +1009,14 @@ class ChartsView(TemplateView):
 
         # 3) Top rated (avg rating with count as tiebreaker)
         top_rated = list(
-            with_images.annotate(rating_avg=Avg('reviews__rating'), rating_count=Count('reviews'))
+            with_images.annotate(rating_avg=F('avg_rating'), rating_count=F('review_count'))
             .filter(rating_count__gt=0)
             .order_by(F('rating_avg').desc(nulls_last=True), F('rating_count').desc(nulls_last=True))[:100]
         )
 
         # 4) Most reviewed
         most_reviewed = list(
-            with_images.annotate(rating_count=Count('reviews'))
+            with_images.annotate(rating_count=F('review_count'))
             .filter(rating_count__gt=0)
             .order_by(F('rating_count').desc(nulls_last=True), '-updated_at')[:100]
         )
@@ -1055,7 +1051,7 @@ class ChartsView(TemplateView):
         try:
             free_popular = list(
                 with_images.filter(Q(price__lte=0))
-                .annotate(wish_count=Count('wishlisted_by', distinct=True), rating_avg=Avg('reviews__rating'))
+                .annotate(wish_count=Count('wishlisted_by', distinct=True), rating_avg=F('avg_rating'))
                 .order_by(F('wish_count').desc(nulls_last=True), F('rating_avg').desc(nulls_last=True), '-updated_at')[:100]
             )
         except Exception:
@@ -1099,7 +1095,7 @@ class WishlistListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         profile, _ = UserProfile.objects.get_or_create(user=self.request.user)
-        qs = profile.wishlist.all()
+        qs = profile.wishlist.prefetch_related(PriceSnapshot.latest_prefetch())
 
         # Filters
         request = self.request
@@ -1377,17 +1373,7 @@ class CheckoutView(LoginRequiredMixin, TemplateView):
                     status='pending',
                 )
                 # Снимок позиций (фиксируем, что именно покупает пользователь)
-                order_items = []
-                for it in items:
-                    oi = OrderItem(
-                        order=order,
-                        game=it.game,
-                        quantity=it.quantity or 1,
-                        price=it.game.price or Decimal('0.00'),
-                        currency=it.game.currency or order_currency,
-                    )
-                    order_items.append(oi)
-                OrderItem.objects.bulk_create(order_items)
+                OrderItem.create_from_cart(order, items)
                 # Сохраняем id в сессии — защита от дабл-сабмита
                 request.session['pending_order_id'] = order.id
             else:
@@ -1407,7 +1393,7 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
 
     def get_queryset(self):
         # Limit visibility to the current user's orders
-        return Order.objects.filter(user=self.request.user).prefetch_related('items_snapshot__game')
+        return Order.objects.filter(user=self.request.user).with_display()
 
 
 class OrdersListView(LoginRequiredMixin, ListView):
@@ -1459,24 +1445,21 @@ class PaymentView(LoginRequiredMixin, TemplateView):
                                     pass
                             # Пытаемся списать, если хватает средств
                             if prof.balance >= to_charge:
-                                before = prof.balance
-                                ok = prof.deduct_balance(to_charge, prof.preferred_currency, allow_negative=False)
-                                if ok:
-                                    # Запишем транзакцию кошелька
-                                    try:
-                                        from .models import WalletTransaction
-                                        WalletTransaction.objects.create(
+                                from .models import WalletTransaction
+                                # Списание и запись в журнал — одной транзакцией (savepoint)
+                                with transaction.atomic():
+                                    ok = prof.deduct_balance(to_charge, prof.preferred_currency, allow_negative=False)
+                                    if ok:
+                                        WalletTransaction.bulk_log([WalletTransaction(
                                             user=request.user,
-                                            amount=(before - prof.balance) * Decimal('-1'),  # negative value
+                                            amount=-to_charge,
                                             currency=prof.preferred_currency,
                                             source_amount=order.total_price,
                                             source_currency=order.currency,
                                             kind='purchase_deduct',
                                             balance_after=prof.balance,
                                             description=f"Оплата заказа #{order.id}"
-                                        )
-                                    except Exception:
-                                        pass
+                                        )])
                                 messages.info(request, _("Списано %(amount).2f %(cur)s с баланса.") % { 'amount': to_charge, 'cur': prof.preferred_currency })
                             else:
                                 messages.info(request, _("Недостаточно средств на балансе. Списание пропущено."))
@@ -1857,6 +1840,25 @@ class SearchSuggestView(View):
         return JsonResponse({"error": "POST not supported"}, status=405)
 
 
+class SteamTagsView(View):
+    """Теги Steam для одной игры — подгружаются браузером вместо запроса в Steam при рендере.
+
+    GET /api/steam_tags/?appid=570&max=5
+    Response: { tags: ["Action", ...] }
+    """
+    def get(self, request):
+        try:
+            appid = int(request.GET.get('appid', ''))
+            max_tags = min(max(int(request.GET.get('max', 5)), 1), 10)
+        except ValueError:
+            return JsonResponse({"tags": []}, status=400)
+        tags, settled = fetch_tags_status(appid, max_tags)
+        resp = JsonResponse({"tags": tags})
+        # час кешируем только ответ из кеша/завершённого запроса; [] под lock/лимитом — нет
+        resp['Cache-Control'] = 'public, max-age=3600' if settled else 'no-store'
+        return resp
+
+
 class SupportTicketDetailView(LoginRequiredMixin, View):
     template_name = 'store/support_ticket_detail.html'
 
@@ -2065,7 +2067,7 @@ class WalletTopUpView(LoginRequiredMixin, TemplateView):
             return redirect('store:home')
         amt_raw = (request.POST.get('amount') or '').strip()
         chosen_currency = (request.POST.get('currency') or '').strip() or prof.preferred_currency
-        from decimal import Decimal, InvalidOperation
+        from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
         try:
             amt = Decimal(amt_raw)
         except InvalidOperation:
@@ -2090,13 +2092,12 @@ class WalletTopUpView(LoginRequiredMixin, TemplateView):
                 credited = convert_amount(amt, chosen_currency, target_cur)
             except Exception:
                 credited = amt
-        before = prof.balance
-        prof.add_balance(credited, target_cur)
-        delta = prof.balance - before
-        # Записываем транзакцию
-        try:
-            from .models import WalletTransaction
-            WalletTransaction.objects.create(
+        from .models import WalletTransaction
+        delta = Decimal(str(credited)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        # Пополнение и запись транзакции коммитятся вместе
+        with transaction.atomic():
+            prof.add_balance(delta, target_cur)
+            WalletTransaction.bulk_log([WalletTransaction(
                 user=request.user,
                 amount=delta,  # already in preferred currency
                 currency=target_cur,
@@ -2105,9 +2106,7 @@ class WalletTopUpView(LoginRequiredMixin, TemplateView):
                 kind='topup',
                 balance_after=prof.balance,
                 description=f"Пополнение {amt:.2f} {chosen_currency}"
-            )
-        except Exception:
-            pass
+            )])
         # Сообщение: сколько ввели и сколько зачислено после конверсии
         if chosen_currency != target_cur:
             messages.success(request, _("Пополнение %(src_amount).2f %(src_cur)s → зачислено %(dst_amount).2f %(dst_cur)s.") % { 'src_amount': amt, 'src_cur': chosen_currency, 'dst_amount': delta, 'dst_cur': target_cur })
@@ -2139,9 +2138,7 @@ class ProfileView(TemplateView):
         is_owner = self.request.user.is_authenticated and self.request.user.id == user_obj.id
         is_friend = False
         if self.request.user.is_authenticated and not is_owner:
-            uid = self.request.user.id; oid = user_obj.id
-            a, b = (uid, oid) if uid < oid else (oid, uid)
-            is_friend = Friendship.objects.filter(user_a_id=a, user_b_id=b).exists()
+            is_friend = user_obj.id in friends_of(self.request.user.id)
         if profile.privacy == 'private' and not is_owner:
             return {'profile_user': user_obj, 'profile': profile, 'is_private': True}
         if profile.privacy == 'friends' and not (is_owner or is_friend):
@@ -2262,16 +2259,12 @@ class ProfileView(TemplateView):
         # --- Wishlist preview ---
         wishlist_qs = profile.wishlist.all().distinct()
         wishlist_count = wishlist_qs.count()
-        wishlist_preview = list(wishlist_qs.order_by('-updated_at')[:8])
+        wishlist_preview = list(wishlist_qs.with_media().order_by('-updated_at')[:8])
 
         # Reviews
         reviews_qs = (
-            Review.objects.select_related('game')
-            .filter(user=user_obj)
-            .annotate(
-                helpful_yes=Sum(Case(When(votes__helpful=True, then=1), default=0, output_field=IntegerField())),
-                helpful_no=Sum(Case(When(votes__helpful=False, then=1), default=0, output_field=IntegerField())),
-            )
+            Review.objects.filter(user=user_obj)
+            .with_display()
             .order_by('-created_at')
         )
         reviews_count = reviews_qs.count()
@@ -2430,9 +2423,7 @@ class ProfileCommentCreateView(LoginRequiredMixin, View):
         is_owner = request.user.id == owner.id
         is_friend = False
         if not is_owner:
-            uid, oid = (request.user.id, owner.id)
-            a, b = (uid, oid) if uid < oid else (oid, uid)
-            is_friend = Friendship.objects.filter(user_a_id=a, user_b_id=b).exists()
+            is_friend = owner.id in friends_of(request.user.id)
 
         cpriv = getattr(profile, 'comment_privacy', 'public')
         if (cpriv == 'nobody' and not is_owner) or (cpriv == 'friends' and not (is_owner or is_friend)):
@@ -2459,7 +2450,7 @@ class ProfileCommentCreateView(LoginRequiredMixin, View):
 
         # notify subscribers and owner (internal + email best-effort)
         try:
-            subs = ProfileCommentSubscription.objects.filter(profile_owner=owner).select_related('subscriber')
+            subs = ProfileCommentSubscription.objects.filter(profile_owner=owner).select_related('subscriber__profile')
             recipients = [s.subscriber for s in subs if s.subscriber_id != request.user.id]
             if owner.id != request.user.id:
                 recipients.append(owner)
@@ -2467,18 +2458,17 @@ class ProfileCommentCreateView(LoginRequiredMixin, View):
             seen = set()
             recipients = [u for u in recipients if not (u.id in seen or seen.add(u.id))]
             # Internal notifications: respect notify_profile_comment flag
-            notifs = []
-            for u in recipients:
-                prof = getattr(u, 'profile', None)
-                if prof and prof.notify_profile_comment:
-                    notifs.append(Notification(
-                        user=u,
-                        kind='profile_comment',
-                        payload={'author': request.user.username, 'owner': owner.username, 'text': text[:140]},
-                        link_url=f"/profile/{owner.username}/",
-                    ))
-            if notifs:
-                Notification.objects.bulk_create(notifs)
+            notify_ids = [
+                u.id for u in recipients
+                if getattr(u, 'profile', None) and u.profile.notify_profile_comment
+            ]
+            if notify_ids:
+                Notification.fanout(
+                    notify_ids,
+                    kind='profile_comment',
+                    payload={'author': request.user.username, 'owner': owner.username, 'text': text[:140]},
+                    link_url=f"/profile/{owner.username}/",
+                )
             # Email notifications gated by email_profile_comment
             from django.core.mail import send_mail
             from django.conf import settings as djset
@@ -2653,11 +2643,7 @@ class FriendsListView(LoginRequiredMixin, TemplateView):
             preferred_currency = 'USD'
         ctx['preferred_currency'] = preferred_currency
         uid = self.request.user.id
-        friends_ids = list(
-            Friendship.objects.filter(user_a_id__in=[uid], user_b_id__gt=0).values_list('user_b_id', flat=True)
-        ) + list(
-            Friendship.objects.filter(user_b_id__in=[uid], user_a_id__gt=0).values_list('user_a_id', flat=True)
-        )
+        friends_ids = friends_of(uid)
         from django.contrib.auth import get_user_model
         User = get_user_model()
         friends = list(User.objects.filter(id__in=friends_ids))
@@ -3012,6 +2998,7 @@ class LanguageSetView(LoginRequiredMixin, View):
             prof.save(update_fields=['preferred_language'])
         except Exception:
             return JsonResponse({'ok': False, 'error': 'SAVE_FAILED'}, status=500)
+        remember_language(request, lang)
         # activate immediately for this response
         try:
             from django.utils import translation